@@ -1,86 +1,117 @@
-from typing import Literal, Dict, Any
-from langchain import hub
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_core.runnables import Runnable
-from langchain_experimental.plan_and_execute import (
-    PlanAndExecute,
-    load_agent_executor,
-    load_chat_planner,
-)
-from langchain_openai import ChatOpenAI
-from langchain_core.language_models import BaseLanguageModel
-from langchain.prompts import PromptTemplate
-
-from agent.tool_loader import load_tools
-from agent.utils import MEMORY  # Import shared memory instance
+import os
+from typing import TYPE_CHECKING, Literal, Dict, Any
+
 from agent.config import set_environment
 
+# Heavy modules (langchain agents, langchain_experimental, the OpenAI client and
+# the tool dependencies) are imported inside the functions that need them, so
+# importing this module stays cheap. See benchmarks/import_time.py.
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseLanguageModel
+    from langchain_core.runnables import Runnable
+
 set_environment()
 
 # Define the type for reasoning strategies
-ReasoningStrategies = Literal["zero-shot-react", "plan-and-solve"]
+ReasoningStrategies = Literal["zero-shot-react", "plan-and-solve", "tool-calling"]
+
+# Models offered by the app and accepted by the HTTP API
+SUPPORTED_MODELS = ("gpt-3.5-turbo", "gpt-4", "Qwen/Qwen3-8B", "Qwen/Qwen2.5-7B")
+
+def create_llm(model_name: str) -> "BaseLanguageModel":
+    """Create LLM based on model_name, reusing pooled clients across calls."""
+    from agent.llm_cache import get_llm_cache
+    from agent.llm_pool import LLM_POOL
+
+    # stream_usage reports token counts for streamed responses too
+    params: Dict[str, Any] = {"temperature": 0, "streaming": True, "stream_usage": True}
+    # Temperature 0 makes identical prompts reusable (AGENT_LLM_CACHE selects the backend)
+    cache = get_llm_cache()
+    if cache is not None:
+        params["cache"] = cache
 
-def create_llm(model_name: str) -> BaseLanguageModel:
-    """Create LLM based on model_name."""
     if model_name.startswith("gpt-"):
-        return ChatOpenAI(model=model_name, temperature=0, streaming=True)
+        return LLM_POOL.chat_model(model_name, **params)
     elif model_name.startswith("Qwen/"):
-        return ChatOpenAI(
-            model=model_name,
-            temperature=0,
-            streaming=True,
-        )
+        return LLM_POOL.chat_model(model_name, **params)
     else:
-        return ChatOpenAI(model='gpt-3.5-turbo', temperature=0, streaming=True)
+        return LLM_POOL.chat_model('gpt-3.5-turbo', **params)
+
+def _is_real_answer(answer: str) -> bool:
+    """Return False for empty answers and the fallbacks used when no answer was found."""
+    from agent.plan_and_execute import NO_ANSWER
+
+    return bool(answer.strip()) and answer != NO_ANSWER and not answer.startswith("Agent stopped")
+
+def load_agent(tool_names: list[str], strategy: ReasoningStrategies = "zero-shot-react", model_name: str = "gpt-3.5-turbo") -> "Runnable":
+    """Load and configure an agent with specified tools and reasoning strategy.
+
+    With AGENT_SEMANTIC_CACHE=1 the agent answers paraphrases of previously
+    answered questions from the semantic cache.
+    """
+    agent = _build_agent(tool_names, strategy, model_name)
+    if os.environ.get("AGENT_SEMANTIC_CACHE", "0") == "1":
+        from agent.semantic_cache import SemanticCachedAgent, get_semantic_cache
+
+        namespace = f"{strategy}|{model_name}|{','.join(sorted(tool_names))}"
+        agent = SemanticCachedAgent(agent, get_semantic_cache(), namespace=namespace, is_cacheable=_is_real_answer)
+    return agent
+
+def _build_agent(tool_names: list[str], strategy: ReasoningStrategies, model_name: str) -> "Runnable":
+    """Build the agent for a reasoning strategy."""
+    from agent.tool_loader import load_tools
+    from agent.utils import MEMORY  # Import shared memory instance
 
-def load_agent(tool_names: list[str], strategy: ReasoningStrategies = "zero-shot-react", model_name: str = "gpt-3.5-turbo") -> Runnable:
-    """Load and configure an agent with specified tools and reasoning strategy."""
     llm = create_llm(model_name)
     tools = load_tools(tool_names=tool_names, llm=llm)
     
     if strategy == "plan-and-solve":
+        from langchain_experimental.plan_and_execute import load_agent_executor, load_chat_planner
+
+        from agent.plan_and_execute import PlanAndExecuteWrapper
+        from agent.streaming import DeadlineAgentExecutor
+
         planner = load_chat_planner(llm)
         executor = load_agent_executor(llm, tools, verbose=True)
-        
-        class PlanAndExecuteWrapper(Runnable):
-            def __init__(self, planner, executor):
-                self.planner = planner
-                self.executor = executor
-                self.plan_and_execute = PlanAndExecute(
-                    planner=planner, 
-                    executor=executor, 
-                    verbose=True
-                )
-                self.plan_and_execute.memory = MEMORY
-            
-            def invoke(self, input: Dict[str, Any], config=None) -> Dict[str, Any]:
-                original_question = input.get("input", "")
-                result = self.plan_and_execute.invoke({"input": original_question}, config)
-                
-                if "output" not in result or not result["output"]:
-                    if "intermediate_steps" in result:
-                        for step in reversed(result["intermediate_steps"]):
-                            if isinstance(step, dict) and "response" in step:
-                                result["output"] = step["response"]
-                                break
-                
-                return {
-                    "output": result.get("output", "未能生成答案，请尝试其他问题或工具。"),
-                    "intermediate_steps": result.get("intermediate_steps", [])
-                }
-            
-            async def ainvoke(self, input: Dict[str, Any], config=None):
-                return self.invoke(input, config)
-        
-        return PlanAndExecuteWrapper(planner, executor)
-    
-    prompt = hub.pull("hwchase17/react")
-    return AgentExecutor(
+        # Step agents answer before the request deadline
+        executor.chain = DeadlineAgentExecutor.from_agent_and_tools(agent=executor.chain.agent, tools=tools, verbose=True)
+        return PlanAndExecuteWrapper(
+            planner,
+            executor,
+            memory=MEMORY,
+            max_parallel_steps=int(os.environ.get("AGENT_PLAN_MAX_PARALLEL", "4")),
+        )
+
+    if strategy == "tool-calling":
+        from langchain.agents import create_tool_calling_agent
+
+        from agent.tool_calling import ParallelToolAgentExecutor, create_tool_calling_prompt
+
+        # The model may request several tools per turn; they run concurrently
+        return ParallelToolAgentExecutor(
+            agent=create_tool_calling_agent(llm=llm, tools=tools, prompt=create_tool_calling_prompt()),
+            tools=tools,
+            handle_parsing_errors=True,
+            max_iterations=15,
+            early_stopping_method="force",  # multi-action agents cannot "generate"
+            verbose=True,
+            memory=MEMORY
+        )
+
+    from langchain.agents import create_react_agent
+
+    from agent.prompts import get_prompt
+    from agent.streaming import StreamingAgentExecutor
+
+    prompt = get_prompt("hwchase17/react")
+    return StreamingAgentExecutor(
         agent=create_react_agent(llm=llm, tools=tools, prompt=prompt), 
         tools=tools,
         handle_parsing_errors=True,
         max_iterations=15,
-        early_stopping_method="generate",
+        # Runnable agents only support "force"; answers near the deadline
+        # are generated by DeadlineAgentExecutor
+        early_stopping_method="force",
         verbose=True,
         memory=MEMORY  # Use shared memory for conversation context
     )
\ No newline at end of file
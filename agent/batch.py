@@ -0,0 +1,263 @@
+"""Batch runner for question files.
+
+Runs every question of a JSONL file through an agent with bounded
+concurrency and appends one JSON line per answered question to the output
+file, with its latency and token usage. The output file doubles as the
+checkpoint: rerunning the same command after a crash skips questions that
+already have an answer and retries the ones that failed, whose earlier
+lines are removed first so every id has one line in the end.
+
+Questions are independent: each runs in a conversation of its own that is
+kept in memory only (AGENT_HISTORY_DIR is ignored) and dropped afterwards.
+
+Input lines are objects with an "input" (or "question") field and an
+optional "id"; the line number is used when "id" is missing.
+
+With --metrics, aggregated latency and token histograms (agent/metrics.py)
+are written as a JSON snapshot at the end of the run.
+
+Each question has --timeout seconds (agent/deadline.py); when time runs
+out the agent stops using tools and answers with what it has.
+
+Example:
+    python -m agent.batch questions.jsonl -o answers.jsonl --concurrency 8 --mode async
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent.deadline import deadline_scope, default_timeout
+from agent.metrics import METRICS, METRICS_HANDLER, llm_token_usage
+from agent.tracing import trace_handlers
+
+DEFAULT_TOOLS = ["ddg-search", "wikipedia", "arxiv", "openweathermap"]
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Sum the token usage reported by every LLM call of a run."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        prompt, completion = llm_token_usage(response)
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+    def usage(self) -> dict[str, int]:
+        return {
+            "prompt": self.prompt_tokens,
+            "completion": self.completion_tokens,
+            "total": self.prompt_tokens + self.completion_tokens,
+        }
+
+
+def read_questions(path: Path) -> list[dict[str, Any]]:
+    """Read questions from a JSONL file, assigning line numbers as missing ids."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("input", record.get("question"))
+            if not isinstance(question, str):
+                raise ValueError(f"{path}:{number}: missing 'input'")
+            questions.append({"id": str(record.get("id", number)), "input": question})
+    return questions
+
+
+def read_checkpoint(path: Path) -> set[str]:
+    """Return the ids answered without error in an existing output file.
+
+    Lines of failed questions, torn lines from a crash and repeated answers
+    are removed from the file, so the retried questions do not end up with
+    two lines.
+    """
+    done: set[str] = set()
+    if not path.exists():
+        return done
+    kept, dropped = [], 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from a crash; the question is run again
+                dropped += line.strip() != ""
+                continue
+            if record.get("error") or str(record["id"]) in done:
+                dropped += 1
+                continue
+            done.add(str(record["id"]))
+            kept.append(line if line.endswith("\n") else line + "\n")
+    if dropped:
+        path.with_suffix(".tmp").write_text("".join(kept), encoding="utf-8")
+        os.replace(path.with_suffix(".tmp"), path)
+    return done
+
+
+class _ResultWriter:
+    """Append result lines to the output file, one complete line per write."""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "a+", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                # Terminate a torn last line so the next record parses
+                self._file.write("\n")
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _result(question: dict[str, Any], started: float, usage: TokenUsageHandler, output: Any = None, error: Optional[BaseException] = None) -> dict[str, Any]:
+    record = {
+        "id": question["id"],
+        "input": question["input"],
+        "output": output.get("output", "") if isinstance(output, dict) else output,
+        "latency": round(time.perf_counter() - started, 3),
+        "tokens": usage.usage(),
+    }
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+    return record
+
+
+def _session_id(question: dict[str, Any]) -> str:
+    return f"batch-{question['id']}"
+
+
+def _forget_session(session_id: str) -> None:
+    # Questions are independent; do not keep their conversations around
+    from agent.utils import MEMORY
+
+    store = getattr(MEMORY, "store", None)
+    if store is not None:
+        store.drop(session_id)
+
+
+def run_threads(agent, questions: list[dict[str, Any]], writer: _ResultWriter, concurrency: int, progress, timeout: Optional[float] = None) -> None:
+    """Run questions on a thread pool, each with `timeout` seconds to answer."""
+    from agent.session_memory import session_scope
+
+    def run(question: dict[str, Any]) -> None:
+        usage = TokenUsageHandler()
+        started = time.perf_counter()
+        session_id = _session_id(question)
+        try:
+            with session_scope(session_id), deadline_scope(timeout):
+                output = agent.invoke({"input": question["input"]}, {"callbacks": [usage, METRICS_HANDLER, *trace_handlers()]})
+            record = _result(question, started, usage, output)
+        except Exception as e:
+            record = _result(question, started, usage, error=e)
+        finally:
+            _forget_session(session_id)
+        writer.write(record)
+        progress(record)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        list(pool.map(run, questions))
+
+
+async def run_async(agent, questions: list[dict[str, Any]], writer: _ResultWriter, concurrency: int, progress, timeout: Optional[float] = None) -> None:
+    """Run questions as asyncio tasks limited by a semaphore, each with `timeout` seconds to answer."""
+    from agent.session_memory import session_scope
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(question: dict[str, Any]) -> None:
+        async with semaphore:
+            usage = TokenUsageHandler()
+            started = time.perf_counter()
+            session_id = _session_id(question)
+            try:
+                with session_scope(session_id), deadline_scope(timeout):
+                    output = await agent.ainvoke({"input": question["input"]}, {"callbacks": [usage, METRICS_HANDLER, *trace_handlers()]})
+                record = _result(question, started, usage, output)
+            except Exception as e:
+                record = _result(question, started, usage, error=e)
+            finally:
+                _forget_session(session_id)
+            # Writes are small; fsync off the event loop would not pay off
+            writer.write(record)
+            progress(record)
+
+    await asyncio.gather(*(run(question) for question in questions))
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run a question file through an agent."""
+    parser = argparse.ArgumentParser(description="Run a JSONL file of questions through an agent.")
+    parser.add_argument("questions", type=Path, help="JSONL file with one question per line")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL file answers are appended to; also the checkpoint")
+    parser.add_argument("--strategy", default="zero-shot-react", choices=["zero-shot-react", "plan-and-solve", "tool-calling"])
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--tools", default=",".join(DEFAULT_TOOLS), help="Comma-separated tool names")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["threads", "async"], default="threads")
+    parser.add_argument("--timeout", type=float, default=default_timeout(),
+                        help="Seconds per question before a best-effort answer is forced (default AGENT_REQUEST_TIMEOUT or 120)")
+    parser.add_argument("--metrics", type=Path, help="Write a JSON snapshot of the latency and token metrics here when done")
+    args = parser.parse_args(argv)
+
+    # Questions are independent; do not leave a session log per question
+    os.environ.pop("AGENT_HISTORY_DIR", None)
+    from agent.factory import get_agent
+
+    questions = read_questions(args.questions)
+    done = read_checkpoint(args.output)
+    pending = [q for q in questions if q["id"] not in done]
+    print(f"Info: {len(questions)} questions, {len(questions) - len(pending)} already answered, {len(pending)} to run.")
+    if not pending:
+        return
+
+    agent = get_agent(tool_names=[t for t in args.tools.split(",") if t], strategy=args.strategy, model_name=args.model)
+    writer = _ResultWriter(args.output)
+    counter = {"done": 0, "failed": 0}
+    counter_lock = threading.Lock()
+
+    def progress(record: dict[str, Any]) -> None:
+        with counter_lock:
+            counter["done"] += 1
+            counter["failed"] += "error" in record
+            print(f"Info: [{counter['done']}/{len(pending)}] {record['id']} in {record['latency']:.1f}s"
+                  + (f" failed: {record['error']}" if "error" in record else ""))
+
+    started = time.perf_counter()
+    try:
+        if args.mode == "async":
+            asyncio.run(run_async(agent, pending, writer, args.concurrency, progress, args.timeout))
+        else:
+            run_threads(agent, pending, writer, args.concurrency, progress, args.timeout)
+    finally:
+        writer.close()
+        if args.metrics:
+            METRICS.write_snapshot(args.metrics)
+    elapsed = time.perf_counter() - started
+    print(f"Info: Finished {counter['done']} questions ({counter['failed']} failed) in {elapsed:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
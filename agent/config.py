@@ -11,9 +11,11 @@ def set_environment():
  
     os.environ["WOLFRAM_ALPHA_APPID"] = ""
 
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
     os.environ["LANGCHAIN_PROJECT"] = "My Project"
     os.environ["LANGSMITH_API_KEY"] = ""
     os.environ['LANGSMITH_ENDPOINT'] = ""
+    # Export to LangSmith only with a key; requests are traced locally
+    # either way (agent/tracing.py)
+    os.environ["LANGCHAIN_TRACING_V2"] = "true" if os.environ["LANGSMITH_API_KEY"] else "false"
 
     os.environ["OWM_API_KEY"] = ""
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""Long-lived DuckDuckGo search client.
+
+`CustomDuckDuckGoSearch` used to open a new `DDGS` per query and turned the
+first error into a "Search failed" observation, which cost the agent an LLM
+turn to reason about. `DDGSearchClient` keeps one `DDGS` instance, and with
+it the HTTP clients of its engines, for the whole process. Queries are paced
+by a token bucket shared by all threads, so a burst of agent steps does not
+trip DuckDuckGo's rate limit in the first place. Rate-limit and timeout
+errors are retried with jittered exponential backoff until the query's
+deadline, which is never later than the request deadline (agent/deadline.py).
+Retries, throttling waits and failures are counted in `stats()` and in the
+`METRICS` registry (agent/metrics.py).
+
+Configuration is read from the environment:
+    AGENT_DDG_RATE          queries per second across the process (default 1)
+    AGENT_DDG_BURST         queries allowed at once before pacing starts (default 3)
+    AGENT_DDG_RETRIES       retries of a rate-limited or timed-out query (default 3)
+    AGENT_DDG_BACKOFF       base backoff in seconds, doubled per retry (default 1)
+    AGENT_DDG_DEADLINE      seconds after which a query gives up (default 20)
+    AGENT_DDG_TIMEOUT       timeout of a single search request in seconds (default 5)
+"""
+import os
+import random
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.tools import ToolException
+
+from agent.deadline import DeadlineExceeded, time_budget
+from agent.metrics import METRICS
+
+
+class SearchError(ToolException):
+    """Raised when a query still fails after its retries or deadline.
+
+    Messages start with "Search failed:", so the tool result cache never
+    stores them.
+    """
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[float]:
+        """Take a token, sleeping until it is available.
+
+        Tokens are reserved in call order, so waiting callers are served
+        first come, first served.
+
+        Args:
+            timeout: Longest acceptable wait in seconds; None waits as long as needed
+
+        Returns:
+            Optional[float]: Seconds waited, or None if the wait would exceed timeout
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                return None
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def _is_retryable(error: Exception) -> bool:
+    from ddgs.exceptions import RatelimitException, TimeoutException
+
+    if isinstance(error, (RatelimitException, TimeoutException)):
+        return True
+    # Engine errors are re-raised as a plain DDGSException with the last message
+    message = str(error).lower()
+    return any(marker in message for marker in ("ratelimit", "rate limit", "429", "timed out", "timeout"))
+
+
+class DDGSearchClient:
+    """Rate-limited DuckDuckGo text search with retries, shared across threads."""
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 3,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        deadline: float = 20.0,
+        timeout: int = 5,
+    ):
+        """Initialize the client; the `DDGS` instance is created on the first query.
+
+        Args:
+            rate: Queries per second across all threads
+            burst: Queries allowed at once before pacing starts
+            max_retries: Retries of a rate-limited or timed-out query
+            backoff: Base backoff in seconds; retry n waits up to backoff * 2**n
+            deadline: Seconds after which a query gives up, including waits
+            timeout: Timeout of a single search request in seconds
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.timeout = timeout
+        self._ddgs = None
+        self._ddgs_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.queries = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttle_wait_total = 0.0
+        self.failures = 0
+
+    def _client(self):
+        with self._ddgs_lock:
+            if self._ddgs is None:
+                from ddgs import DDGS
+
+                self._ddgs = DDGS(timeout=self.timeout)
+            return self._ddgs
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def text(self, query: str, max_results: int = 5, deadline: Optional[float] = None) -> list[dict[str, Any]]:
+        """Run a text search.
+
+        Args:
+            query: Search query string
+            max_results: Maximum number of results
+            deadline: Seconds after which the query gives up; defaults to the client's deadline
+
+        Returns:
+            list[dict[str, Any]]: Results with "title", "href" and "body"; empty if nothing was found
+
+        Raises:
+            SearchError: If the query failed after its retries or ran out of time
+        """
+        from ddgs.exceptions import DDGSException
+
+        self._count("queries")
+        # The request deadline (agent/deadline.py) can only shorten the query's own
+        try:
+            budget = time_budget(self.deadline if deadline is None else deadline)
+        except DeadlineExceeded as e:
+            self._fail("deadline")
+            raise SearchError(f"Search failed: {e}") from e
+        give_up_at = time.monotonic() + budget
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire(timeout=give_up_at - time.monotonic())
+            if waited is None:
+                self._fail("throttled")
+                raise SearchError("Search failed: rate limit reached before the deadline; try again later.")
+            if waited:
+                self._count("throttled")
+                self._count("throttle_wait_total", waited)
+                METRICS.inc("agent_search_throttled_total", engine="ddg")
+            try:
+                return self._client().text(query, max_results=max_results)
+            except DDGSException as e:
+                if not _is_retryable(e):
+                    if "no results found" in str(e).lower():
+                        return []
+                    self._fail("error")
+                    raise SearchError(f"Search failed: {e}") from e
+                # Full jitter keeps retrying threads from hitting the limit in lockstep
+                pause = random.uniform(0, self.backoff * 2 ** attempt)
+                if attempt >= self.max_retries or time.monotonic() + pause >= give_up_at:
+                    self._fail("rate_limited")
+                    raise SearchError(f"Search failed: gave up after {attempt + 1} attempts: {e}") from e
+                attempt += 1
+                self._count("retries")
+                METRICS.inc("agent_search_retries_total", engine="ddg")
+                time.sleep(pause)
+
+    def _fail(self, reason: str) -> None:
+        self._count("failures")
+        METRICS.inc("agent_search_failures_total", engine="ddg", reason=reason)
+
+    def stats(self) -> dict[str, Any]:
+        """Return query, retry, throttling and failure counters."""
+        with self._stats_lock:
+            return {
+                "queries": self.queries,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "throttle_wait_total": self.throttle_wait_total,
+                "failures": self.failures,
+            }
+
+
+_client: Optional[DDGSearchClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ddg_client() -> DDGSearchClient:
+    """Return the process-wide DuckDuckGo client configured from the environment."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DDGSearchClient(
+                rate=float(os.environ.get("AGENT_DDG_RATE", "1")),
+                burst=int(os.environ.get("AGENT_DDG_BURST", "3")),
+                max_retries=int(os.environ.get("AGENT_DDG_RETRIES", "3")),
+                backoff=float(os.environ.get("AGENT_DDG_BACKOFF", "1")),
+                deadline=float(os.environ.get("AGENT_DDG_DEADLINE", "20")),
+                timeout=int(os.environ.get("AGENT_DDG_TIMEOUT", "5")),
+            )
+        return _client
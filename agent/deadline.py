@@ -0,0 +1,187 @@
+"""Per-request deadlines.
+
+A request used to run for as long as its agent loop took: the app's
+`{"timeout": 120}` run config was ignored, and `max_iterations=15` could
+keep a ReAct agent going long after the user gave up. A deadline is now set
+once per request with `deadline_scope` and lives in a context variable, so it
+follows the request into scheduler workers, plan step threads, tool calls
+and nested agents. Each layer trims its work to the time left:
+
+    scheduler          requests whose deadline passed while queued are not started
+    agent executors    once less than the reserve is left, the next LLM call is told
+                       to answer with what it has instead of calling more tools
+    plan-and-execute   remaining steps are skipped once the reserve is reached;
+                       the final step still answers
+    LLM requests       the HTTP timeout is capped at the time left (agent/llm_pool.py)
+    search tools       retries and waits end at the deadline (agent/ddg_client.py,
+                       agent/meta_search.py)
+
+Cancelling the handle returned by `deadline_scope` ends the request as if its
+deadline had passed, e.g. when the client of a streamed request disconnects.
+
+Configuration is read from the environment:
+    AGENT_REQUEST_TIMEOUT     default request deadline in seconds (default 120)
+    AGENT_DEADLINE_RESERVE    seconds kept for the final answer (default 10)
+"""
+import contextlib
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.agents import AgentAction, AgentFinish
+
+
+class Deadline:
+    """Deadline of the work inside a `deadline_scope`; never later than the enclosing one."""
+
+    __slots__ = ("at", "parent")
+
+    def __init__(self, at: float, parent: Optional["Deadline"] = None):
+        self.at = at
+        self.parent = parent
+
+    def time(self) -> float:
+        """Return the monotonic time of the deadline; inf without one."""
+        at = self.at
+        return at if self.parent is None else min(at, self.parent.time())
+
+    def cancel(self) -> None:
+        """End the work inside the scope as if its deadline had passed."""
+        self.at = -math.inf
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("agent_deadline", default=None)
+
+# Appended as a last step when the agent has to answer now; the log reaches
+# the tool-calling prompt and the observation the ReAct and structured-chat
+# scratchpads
+_WRAP_UP_STEP = (
+    AgentAction(tool="_deadline", tool_input="", log="I am running out of time and must answer now without using more tools."),
+    "No more tools can be used. Give your final answer now, based on the observations so far.",
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started after the request deadline has passed."""
+
+
+def default_timeout() -> float:
+    """Return the default request deadline in seconds from AGENT_REQUEST_TIMEOUT."""
+    return float(os.environ.get("AGENT_REQUEST_TIMEOUT", "120"))
+
+
+def reserve() -> float:
+    """Return the seconds kept for the final answer from AGENT_DEADLINE_RESERVE."""
+    return float(os.environ.get("AGENT_DEADLINE_RESERVE", "10"))
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Deadline]:
+    """Set the deadline of the work run inside the block.
+
+    A deadline already in effect is only ever shortened, so a nested scope
+    cannot extend the request it belongs to. Work submitted from the block
+    (e.g. to the scheduler) keeps the deadline after the block exits.
+
+    Args:
+        seconds: Time from now until the deadline; None keeps the current deadline
+
+    Yields:
+        Deadline: Handle whose `cancel()` stops the work started in the block
+    """
+    deadline = Deadline(math.inf if seconds is None else time.monotonic() + seconds, _deadline.get())
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Return the seconds left until the deadline, or None without a deadline."""
+    deadline = _deadline.get()
+    at = math.inf if deadline is None else deadline.time()
+    return None if at == math.inf else at - time.monotonic()
+
+
+def expired() -> bool:
+    """Return True if the deadline has passed."""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def should_wrap_up() -> bool:
+    """Return True if only the reserve for the final answer is left."""
+    left = remaining()
+    return left is not None and left <= reserve()
+
+
+def time_budget(default: Optional[float]) -> Optional[float]:
+    """Return `default` capped at the time left until the deadline.
+
+    Args:
+        default: Timeout in seconds to use without a deadline; None for no timeout
+
+    Returns:
+        Optional[float]: The capped timeout, or None if there is neither a default nor a deadline
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("The request deadline has passed.")
+    return left if default is None else min(default, left)
+
+
+class DeadlineAwareExecutorMixin:
+    """Make an `AgentExecutor` subclass finish before the request deadline.
+
+    Once only the reserve is left, the next step asks the agent for its final
+    answer based on the steps so far instead of planning more tool calls. The
+    loop stops outright when the deadline has passed.
+    """
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        return not expired() and super()._should_continue(iterations, time_elapsed)
+
+    def _wrap_up_result(self, output: Any, intermediate_steps: list, inputs: dict[str, Any]) -> AgentFinish:
+        if isinstance(output, AgentFinish):
+            return output
+        # The agent still wants tools; answer like a stopped agent
+        return self._action_agent.return_stopped_response("force", intermediate_steps, **inputs)
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None) -> Iterator:
+        if not should_wrap_up():
+            yield from super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager)
+            return
+        try:
+            output = self._action_agent.plan(
+                [*intermediate_steps, _WRAP_UP_STEP],
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except Exception as e:
+            print(f"Warning: Could not get a final answer before the deadline: {e}")
+            output = None
+        yield self._wrap_up_result(output, intermediate_steps, inputs)
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None) -> AsyncIterator:
+        if not should_wrap_up():
+            async for step in super()._aiter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager):
+                yield step
+            return
+        try:
+            output = await self._action_agent.aplan(
+                [*intermediate_steps, _WRAP_UP_STEP],
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except Exception as e:
+            print(f"Warning: Could not get a final answer before the deadline: {e}")
+            output = None
+        yield self._wrap_up_result(output, intermediate_steps, inputs)
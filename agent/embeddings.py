@@ -0,0 +1,87 @@
+"""Embedding models for the semantic caches and retrieval memory.
+
+`load_embeddings` resolves an embedder from a short spec string. Model-backed
+embedders need network access or large local models, so whenever one cannot
+be created the offline `HashingEmbeddings` is used instead.
+
+Specs:
+    "hashing"                   offline feature hashing (default)
+    "openai:<model>"            OpenAIEmbeddings, e.g. "openai:text-embedding-3-small"
+    "huggingface:<model>"       HuggingFaceEmbeddings (sentence-transformers), e.g. "huggingface:BAAI/bge-small-zh-v1.5"
+"""
+import hashlib
+import os
+import re
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """Offline embeddings from hashed word unigrams, bigrams and character trigrams.
+
+    Paraphrases that share most of their words and word pieces end up close
+    in cosine similarity, which is enough to catch reworded questions without
+    any model. Vectors are L2-normalized.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = _WORD.findall(text.lower())
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return features
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            # Whole words carry more meaning than character pieces
+            vector[bucket] += sign * (2.0 if feature[0] != "c" else 1.0)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def load_embeddings(spec: Optional[str] = None) -> Embeddings:
+    """Create an embedder from a spec, falling back to `HashingEmbeddings`.
+
+    Args:
+        spec: Embedder spec (see module docstring); defaults to AGENT_EMBEDDINGS or "hashing"
+
+    Returns:
+        Embeddings: The requested embedder, or the offline fallback
+    """
+    spec = spec or os.environ.get("AGENT_EMBEDDINGS", "hashing")
+    kind, _, model = spec.partition(":")
+    try:
+        if kind == "openai":
+            from langchain_openai import OpenAIEmbeddings
+
+            return OpenAIEmbeddings(model=model or "text-embedding-3-small")
+        if kind == "huggingface":
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            return HuggingFaceEmbeddings(model_name=model, encode_kwargs={"normalize_embeddings": True})
+        if kind != "hashing":
+            print(f"Warning: Unknown embeddings '{spec}'. Falling back to offline hashing embeddings.")
+    except Exception as e:
+        print(f"Warning: Could not initialize embeddings '{spec}': {e}. Falling back to offline hashing embeddings.")
+    return HashingEmbeddings()
@@ -0,0 +1,137 @@
+"""Keyed agent factory with LRU eviction.
+
+Streamlit reruns the whole script on every widget interaction, which used to
+rebuild the LLM, every tool and the prompts each time. The factory keeps built
+agents keyed by (tool set, strategy, model) so reruns reuse a warm agent and
+only new configurations pay the construction cost.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import Runnable
+
+AgentKey = tuple[tuple[str, ...], str, str]
+
+
+class AgentFactory:
+    """Build agents on demand and keep the most recently used ones warm."""
+
+    def __init__(self, max_size: int = 8, builder: Optional[Callable[..., "Runnable"]] = None):
+        """Initialize the factory.
+
+        Args:
+            max_size: Maximum number of built agents kept in the cache
+            builder: Callable with the signature of `load_agent`; defaults to it
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._builder = builder
+        self._agents: OrderedDict[AgentKey, "Runnable"] = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per key so concurrent sessions asking for the same
+        # configuration build it once, while different keys build in parallel
+        self._build_locks: dict[AgentKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(tool_names: list[str], strategy: str, model_name: str) -> AgentKey:
+        """Return the cache key for an agent configuration."""
+        return (tuple(tool_names), strategy, model_name)
+
+    def get(self, tool_names: list[str], strategy: str = "zero-shot-react", model_name: str = "gpt-3.5-turbo") -> "Runnable":
+        """Return a cached agent for the configuration, building it on a miss.
+
+        Args:
+            tool_names: List of tool names to load
+            strategy: Reasoning strategy passed to `load_agent`
+            model_name: Model name passed to `load_agent`
+
+        Returns:
+            Runnable: The warm agent for this configuration
+        """
+        key = self.make_key(tool_names, strategy, model_name)
+        with self._lock:
+            if key in self._agents:
+                self._agents.move_to_end(key)
+                self.hits += 1
+                return self._agents[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another thread may have finished building while we waited
+            with self._lock:
+                if key in self._agents:
+                    self._agents.move_to_end(key)
+                    self.hits += 1
+                    return self._agents[key]
+                self.misses += 1
+
+            agent = self._build(list(tool_names), strategy, model_name)
+
+            with self._lock:
+                self._agents[key] = agent
+                self._agents.move_to_end(key)
+                while len(self._agents) > self.max_size:
+                    evicted, _ = self._agents.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+                    self.evictions += 1
+                self._build_locks.pop(key, None)
+        return agent
+
+    def invalidate(
+        self,
+        tool_names: Optional[list[str]] = None,
+        strategy: Optional[str] = None,
+        model_name: Optional[str] = None,
+    ) -> int:
+        """Drop cached agents matching every given field.
+
+        Fields left as None match anything, so calling with no arguments
+        clears the whole cache (e.g. after changing API keys).
+
+        Returns:
+            int: Number of agents removed
+        """
+        with self._lock:
+            doomed = [
+                key for key in self._agents
+                if (tool_names is None or key[0] == tuple(tool_names))
+                and (strategy is None or key[1] == strategy)
+                and (model_name is None or key[2] == model_name)
+            ]
+            for key in doomed:
+                del self._agents[key]
+        return len(doomed)
+
+    def stats(self) -> dict[str, int]:
+        """Return cache size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._agents),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _build(self, tool_names: list[str], strategy: str, model_name: str) -> "Runnable":
+        builder = self._builder
+        if builder is None:
+            from agent.agent import load_agent
+            builder = load_agent
+        return builder(tool_names=tool_names, strategy=strategy, model_name=model_name)
+
+
+# Process-wide factory shared by every Streamlit session
+AGENT_FACTORY = AgentFactory(max_size=int(os.environ.get("AGENT_CACHE_SIZE", "8")))
+
+
+def get_agent(tool_names: list[str], strategy: str = "zero-shot-react", model_name: str = "gpt-3.5-turbo") -> "Runnable":
+    """Return a warm agent from the shared factory."""
+    return AGENT_FACTORY.get(tool_names, strategy, model_name)
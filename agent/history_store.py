@@ -0,0 +1,231 @@
+"""Persistent, append-only conversation logs.
+
+Conversations used to live only in process memory and were lost on restart.
+`SessionLog` keeps one append-only log per session on disk. Each message is
+stored as a length-prefixed, zlib-compressed JSON record. A side file holds
+the fixed-size offset of every record, so the message count and any page of
+messages (e.g. the last 50) can be read without scanning the log.
+
+A record is written and synced to the log before its offset is written to
+the index, so a crash mid-append leaves at most an unreferenced tail. Records
+are read at their indexed offsets only, and the next append cuts the log and
+the index back to the last complete record before writing.
+Memories can keep a small JSON state next to the log (e.g. the rolling
+summary of agent/summary_memory.py), replaced atomically on every save.
+
+`PersistentChatMessageHistory` exposes a session log as a LangChain chat
+message history for the memories built by `init_memory`.
+
+Configuration is read from the environment:
+    AGENT_HISTORY_DIR    directory of the session logs; unset keeps conversations in memory only
+"""
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+_LENGTH = struct.Struct(">I")
+_OFFSET = struct.Struct(">Q")
+_SAFE_SESSION_ID = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+
+def is_valid_session_id(session_id: object) -> bool:
+    """Return True if session_id can name a session log: 1-128 letters, digits, "_", "." or "-"."""
+    return isinstance(session_id, str) and bool(_SAFE_SESSION_ID.match(session_id)) and not session_id.startswith(".")
+
+
+class SessionLog:
+    """Directory of append-only, compressed per-session message logs."""
+
+    def __init__(self, directory: Path):
+        """Initialize the store.
+
+        Args:
+            directory: Directory holding `<session>.log` and `<session>.idx` files
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _paths(self, session_id: str) -> tuple[Path, Path]:
+        if not is_valid_session_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return self.directory / f"{session_id}.log", self.directory / f"{session_id}.idx"
+
+    def _state_path(self, session_id: str) -> Path:
+        return self._paths(session_id)[0].with_suffix(".state")
+
+    def _lock(self, session_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]) -> None:
+        """Append messages to the log of session_id."""
+        if not messages:
+            return
+        log_path, index_path = self._paths(session_id)
+        with self._lock(session_id), open(log_path, "ab") as log, open(index_path, "ab") as index:
+            offset = self._repair(log, index)
+            offsets = []
+            for message in messages:
+                record = zlib.compress(json.dumps(message_to_dict(message), ensure_ascii=False).encode("utf-8"))
+                log.write(_LENGTH.pack(len(record)) + record)
+                offsets.append(_OFFSET.pack(offset))
+                offset += _LENGTH.size + len(record)
+            log.flush()
+            os.fsync(log.fileno())
+            index.write(b"".join(offsets))
+            index.flush()
+            os.fsync(index.fileno())
+
+    @staticmethod
+    def _repair(log: BinaryIO, index: BinaryIO) -> int:
+        # Drop what a crash mid-append left behind: a partial index entry and
+        # log bytes past the last indexed record. Returns the end of the log.
+        count = index.seek(0, os.SEEK_END) // _OFFSET.size
+        index.truncate(count * _OFFSET.size)
+        end = 0
+        if count:
+            with open(index.name, "rb") as reader:
+                reader.seek((count - 1) * _OFFSET.size)
+                (offset,) = _OFFSET.unpack(reader.read(_OFFSET.size))
+            with open(log.name, "rb") as reader:
+                reader.seek(offset)
+                (length,) = _LENGTH.unpack(reader.read(_LENGTH.size))
+            end = offset + _LENGTH.size + length
+        if log.seek(0, os.SEEK_END) != end:
+            log.truncate(end)
+        return end
+
+    def count(self, session_id: str) -> int:
+        """Return the number of messages stored for session_id."""
+        _, index_path = self._paths(session_id)
+        try:
+            return index_path.stat().st_size // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def read(self, session_id: str, start: int = 0, stop: Optional[int] = None) -> list[BaseMessage]:
+        """Return messages start..stop (exclusive) of session_id; negative indices count from the end."""
+        start, stop, _ = slice(start, stop).indices(self.count(session_id))
+        if start >= stop:
+            return []
+        log_path, index_path = self._paths(session_id)
+        with open(index_path, "rb") as index:
+            index.seek(start * _OFFSET.size)
+            offsets = index.read((stop - start) * _OFFSET.size)
+        data = []
+        with open(log_path, "rb") as log:
+            # Seek to every record: unindexed bytes may sit between two records
+            for (offset,) in _OFFSET.iter_unpack(offsets):
+                log.seek(offset)
+                (length,) = _LENGTH.unpack(log.read(_LENGTH.size))
+                data.append(json.loads(zlib.decompress(log.read(length))))
+        return messages_from_dict(data)
+
+    def tail(self, session_id: str, n: int) -> list[BaseMessage]:
+        """Return the last n messages of session_id."""
+        return self.read(session_id, -n) if n > 0 else []
+
+    def load_state(self, session_id: str) -> dict[str, Any]:
+        """Return the state saved for session_id, or {} if there is none."""
+        try:
+            return json.loads(self._state_path(session_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"Warning: Could not read the state of session {session_id}: {e}")
+            return {}
+
+    def save_state(self, session_id: str, state: dict[str, Any]) -> None:
+        """Replace the state saved for session_id."""
+        path = self._state_path(session_id)
+        with self._lock(session_id):
+            path.with_suffix(".tmp").write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+            os.replace(path.with_suffix(".tmp"), path)
+
+    def delete(self, session_id: str) -> None:
+        """Remove the log and state of session_id."""
+        with self._lock(session_id):
+            for path in (*self._paths(session_id), self._state_path(session_id)):
+                path.unlink(missing_ok=True)
+
+
+class PersistentChatMessageHistory(BaseChatMessageHistory):
+    """Chat message history backed by a `SessionLog`.
+
+    Messages are read from disk on first access only; later reads and
+    appends use the in-memory copy. That first access reads every message
+    from `start_at` on, so a memory that replays the whole conversation
+    (the default buffer, or the retrieval memory's index) still loads in
+    time linear in its length; the summary memory starts after the messages
+    its saved summary covers, and `count`/`page` never load the rest.
+    """
+
+    def __init__(self, log: SessionLog, session_id: str):
+        self.log = log
+        self.session_id = session_id
+        self._start = 0
+        self._messages: Optional[list[BaseMessage]] = None
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        if self._messages is None:
+            self._messages = self.log.read(self.session_id, self._start)
+        return self._messages
+
+    def start_at(self, start: int) -> None:
+        """Keep only stored messages from start on in `messages`; earlier ones are not read."""
+        if self._messages is not None:
+            del self._messages[: start - self._start]
+        self._start = start
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.log.append(self.session_id, messages)
+        if self._messages is not None:
+            self._messages.extend(messages)
+
+    def count(self) -> int:
+        """Return the number of stored messages without loading them."""
+        return self.log.count(self.session_id)
+
+    def page(self, start: int = 0, stop: Optional[int] = None) -> list[BaseMessage]:
+        """Return stored messages start..stop without loading the rest."""
+        return self.log.read(self.session_id, start, stop)
+
+    def load_state(self) -> dict[str, Any]:
+        """Return the memory state saved with the session."""
+        return self.log.load_state(self.session_id)
+
+    def save_state(self, state: dict[str, Any]) -> None:
+        """Save memory state with the session."""
+        self.log.save_state(self.session_id, state)
+
+    def clear(self) -> None:
+        self.log.delete(self.session_id)
+        self._start = 0
+        self._messages = []
+
+
+_session_log: Optional[SessionLog] = None
+_session_log_lock = threading.Lock()
+
+
+def get_session_log() -> Optional[SessionLog]:
+    """Return the process-wide session log, or None when AGENT_HISTORY_DIR is unset."""
+    global _session_log
+    directory = os.environ.get("AGENT_HISTORY_DIR")
+    if not directory:
+        return None
+    with _session_log_lock:
+        if _session_log is None:
+            _session_log = SessionLog(Path(directory).expanduser())
+        return _session_log
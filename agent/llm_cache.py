@@ -0,0 +1,155 @@
+"""Exact-match cache of LLM responses.
+
+`create_llm` always uses temperature 0, so identical prompts (planner prompts,
+`LLMMathChain` prompts, repeated ReAct prefixes) produce reusable completions.
+The cache plugs into LangChain's `BaseCache` interface, whose key already
+combines the full serialized message list with the model name and every
+call parameter (temperature, stop words, ...).
+
+The backend is chosen per deployment with AGENT_LLM_CACHE:
+    "memory"  in-process LRU only (default)
+    "sqlite"  persistent, size-bounded cache shared across processes
+    "off"     no caching
+
+Further settings:
+    AGENT_LLM_CACHE_PATH      SQLite file (default ~/.cache/langchain-agent/llm_cache.sqlite)
+    AGENT_LLM_CACHE_MB        size budget in megabytes (default 256)
+    AGENT_LLM_CACHE_ENTRIES   entries kept by the "memory" backend (default 2048)
+    AGENT_LLM_CACHE_TTL_DAYS  days a response stays valid (default 1)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache, InMemoryCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+def _dump_generation(generation: Generation) -> dict[str, Any]:
+    if isinstance(generation, ChatGeneration):
+        return {"message": message_to_dict(generation.message), "info": generation.generation_info}
+    return {"text": generation.text, "info": generation.generation_info}
+
+
+def _load_generation(data: dict[str, Any]) -> Generation:
+    if "message" in data:
+        return ChatGeneration(message=messages_from_dict([data["message"]])[0], generation_info=data["info"])
+    return Generation(text=data["text"], generation_info=data["info"])
+
+
+class BoundedSQLiteCache(BaseCache):
+    """SQLite-backed `BaseCache` with a size budget, LRU eviction and a TTL."""
+
+    def __init__(self, path: Path, max_bytes: int = 256 * 1024 * 1024, ttl: float = 24 * 60 * 60):
+        """Initialize the cache.
+
+        Args:
+            path: SQLite file
+            max_bytes: Size budget; least recently used responses are evicted beyond it
+            ttl: Seconds a response stays valid
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, value TEXT, size INTEGER, created_at REAL, accessed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_responses_accessed ON llm_responses(accessed_at)")
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """Return cached generations for the prompt and LLM parameters."""
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] + self.ttl <= now:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        try:
+            return [_load_generation(generation) for generation in json.loads(row[0])]
+        except Exception:
+            # Entries written by an incompatible LangChain version
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """Store generations for the prompt and LLM parameters."""
+        value = json.dumps([_dump_generation(generation) for generation in return_val], default=str)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, len(value), now, now),
+            )
+            self._evict(now)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._db.execute("DELETE FROM llm_responses")
+
+    def stats(self) -> dict[str, int]:
+        """Return entry count, stored bytes and hit/miss counters."""
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM llm_responses WHERE created_at <= ?", (now - self.ttl,))
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM llm_responses ORDER BY accessed_at"):
+            if excess <= 0:
+                break
+            doomed.append((key,))
+            excess -= size
+        self._db.executemany("DELETE FROM llm_responses WHERE key = ?", doomed)
+
+
+_llm_cache: Optional[BaseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[BaseCache]:
+    """Return the process-wide LLM cache for the configured backend, or None when off."""
+    global _llm_cache
+    backend = os.environ.get("AGENT_LLM_CACHE", "memory")
+    if backend == "off":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            if backend != "sqlite":
+                if backend != "memory":
+                    print(f"Warning: Unknown AGENT_LLM_CACHE '{backend}'. Using the memory backend.")
+                _llm_cache = InMemoryCache(maxsize=int(os.environ.get("AGENT_LLM_CACHE_ENTRIES", "2048")))
+            else:
+                path = os.environ.get(
+                    "AGENT_LLM_CACHE_PATH", Path.home() / ".cache" / "langchain-agent" / "llm_cache.sqlite"
+                )
+                _llm_cache = BoundedSQLiteCache(
+                    path=Path(path),
+                    max_bytes=int(float(os.environ.get("AGENT_LLM_CACHE_MB", "256")) * 1024 * 1024),
+                    ttl=float(os.environ.get("AGENT_LLM_CACHE_TTL_DAYS", "1")) * 24 * 60 * 60,
+                )
+        return _llm_cache
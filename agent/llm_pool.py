@@ -0,0 +1,163 @@
+"""Process-wide pool of LLM clients.
+
+Building a `ChatOpenAI` per `load_agent` call used to create a new HTTP client
+and TLS connection every time. The pool keeps one sync and one async httpx
+client per base URL (with keep-alive connections and a configurable size) and
+one chat model per (model, base URL, parameters), so repeated requests skip
+client and connection setup. Pooled models cap their request timeout at the
+time left until the request deadline (agent/deadline.py).
+
+Async connections belong to the event loop that opened them, and the same
+model is used from the server's loop and from each `asyncio.run` of a batch,
+so the async client keeps a separate connection pool per running loop.
+
+Pool sizing is read from the environment:
+    AGENT_HTTP_POOL_SIZE      maximum open connections per base URL (default 20)
+    AGENT_HTTP_KEEPALIVE      maximum idle keep-alive connections (default 10)
+    AGENT_HTTP_KEEPALIVE_TTL  seconds an idle connection is kept (default 60)
+    AGENT_LLM_POOL_MODELS     chat models kept; least recently used go first (default 32)
+"""
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from agent.deadline import remaining, time_budget
+
+
+class DeadlineChatOpenAI(ChatOpenAI):
+    """`ChatOpenAI` whose request timeout is capped at the time left until the request deadline."""
+
+    def _get_request_payload(self, input_: Any, *, stop: Optional[list[str]] = None, **kwargs: Any) -> dict:
+        if remaining() is not None:
+            # Passed to the OpenAI client as a per-request option
+            kwargs["timeout"] = time_budget(self.request_timeout if isinstance(self.request_timeout, (int, float)) else None)
+        return super()._get_request_payload(input_, stop=stop, **kwargs)
+
+
+class _LoopLocalTransport(httpx.AsyncBaseTransport):
+    """Async transport with one connection pool per running event loop."""
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._transports: dict[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = {}
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                # Connections of closed loops cannot be used or awaited any more
+                for closed in [l for l in self._transports if l.is_closed()]:
+                    del self._transports[closed]
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self.limits)
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class LLMClientPool:
+    """Share HTTP clients and chat models across agents."""
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        max_models: int = 32,
+    ):
+        """Initialize the pool.
+
+        Args:
+            max_connections: Maximum open connections per base URL and event loop
+            max_keepalive_connections: Maximum idle connections kept alive per base URL
+            keepalive_expiry: Seconds an idle connection is kept before closing
+            max_models: Chat models kept; the least recently used is dropped beyond it
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http_clients: dict[Optional[str], tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self.max_models = max_models
+        self._models: OrderedDict[tuple, ChatOpenAI] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def http_clients(self, base_url: Optional[str] = None) -> tuple[httpx.Client, httpx.AsyncClient]:
+        """Return the shared (sync, async) httpx clients for a base URL."""
+        with self._lock:
+            clients = self._http_clients.get(base_url)
+            if clients is None:
+                clients = (
+                    httpx.Client(limits=self.limits, follow_redirects=True),
+                    httpx.AsyncClient(transport=_LoopLocalTransport(self.limits), follow_redirects=True),
+                )
+                self._http_clients[base_url] = clients
+            return clients
+
+    def chat_model(self, model: str, base_url: Optional[str] = None, **kwargs: Any) -> DeadlineChatOpenAI:
+        """Return a shared `ChatOpenAI` for the model, base URL and parameters.
+
+        Args:
+            model: Model name
+            base_url: API base URL; defaults to the OPENAI_BASE_URL environment variable
+            **kwargs: Extra `ChatOpenAI` parameters (must be hashable), e.g. temperature
+
+        Returns:
+            DeadlineChatOpenAI: Chat model backed by the pooled HTTP clients
+        """
+        base_url = base_url or os.environ.get("OPENAI_BASE_URL") or None
+        key = (model, base_url, tuple(sorted(kwargs.items())))
+        with self._lock:
+            llm = self._models.get(key)
+            if llm is not None:
+                self._models.move_to_end(key)
+                return llm
+
+        http_client, http_async_client = self.http_clients(base_url)
+        llm = DeadlineChatOpenAI(
+            model=model,
+            base_url=base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **kwargs,
+        )
+        with self._lock:
+            llm = self._models.setdefault(key, llm)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return llm
+
+    def close(self) -> None:
+        """Close the sync clients and forget every pooled model.
+
+        Async clients are dropped without awaiting `aclose`; their connections
+        are released when they are garbage collected.
+        """
+        with self._lock:
+            for http_client, _ in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._models.clear()
+
+
+LLM_POOL = LLMClientPool(
+    max_connections=int(os.environ.get("AGENT_HTTP_POOL_SIZE", "20")),
+    max_keepalive_connections=int(os.environ.get("AGENT_HTTP_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.environ.get("AGENT_HTTP_KEEPALIVE_TTL", "60")),
+    max_models=int(os.environ.get("AGENT_LLM_POOL_MODELS", "32")),
+)
@@ -0,0 +1,284 @@
+"""Meta-search over several engines at once.
+
+Agents often call `ddg-search`, find the results thin and then call
+`google-search` or `wikipedia` in another turn, paying a full LLM round trip
+per engine. `MetaSearch` queries every configured engine concurrently and
+returns as soon as the engines that answered add up to enough distinct hits,
+every engine has answered or the deadline has passed, whichever comes first;
+engines still running then are left out. The default number of hits is more
+than one engine returns, so the first engine alone never ends a search. Hits from
+different engines that point to the same page or have near-identical titles
+are merged. The merged hits are ranked by reciprocal rank fusion, so pages
+that several engines rank highly come first.
+
+Engines are built by factories in `SEARCH_ENGINES`; an engine whose package
+or credentials are missing is skipped.
+
+Configuration is read from the environment:
+    AGENT_META_SEARCH_ENGINES   comma-separated engines (default "ddg,google,wikipedia")
+    AGENT_META_SEARCH_RESULTS   results per engine and merged results returned (default 8)
+    AGENT_META_SEARCH_ENOUGH    distinct merged hits after which the search returns (default 1.5x the results)
+    AGENT_META_SEARCH_DEADLINE  seconds to wait for engines, capped by the request deadline (default 8)
+"""
+import contextvars
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from langchain_core.tools import ToolException
+
+from agent.deadline import DeadlineExceeded, time_budget
+from agent.metrics import METRICS
+
+# A hit is a dict with "title", "url", "snippet" and "engine"
+Hit = dict[str, str]
+SearchEngine = Callable[[str, int], list[Hit]]
+EngineFactory = Callable[[], Optional[SearchEngine]]
+
+# Constant of reciprocal rank fusion; larger values flatten the rank bonus
+RRF_K = 60
+
+# Title similarity above which two hits are treated as the same page
+TITLE_SIMILARITY = 0.8
+
+# Engine queries outlive a search that returned at its deadline, so the pool
+# is shared rather than created per search
+_SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="meta-search")
+
+
+def _ddg_engine() -> Optional[SearchEngine]:
+    try:
+        import ddgs  # noqa: F401
+    except ImportError:
+        return None
+    from agent.ddg_client import get_ddg_client
+
+    def search(query: str, max_results: int) -> list[Hit]:
+        return [
+            {"title": r.get("title", ""), "url": r.get("href", ""), "snippet": r.get("body", ""), "engine": "ddg"}
+            for r in get_ddg_client().text(query, max_results=max_results)
+        ]
+
+    return search
+
+
+def _google_engine() -> Optional[SearchEngine]:
+    if not (os.environ.get("GOOGLE_API_KEY") and os.environ.get("GOOGLE_CSE_ID")):
+        return None
+    try:
+        from langchain_google_community import GoogleSearchAPIWrapper
+    except ImportError:
+        try:
+            from langchain_community.utilities.google_search import GoogleSearchAPIWrapper
+        except ImportError:
+            return None
+    wrapper = GoogleSearchAPIWrapper()
+
+    def search(query: str, max_results: int) -> list[Hit]:
+        return [
+            {"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", ""), "engine": "google"}
+            for r in wrapper.results(query, max_results)
+            if "link" in r  # the wrapper reports "no results" as a hit without a link
+        ]
+
+    return search
+
+
+def _wikipedia_engine() -> Optional[SearchEngine]:
+    import requests
+
+    # One search request returns titles and snippets; the session keeps the connection open
+    session = requests.Session()
+    session.headers["User-Agent"] = "langchain-agent meta-search"
+
+    def search(query: str, max_results: int) -> list[Hit]:
+        response = session.get(
+            "https://en.wikipedia.org/w/api.php",
+            params={"action": "query", "list": "search", "srsearch": query, "srlimit": max_results, "format": "json"},
+            timeout=5,
+        )
+        response.raise_for_status()
+        return [
+            {
+                "title": r["title"],
+                "url": "https://en.wikipedia.org/wiki/" + r["title"].replace(" ", "_"),
+                "snippet": re.sub(r"<[^>]+>", "", r.get("snippet", "")),
+                "engine": "wikipedia",
+            }
+            for r in response.json().get("query", {}).get("search", [])
+        ]
+
+    return search
+
+
+# Registry of search engine factories; a factory returns None when its engine is unavailable
+SEARCH_ENGINES: dict[str, EngineFactory] = {
+    "ddg": _ddg_engine,
+    "google": _google_engine,
+    "wikipedia": _wikipedia_engine,
+}
+
+
+def _url_key(url: str) -> str:
+    parts = urlsplit(url.lower())
+    host = parts.netloc.removeprefix("www.").removeprefix("m.")
+    return host + parts.path.rstrip("/") + (f"?{parts.query}" if parts.query else "")
+
+
+def _title_tokens(title: str) -> frozenset[str]:
+    # Drop site suffixes such as " - Wikipedia" or " | Example" before comparing
+    title = re.split(r"\s[-|–—]\s", title)[0]
+    return frozenset(re.findall(r"\w+", title.lower()))
+
+
+def _similar(a: frozenset[str], b: frozenset[str]) -> bool:
+    return bool(a and b) and len(a & b) / len(a | b) >= TITLE_SIMILARITY
+
+
+def merge_results(results: dict[str, list[Hit]]) -> list[Hit]:
+    """Merge the ranked hits of several engines into one ranked list.
+
+    Hits with the same normalized URL or near-identical titles are merged;
+    the merged hit keeps the longest snippet and lists every engine that
+    returned it. Each engine adds 1 / (RRF_K + rank) to a hit's score.
+
+    Args:
+        results: Hits of each engine in the engine's own order
+
+    Returns:
+        list[Hit]: Distinct hits, best first, with "engines" instead of "engine"
+    """
+    merged: list[dict] = []
+    by_url: dict[str, dict] = {}
+    for engine, hits in results.items():
+        for rank, hit in enumerate(hits, 1):
+            url_key = _url_key(hit["url"])
+            tokens = _title_tokens(hit["title"])
+            entry = by_url.get(url_key) or next((m for m in merged if _similar(m["tokens"], tokens)), None)
+            if entry is None:
+                entry = {"title": hit["title"], "url": hit["url"], "snippet": hit["snippet"], "engines": [], "score": 0.0, "tokens": tokens}
+                merged.append(entry)
+            by_url[url_key] = entry
+            if engine not in entry["engines"]:
+                entry["engines"].append(engine)
+                entry["score"] += 1 / (RRF_K + rank)
+            if len(hit["snippet"]) > len(entry["snippet"]):
+                entry["snippet"] = hit["snippet"]
+    merged.sort(key=lambda m: m["score"], reverse=True)
+    return [{k: v for k, v in m.items() if k != "tokens"} for m in merged]
+
+
+class MetaSearch:
+    """Query several search engines concurrently and merge their results."""
+
+    def __init__(
+        self,
+        engines: dict[str, SearchEngine],
+        max_results: int = 8,
+        deadline: float = 8.0,
+        enough_results: Optional[int] = None,
+    ):
+        """Initialize the meta-search.
+
+        Args:
+            engines: Search functions by engine name
+            max_results: Results asked of each engine and merged results returned
+            deadline: Seconds after which the search returns with what it has
+            enough_results: Distinct merged hits after which the search returns
+                without waiting for the other engines; defaults to 1.5 * max_results
+        """
+        if not engines:
+            raise ValueError("MetaSearch needs at least one engine")
+        self.engines = engines
+        self.max_results = max_results
+        self.deadline = deadline
+        self.enough_results = enough_results if enough_results is not None else max_results + max_results // 2
+
+    def search(self, query: str) -> list[Hit]:
+        """Return the merged hits of the engines that answered before the search returned.
+
+        Raises:
+            ToolException: If no engine answered, because each failed or ran out of time
+        """
+        try:
+            give_up_at = time.monotonic() + time_budget(self.deadline)
+        except DeadlineExceeded as e:
+            raise ToolException(f"Search failed: {e}") from e
+        # Each engine runs in a copy of the caller's context, so it sees the request deadline
+        futures: dict[Future, str] = {
+            _SEARCH_EXECUTOR.submit(contextvars.copy_context().run, engine, query, self.max_results): name
+            for name, engine in self.engines.items()
+        }
+        results: dict[str, list[Hit]] = {}
+        errors: dict[str, str] = {}
+        merged: list[Hit] = []
+        pending = set(futures)
+        while pending and len(merged) < self.enough_results:
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+                    METRICS.inc("agent_search_failures_total", engine=name, reason="error")
+            # Keep engine order stable so equal scores rank the same way every time
+            merged = merge_results({name: results[name] for name in self.engines if name in results})
+        for future in pending:
+            future.cancel()
+            if len(merged) < self.enough_results:
+                errors[futures[future]] = "no answer before the deadline"
+                METRICS.inc("agent_search_deadline_total", engine=futures[future])
+        if not results:
+            # Raised rather than returned, so the tool cache does not store it
+            raise ToolException("Search failed: " + "; ".join(f"{name}: {error}" for name, error in errors.items()))
+        return merged[: self.max_results]
+
+    def run(self, query: str) -> str:
+        """Search and format the hits for an agent."""
+        hits = self.search(query)
+        if not hits:
+            return f"No results found for '{query}'."
+        return "\n\n".join(
+            f"{i}. {hit['title']} [{', '.join(hit['engines'])}]\n{hit['url']}\n{hit['snippet']}"
+            for i, hit in enumerate(hits, 1)
+        )
+
+
+_meta_search: Optional[MetaSearch] = None
+_meta_search_lock = threading.Lock()
+
+
+def get_meta_search() -> Optional[MetaSearch]:
+    """Return the process-wide meta-search, or None when no configured engine is available."""
+    global _meta_search
+    with _meta_search_lock:
+        if _meta_search is None:
+            engines = {}
+            for name in os.environ.get("AGENT_META_SEARCH_ENGINES", "ddg,google,wikipedia").split(","):
+                factory = SEARCH_ENGINES.get(name.strip())
+                if factory is None:
+                    print(f"Warning: Search engine '{name.strip()}' not found.")
+                    continue
+                engine = factory()
+                if engine is None:
+                    print(f"Info: Search engine '{name.strip()}' is not available for meta-search.")
+                    continue
+                engines[name.strip()] = engine
+            if not engines:
+                return None
+            enough = os.environ.get("AGENT_META_SEARCH_ENOUGH")
+            _meta_search = MetaSearch(
+                engines,
+                max_results=int(os.environ.get("AGENT_META_SEARCH_RESULTS", "8")),
+                deadline=float(os.environ.get("AGENT_META_SEARCH_DEADLINE", "8")),
+                enough_results=int(enough) if enough else None,
+            )
+        return _meta_search
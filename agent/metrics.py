@@ -0,0 +1,418 @@
+"""Latency, token and error metrics for agent runs.
+
+`MetricsCallbackHandler` is passed in the callbacks of every agent request
+(see `app/app.py`, `agent/server.py` and `agent/batch.py`) and records into
+the process-wide `METRICS` registry:
+
+    agent_llm_latency_seconds{model,scope}             duration of each LLM call
+    agent_llm_ttft_seconds{model,scope}                time to the first streamed token
+    agent_llm_tokens_total{model,scope,direction}      prompt ("in") and completion ("out") tokens
+    agent_llm_errors_total{model,scope}                failed LLM calls
+    agent_tool_latency_seconds{tool,scope}             duration of each tool call
+    agent_tool_errors_total{tool,scope}                failed tool calls, including errors the tool reported as its result
+    agent_request_latency_seconds                      duration of each request
+    agent_request_tokens{direction}                    tokens used per request
+    agent_request_steps                                agent actions per request
+    agent_request_llm_calls / agent_request_tool_calls calls per request
+    agent_request_errors_total                         failed requests
+    agent_request_abandoned_total                      requests dropped after STALE_RUN_SECONDS without an end
+
+`scope` is the tool a call ran inside (e.g. "Self-ask agent" for the nested
+`critical_search` agent), or "agent" for calls made by the agent itself.
+
+Runs of cancelled or abandoned requests never report an end; they are
+dropped once they are older than STALE_RUN_SECONDS.
+
+The registry exports the Prometheus text format (`to_prometheus`) and JSON
+snapshots (`snapshot`, `write_snapshot`).
+"""
+import bisect
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+# Runs still open after this many seconds are treated as abandoned
+STALE_RUN_SECONDS = 3600
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus model."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return (upper bound, cumulative count) pairs including +Inf."""
+        total, result = 0, []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+        self._buckets: dict[str, Sequence[float]] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help: str, buckets: Optional[Sequence[float]] = None) -> None:
+        """Set the help text (and histogram buckets) of a metric."""
+        with self._lock:
+            self._help[name] = help
+            if buckets is not None:
+                self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Increase a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record a value in a histogram."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return every metric as JSON-serializable data."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        "sum": h.sum,
+                        "buckets": dict(h.cumulative()),
+                    }
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def write_snapshot(self, path: Path) -> None:
+        """Write `snapshot()` as JSON to path."""
+        Path(path).write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def to_prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += self._header(name, "counter")
+                lines += [f"{name}{_format_labels(key)} {value}" for key, value in series.items()]
+            for name, series in sorted(self._histograms.items()):
+                lines += self._header(name, "histogram")
+                for key, h in series.items():
+                    for bound, count in h.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {h.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, kind: str) -> list[str]:
+        header = [f"# TYPE {name} {kind}"]
+        if name in self._help:
+            header.insert(0, f"# HELP {name} {self._help[name]}")
+        return header
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+def llm_token_usage(response: Any) -> tuple[int, int]:
+    """Return (prompt, completion) tokens reported in an `LLMResult`."""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not prompt and not completion:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+class _Run:
+    __slots__ = ("root", "scope", "outer_scope", "start", "name", "first_token")
+
+    def __init__(self, root: UUID, scope: str, name: str = ""):
+        self.root = root
+        # Scope of calls made inside this run, and scope of the run itself
+        self.scope = self.outer_scope = scope
+        self.name = name
+        self.start = time.perf_counter()
+        self.first_token = False
+
+
+class _Request:
+    __slots__ = ("start", "tokens_in", "tokens_out", "steps", "llm_calls", "tool_calls")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.tokens_in = self.tokens_out = self.steps = self.llm_calls = self.tool_calls = 0
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record LLM, tool and request metrics of every run it is attached to.
+
+    One instance can serve any number of concurrent requests; runs are
+    tracked by run id.
+    """
+
+    run_inline = True
+
+    def __init__(self, registry: MetricsRegistry, stale_after: float = STALE_RUN_SECONDS):
+        """Initialize the handler.
+
+        Args:
+            registry: Registry the metrics are recorded into
+            stale_after: Seconds after which runs that never ended are dropped
+        """
+        self.registry = registry
+        self.stale_after = stale_after
+        self._runs: dict[UUID, _Run] = {}
+        self._requests: dict[UUID, _Request] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.perf_counter() + stale_after
+
+    # Run bookkeeping
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str = "") -> _Run:
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+            if parent is None:
+                run = _Run(run_id, "agent", name)
+                if run.start >= self._next_sweep:
+                    self._sweep(run.start)
+                self._requests[run_id] = _Request()
+            else:
+                run = _Run(parent.root, parent.scope, name)
+            self._runs[run_id] = run
+            return run
+
+    def _sweep(self, now: float) -> None:
+        # Called with the lock held, at most every stale_after / 10 seconds
+        self._next_sweep = now + self.stale_after / 10
+        cutoff = now - self.stale_after
+        for run_id in [run_id for run_id, run in self._runs.items() if run.start < cutoff]:
+            del self._runs[run_id]
+        abandoned = [run_id for run_id, request in self._requests.items() if request.start < cutoff]
+        for run_id in abandoned:
+            del self._requests[run_id]
+        if abandoned:
+            self.registry.inc("agent_request_abandoned_total", len(abandoned))
+
+    def _end(self, run_id: UUID) -> tuple[Optional[_Run], Optional[_Request]]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            request = self._requests.get(run.root) if run else None
+            return run, request
+
+    def _finish_request(self, run_id: UUID, error: bool) -> None:
+        with self._lock:
+            request = self._requests.pop(run_id, None)
+        if request is None:
+            return
+        self.registry.observe("agent_request_latency_seconds", time.perf_counter() - request.start)
+        self.registry.observe("agent_request_tokens", request.tokens_in, direction="in")
+        self.registry.observe("agent_request_tokens", request.tokens_out, direction="out")
+        self.registry.observe("agent_request_steps", request.steps)
+        self.registry.observe("agent_request_llm_calls", request.llm_calls)
+        self.registry.observe("agent_request_tool_calls", request.tool_calls)
+        if error:
+            self.registry.inc("agent_request_errors_total")
+
+    # Chains
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        run, _ = self._end(run_id)
+        if run is not None and run.root == run_id:
+            self._finish_request(run_id, error=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run, _ = self._end(run_id)
+        if run is not None and run.root == run_id:
+            self._finish_request(run_id, error=True)
+
+    def on_agent_action(self, action, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            request = self._requests.get(run.root) if run else None
+            if request is not None:
+                request.steps += 1
+
+    # LLMs
+
+    @staticmethod
+    def _model_name(serialized: Optional[dict[str, Any]], metadata: Optional[dict[str, Any]], kwargs: dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        return str(
+            (metadata or {}).get("ls_model_name")
+            or params.get("model_name")
+            or params.get("model")
+            or (serialized or {}).get("name")
+            or "unknown"
+        )
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata=None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, self._model_name(serialized, metadata, kwargs))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata=None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, self._model_name(serialized, metadata, kwargs))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run.first_token:
+                return
+            run.first_token = True
+        self.registry.observe("agent_llm_ttft_seconds", time.perf_counter() - run.start, model=run.name, scope=run.scope)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        run, request = self._end(run_id)
+        if run is None:
+            return
+        labels = {"model": run.name, "scope": run.scope}
+        self.registry.observe("agent_llm_latency_seconds", time.perf_counter() - run.start, **labels)
+        tokens_in, tokens_out = llm_token_usage(response)
+        self.registry.inc("agent_llm_tokens_total", tokens_in, direction="in", **labels)
+        self.registry.inc("agent_llm_tokens_total", tokens_out, direction="out", **labels)
+        if request is not None:
+            with self._lock:
+                request.llm_calls += 1
+                request.tokens_in += tokens_in
+                request.tokens_out += tokens_out
+        if run.root == run_id:
+            self._finish_request(run_id, error=False)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run, _ = self._end(run_id)
+        if run is None:
+            return
+        self.registry.inc("agent_llm_errors_total", model=run.name, scope=run.scope)
+        if run.root == run_id:
+            self._finish_request(run_id, error=True)
+
+    # Tools
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        name = str((serialized or {}).get("name") or kwargs.get("name") or "unknown")
+        # Calls made inside the tool (e.g. a nested agent) are attributed to it
+        self._start(run_id, parent_run_id, name).scope = name
+
+    @staticmethod
+    def _tool_labels(run: _Run) -> dict[str, str]:
+        return {"tool": run.name, "scope": run.outer_scope}
+
+    @staticmethod
+    def _is_failure(output: Any) -> bool:
+        # Errors a tool turned into its result (handle_tool_error) end the run normally
+        if getattr(output, "status", None) == "error":
+            return True
+        from agent.tool_cache import FAILURE_PREFIXES
+
+        return isinstance(output, str) and output.startswith(FAILURE_PREFIXES)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run, request = self._end(run_id)
+        if run is None:
+            return
+        if self._is_failure(output):
+            self.registry.inc("agent_tool_errors_total", **self._tool_labels(run))
+        self.registry.observe("agent_tool_latency_seconds", time.perf_counter() - run.start, **self._tool_labels(run))
+        if request is not None:
+            with self._lock:
+                request.tool_calls += 1
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run, request = self._end(run_id)
+        if run is None:
+            return
+        self.registry.inc("agent_tool_errors_total", **self._tool_labels(run))
+        self.registry.observe("agent_tool_latency_seconds", time.perf_counter() - run.start, **self._tool_labels(run))
+        if request is not None:
+            with self._lock:
+                request.tool_calls += 1
+
+
+def _registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.describe("agent_llm_latency_seconds", "Duration of LLM calls.")
+    registry.describe("agent_llm_ttft_seconds", "Time to the first streamed token of LLM calls.")
+    registry.describe("agent_llm_tokens_total", "Tokens sent to and generated by LLMs.")
+    registry.describe("agent_llm_errors_total", "Failed LLM calls.")
+    registry.describe("agent_tool_latency_seconds", "Duration of tool calls.")
+    registry.describe("agent_tool_errors_total", "Failed tool calls.")
+    registry.describe("agent_request_latency_seconds", "Duration of agent requests.")
+    registry.describe("agent_request_tokens", "Tokens used per agent request.", TOKEN_BUCKETS)
+    registry.describe("agent_request_steps", "Agent actions per request.", COUNT_BUCKETS)
+    registry.describe("agent_request_llm_calls", "LLM calls per request.", COUNT_BUCKETS)
+    registry.describe("agent_request_tool_calls", "Tool calls per request.", COUNT_BUCKETS)
+    registry.describe("agent_request_errors_total", "Failed agent requests.")
+    registry.describe("agent_request_abandoned_total", "Requests dropped because they never reported an end.")
+    registry.describe("agent_search_retries_total", "Search queries retried after a rate limit or timeout.")
+    registry.describe("agent_search_throttled_total", "Search queries delayed by the client-side rate limiter.")
+    registry.describe("agent_search_failures_total", "Search queries that failed after their retries.")
+    registry.describe("agent_search_deadline_total", "Engine queries a meta-search stopped waiting for.")
+    registry.describe("agent_scheduler_queue_wait_seconds", "Time requests waited for a scheduler worker.")
+    registry.describe("agent_scheduler_rejected_total", "Requests rejected by the scheduler.")
+    registry.describe("agent_scheduler_expired_total", "Requests whose deadline passed while queued.")
+    return registry
+
+
+# Process-wide registry and the handler that records into it
+METRICS = _registry()
+METRICS_HANDLER = MetricsCallbackHandler(METRICS)
@@ -0,0 +1,280 @@
+"""Plan-and-solve strategy wrapper.
+
+The wrapper exposes `langchain_experimental`'s `PlanAndExecute` chain through
+the same `invoke`/`ainvoke` interface and output shape as the zero-shot
+`AgentExecutor`. Every run gets its own step container, so concurrent runs,
+sync or async, never see each other's steps. Within a run, plan steps that do
+not depend on each other are executed concurrently.
+"""
+import asyncio
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional, Set
+
+from langchain_core.callbacks.manager import (
+    AsyncCallbackManagerForChainRun,
+    CallbackManagerForChainRun,
+)
+from langchain_core.memory import BaseMemory
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_experimental.plan_and_execute import PlanAndExecute
+from langchain_experimental.plan_and_execute.executors.base import BaseExecutor
+from langchain_experimental.plan_and_execute.planners.base import BasePlanner
+from langchain_experimental.plan_and_execute.schema import ListStepContainer, Step, StepResponse
+
+from agent.deadline import should_wrap_up
+from agent.streaming import AnswerStreamingMixin, JsonFinalAnswerParser
+from agent.tracing import SPAN_ATTRIBUTES_KEY, SPAN_KIND_KEY
+
+NO_ANSWER = "未能生成答案，请尝试其他问题或工具。"
+
+# Response of a step skipped because the request deadline was near
+SKIPPED_STEP = "Skipped: the request ran out of time for this step."
+
+# Inherited by every callback below the last plan step, so the final answer
+# tokens can be told apart from the answers of intermediate steps
+FINAL_ANSWER_TAG = "plan_and_execute:final_step"
+
+
+# Explicit references to the output of earlier steps. Common words such as
+# "it", "this" or "result" appear in almost every step and are not enough.
+_REFERS_TO_PREVIOUS = re.compile(
+    r"\b(?:previous|preceding|prior|earlier|above|last)\s+(?:steps?|results?|findings|answers?|outputs?|searche?s?|information)\b"
+    r"|\b(?:the|from)\s+above\b"
+    r"|\b(?:these|those)\s+(?:results|findings|answers|values|numbers|figures)\b"
+    r"|\b(?:gathered|found|obtained|collected)\s+(?:so far|above|earlier|before|previously)\b",
+    re.IGNORECASE,
+)
+_STEP_REFERENCE = re.compile(r"\bsteps?\s+(\d+(?:\s*(?:,|and|-|to)\s*\d+)*)", re.IGNORECASE)
+
+
+def infer_step_dependencies(steps: List[Step]) -> List[Set[int]]:
+    """Infer which earlier steps each plan step depends on.
+
+    References to numbered steps ("using the result of step 2", "steps 1-3")
+    depend on exactly those steps. Steps that refer to earlier output without
+    a number ("the previous step", "based on the above", "these results") and
+    the last step, which answers the question, depend on every earlier step.
+    Anything else is treated as independent.
+
+    Args:
+        steps: Plan steps in order
+
+    Returns:
+        List[Set[int]]: Indices of the steps each step depends on
+    """
+    dependencies: List[Set[int]] = []
+    for index, step in enumerate(steps):
+        deps: Set[int] = set()
+        for match in _STEP_REFERENCE.finditer(step.value):
+            numbers = [int(n) for n in re.findall(r"\d+", match.group(1))]
+            if re.search(r"-|to", match.group(1)) and len(numbers) == 2:
+                numbers = list(range(numbers[0], numbers[1] + 1))
+            deps.update(n - 1 for n in numbers if 0 < n <= index)
+        if not deps and (index == len(steps) - 1 or _REFERS_TO_PREVIOUS.search(step.value)):
+            deps = set(range(index))
+        dependencies.append(deps)
+    return dependencies
+
+
+class PlanAndExecuteChain(PlanAndExecute):
+    """`PlanAndExecute` that runs independent plan steps concurrently.
+
+    Each step starts as soon as the steps it depends on (see
+    `infer_step_dependencies`) have finished, and sees only their results as
+    previous steps. The callbacks of the last step are tagged with
+    FINAL_ANSWER_TAG so its answer can be streamed.
+    """
+
+    max_parallel_steps: int = 4
+    """Maximum number of steps executed at the same time; 1 runs the plan strictly in order."""
+
+    def _plan_callbacks(self, run_manager):
+        if run_manager is None:
+            return None
+        callbacks = run_manager.get_child()
+        callbacks.add_metadata({SPAN_KIND_KEY: "plan"})
+        return callbacks
+
+    def _step_callbacks(self, run_manager, steps: List[Step], index: int):
+        if run_manager is None:
+            return None
+        callbacks = run_manager.get_child()
+        callbacks.add_metadata({SPAN_KIND_KEY: "step", SPAN_ATTRIBUTES_KEY: {"step": steps[index].value}})
+        if index == len(steps) - 1:
+            callbacks.add_tags([FINAL_ANSWER_TAG])
+        return callbacks
+
+    @staticmethod
+    def _out_of_time(index: int, step_count: int) -> bool:
+        # The last step answers the question, so it runs with what is known by then
+        return index < step_count - 1 and should_wrap_up()
+
+    def _dependencies(self, steps: List[Step]) -> List[Set[int]]:
+        if self.max_parallel_steps <= 1:
+            return [set(range(index)) for index in range(len(steps))]
+        return infer_step_dependencies(steps)
+
+    def _step_inputs(self, inputs: Dict[str, Any], steps: List[Step], responses: List[Optional[StepResponse]], index: int, deps: Set[int]) -> Dict[str, Any]:
+        previous_steps = ListStepContainer(steps=[(steps[d], responses[d]) for d in sorted(deps)])
+        _new_inputs = {
+            "previous_steps": previous_steps,
+            "current_step": steps[index],
+            "objective": inputs[self.input_key],
+        }
+        return {**_new_inputs, **inputs}
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        plan = self.planner.plan(inputs, callbacks=self._plan_callbacks(run_manager))
+        if run_manager:
+            run_manager.on_text(str(plan), verbose=self.verbose)
+        steps = plan.steps
+        dependencies = self._dependencies(steps)
+        responses: List[Optional[StepResponse]] = [None] * len(steps)
+
+        def run_step(index: int) -> StepResponse:
+            for dep in dependencies[index]:
+                futures[dep].result()
+            if self._out_of_time(index, len(steps)):
+                response = StepResponse(response=SKIPPED_STEP)
+            else:
+                response = self.executor.step(
+                    self._step_inputs(inputs, steps, responses, index, dependencies[index]),
+                    callbacks=self._step_callbacks(run_manager, steps, index),
+                )
+            if run_manager:
+                run_manager.on_text(f"*****\n\nStep: {steps[index].value}", verbose=self.verbose)
+                run_manager.on_text(f"\n\nResponse: {response.response}", verbose=self.verbose)
+            responses[index] = response
+            return response
+
+        # Steps are submitted in plan order and only wait on earlier steps,
+        # which were picked up by a worker first, so waiting cannot deadlock
+        with ThreadPoolExecutor(max_workers=max(1, self.max_parallel_steps), thread_name_prefix="plan-step") as pool:
+            futures: List[Future] = []
+            for index in range(len(steps)):
+                futures.append(pool.submit(copy_context().run, run_step, index))
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        for step, response in zip(steps, responses):
+            self.step_container.add_step(step, response)
+        return {self.output_key: self.step_container.get_final_response()}
+
+    async def _acall(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        plan = await self.planner.aplan(inputs, callbacks=self._plan_callbacks(run_manager))
+        if run_manager:
+            await run_manager.on_text(str(plan), verbose=self.verbose)
+        steps = plan.steps
+        dependencies = self._dependencies(steps)
+        responses: List[Optional[StepResponse]] = [None] * len(steps)
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel_steps))
+        tasks: List[asyncio.Task] = []
+
+        async def run_step(index: int) -> StepResponse:
+            await asyncio.gather(*(tasks[dep] for dep in dependencies[index]))
+            async with semaphore:
+                if self._out_of_time(index, len(steps)):
+                    response = StepResponse(response=SKIPPED_STEP)
+                else:
+                    response = await self.executor.astep(
+                        self._step_inputs(inputs, steps, responses, index, dependencies[index]),
+                        callbacks=self._step_callbacks(run_manager, steps, index),
+                    )
+            if run_manager:
+                await run_manager.on_text(f"*****\n\nStep: {steps[index].value}", verbose=self.verbose)
+                await run_manager.on_text(f"\n\nResponse: {response.response}", verbose=self.verbose)
+            responses[index] = response
+            return response
+
+        for index in range(len(steps)):
+            tasks.append(asyncio.ensure_future(run_step(index)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        for step, response in zip(steps, responses):
+            self.step_container.add_step(step, response)
+        return {self.output_key: self.step_container.get_final_response()}
+
+
+class PlanAndExecuteWrapper(AnswerStreamingMixin, Runnable):
+    """Run plan-and-execute and normalize its result to {"output", "intermediate_steps"}."""
+
+    answer_parser = JsonFinalAnswerParser
+    answer_tag = FINAL_ANSWER_TAG
+
+    def __init__(
+        self,
+        planner: BasePlanner,
+        executor: BaseExecutor,
+        memory: Optional[BaseMemory] = None,
+        max_parallel_steps: int = 4,
+    ):
+        self.planner = planner
+        self.executor = executor
+        self.plan_and_execute = PlanAndExecuteChain(
+            planner=planner,
+            executor=executor,
+            max_parallel_steps=max_parallel_steps,
+            verbose=True
+        )
+        self.plan_and_execute.memory = memory
+
+    @property
+    def memory(self) -> Optional[BaseMemory]:
+        return self.plan_and_execute.memory
+
+    def _new_run(self) -> PlanAndExecuteChain:
+        """Return a copy of the chain with a fresh step container for one run."""
+        return self.plan_and_execute.model_copy(update={"step_container": ListStepContainer()})
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> Dict[str, Any]:
+        original_question = input.get("input", "")
+        chain = self._new_run()
+        result = chain.invoke({"input": original_question}, config)
+        return self._format_result(result, chain.step_container)
+
+    async def ainvoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> Dict[str, Any]:
+        """Plan and execute without blocking the event loop.
+
+        Planning and every step go through the async LLM and tool paths
+        (`aplan`/`astep`), so many runs can share one event loop.
+        """
+        original_question = input.get("input", "")
+        chain = self._new_run()
+        result = await chain.ainvoke({"input": original_question}, config)
+        return self._format_result(result, chain.step_container)
+
+    @staticmethod
+    def _format_result(result: Dict[str, Any], step_container: ListStepContainer) -> Dict[str, Any]:
+        intermediate_steps = [
+            {"step": step.value, "response": response.response}
+            for step, response in step_container.get_steps()
+        ]
+        if "output" not in result or not result["output"]:
+            for step in reversed(intermediate_steps):
+                if step["response"]:
+                    result["output"] = step["response"]
+                    break
+
+        return {
+            "output": result.get("output") or NO_ANSWER,
+            "intermediate_steps": intermediate_steps,
+        }
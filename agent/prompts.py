@@ -0,0 +1,254 @@
+"""Offline, versioned prompt registry.
+
+Agent construction used to call `hub.pull` for every build, which put a
+network round trip on the hot path and broke air-gapped deployments. Prompts
+are now resolved locally in this order:
+
+1. the version pinned for the prompt (from the on-disk pin file), looked up in
+   the on-disk cache or the bundled defaults;
+2. the bundled default shipped with this module.
+
+The hub is only contacted by an explicit `sync_prompt` call, e.g.
+`python -m agent.prompts sync hwchase17/react --pin`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.prompts import PromptTemplate
+
+BUNDLED_VERSION = "bundled"
+
+# Local copy of https://smith.langchain.com/hub/hwchase17/react
+REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+# Local copy of https://smith.langchain.com/hub/hwchase17/self-ask-with-search
+SELF_ASK_WITH_SEARCH_TEMPLATE = """Question: Who lived longer, Muhammad Ali or Alan Turing?
+Are follow up questions needed here: Yes.
+Follow up: How old was Muhammad Ali when he died?
+Intermediate answer: Muhammad Ali was 74 years old when he died.
+Follow up: How old was Alan Turing when he died?
+Intermediate answer: Alan Turing was 41 years old when he died.
+So the final answer is: Muhammad Ali
+
+Question: When was the founder of craigslist born?
+Are follow up questions needed here: Yes.
+Follow up: Who was the founder of craigslist?
+Intermediate answer: Craigslist was founded by Craig Newmark.
+Follow up: When was Craig Newmark born?
+Intermediate answer: Craig Newmark was born on December 6, 1952.
+So the final answer is: December 6, 1952
+
+Question: Who was the maternal grandfather of George Washington?
+Are follow up questions needed here: Yes.
+Follow up: Who was the mother of George Washington?
+Intermediate answer: The mother of George Washington was Mary Ball Washington.
+Follow up: Who was the father of Mary Ball Washington?
+Intermediate answer: The father of Mary Ball Washington was Joseph Ball.
+So the final answer is: Joseph Ball
+
+Question: Are both the directors of Jaws and Casino Royale from the same country?
+Are follow up questions needed here: Yes.
+Follow up: Who is the director of Jaws?
+Intermediate answer: The director of Jaws is Steven Spielberg.
+Follow up: Where is Steven Spielberg from?
+Intermediate answer: The United States.
+Follow up: Who is the director of Casino Royale?
+Intermediate answer: The director of Casino Royale is Martin Campbell.
+Follow up: Where is Martin Campbell from?
+Intermediate answer: New Zealand.
+So the final answer is: No
+
+Question: {input}
+Are followup questions needed here:{agent_scratchpad}"""
+
+BUNDLED_PROMPTS: dict[str, str] = {
+    "hwchase17/react": REACT_TEMPLATE,
+    "hwchase17/self-ask-with-search": SELF_ASK_WITH_SEARCH_TEMPLATE,
+}
+
+PROMPT_CACHE_DIR = Path(
+    os.environ.get("AGENT_PROMPT_CACHE_DIR", Path.home() / ".cache" / "langchain-agent" / "prompts")
+)
+
+
+class PromptRegistry:
+    """Resolve prompts from bundled defaults and an on-disk versioned cache."""
+
+    def __init__(self, cache_dir: Path = PROMPT_CACHE_DIR, bundled: Optional[dict[str, str]] = None):
+        """Initialize the registry.
+
+        Args:
+            cache_dir: Directory holding cached prompt versions and the pin file
+            bundled: Mapping of prompt name to bundled template
+        """
+        self.cache_dir = Path(cache_dir)
+        self.bundled = dict(BUNDLED_PROMPTS if bundled is None else bundled)
+        self._loaded: dict[tuple[str, str], PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pin_file(self) -> Path:
+        return self.cache_dir / "pins.json"
+
+    def get(self, name: str, version: Optional[str] = None) -> PromptTemplate:
+        """Return a prompt without any network I/O.
+
+        Args:
+            name: Prompt name in hub format, e.g. "hwchase17/react"
+            version: Explicit version; defaults to the pinned version, then the bundled one
+
+        Returns:
+            PromptTemplate: The resolved prompt
+
+        Raises:
+            KeyError: If the prompt or requested version is not available locally
+        """
+        version = version or self.pins().get(name) or BUNDLED_VERSION
+        key = (name, version)
+        prompt = self._loaded.get(key)
+        if prompt is None:
+            template = self._read_template(name, version)
+            prompt = PromptTemplate.from_template(template)
+            prompt.metadata = {"prompt_name": name, "prompt_version": version}
+            with self._lock:
+                prompt = self._loaded.setdefault(key, prompt)
+        return prompt
+
+    def versions(self, name: str) -> list[str]:
+        """List locally available versions of a prompt."""
+        versions = [BUNDLED_VERSION] if name in self.bundled else []
+        prompt_dir = self._prompt_dir(name)
+        if prompt_dir.is_dir():
+            versions += sorted(p.stem for p in prompt_dir.glob("*.json"))
+        return versions
+
+    def pins(self) -> dict[str, str]:
+        """Return the pinned version for each prompt name."""
+        try:
+            return json.loads(self.pin_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def pin(self, name: str, version: Optional[str]) -> None:
+        """Pin a prompt to a locally available version, or unpin it with None."""
+        if version is not None and version not in self.versions(name):
+            raise KeyError(f"Prompt '{name}' has no local version '{version}'")
+        pins = self.pins()
+        if version is None:
+            pins.pop(name, None)
+        else:
+            pins[name] = version
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(self.pin_file, json.dumps(pins, indent=2, sort_keys=True))
+
+    def store(self, name: str, template: str, version: Optional[str] = None) -> str:
+        """Save a template to the on-disk cache and return its version."""
+        if version is None:
+            version = hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+        if version == BUNDLED_VERSION:
+            raise ValueError(f"'{BUNDLED_VERSION}' is reserved for bundled prompts")
+        prompt_dir = self._prompt_dir(name)
+        prompt_dir.mkdir(parents=True, exist_ok=True)
+        record = {"name": name, "version": version, "template": template, "stored_at": time.time()}
+        self._atomic_write(prompt_dir / f"{version}.json", json.dumps(record, ensure_ascii=False, indent=2))
+        return version
+
+    def sync(self, name: str, pin: bool = False) -> str:
+        """Pull a prompt from the LangChain hub into the on-disk cache.
+
+        This is the only method that touches the network and is meant to be
+        run ahead of time, never from agent construction.
+
+        Returns:
+            str: The stored version (the hub commit hash when available)
+        """
+        from langchain import hub
+
+        prompt = hub.pull(name)
+        if not isinstance(prompt, PromptTemplate):
+            raise ValueError(f"Prompt '{name}' is a {type(prompt).__name__}, only PromptTemplate is supported")
+        version = self.store(name, prompt.template, (prompt.metadata or {}).get("lc_hub_commit_hash"))
+        if pin:
+            self.pin(name, version)
+        return version
+
+    def _read_template(self, name: str, version: str) -> str:
+        if version == BUNDLED_VERSION:
+            if name not in self.bundled:
+                raise KeyError(f"No bundled prompt named '{name}'")
+            return self.bundled[name]
+        path = self._prompt_dir(name) / f"{version}.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["template"]
+        except FileNotFoundError:
+            raise KeyError(f"Prompt '{name}' version '{version}' is not cached in {self.cache_dir}") from None
+
+    def _prompt_dir(self, name: str) -> Path:
+        return self.cache_dir / name.replace("/", "__")
+
+    @staticmethod
+    def _atomic_write(path: Path, text: str) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+PROMPTS = PromptRegistry()
+
+
+def get_prompt(name: str, version: Optional[str] = None) -> PromptTemplate:
+    """Return a prompt from the shared registry without network I/O."""
+    return PROMPTS.get(name, version)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Manage the local prompt cache from the command line."""
+    parser = argparse.ArgumentParser(description="Manage the local prompt registry.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="Pull prompts from the hub into the local cache")
+    sync.add_argument("names", nargs="*", default=sorted(BUNDLED_PROMPTS))
+    sync.add_argument("--pin", action="store_true", help="Pin the pulled versions")
+    pin = sub.add_parser("pin", help="Pin a prompt to a local version")
+    pin.add_argument("name")
+    pin.add_argument("version", nargs="?", help="Omit to unpin")
+    sub.add_parser("list", help="List local prompt versions and pins")
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        for name in args.names:
+            print(f"{name}: {PROMPTS.sync(name, pin=args.pin)}")
+    elif args.command == "pin":
+        PROMPTS.pin(args.name, args.version)
+    else:
+        pins = PROMPTS.pins()
+        for name in sorted(set(BUNDLED_PROMPTS) | set(pins)):
+            versions = ", ".join(PROMPTS.versions(name))
+            print(f"{name}: {versions} (pinned: {pins.get(name, BUNDLED_VERSION)})")
+
+
+if __name__ == "__main__":
+    main()
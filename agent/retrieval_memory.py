@@ -0,0 +1,166 @@
+"""Retrieval-based long-term conversation memory.
+
+Replaying the whole `chat_history` into every prompt gets slow and expensive
+in long research sessions. `RetrievalMemory` embeds every saved turn into a
+local FAISS index as it is saved and, for each new question, returns only the
+earlier turns most similar to it plus the last few messages.
+
+Selected with AGENT_MEMORY=retrieval (see `init_memory`):
+    AGENT_MEMORY_TOP_K      earlier turns retrieved per question (default 4)
+    AGENT_MEMORY_RECENT     most recent messages always included (default 4)
+    AGENT_EMBEDDINGS        embedder spec, see agent/embeddings.py
+"""
+import os
+import threading
+from typing import Any, Optional
+
+import faiss
+import numpy as np
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage, get_buffer_string
+from pydantic import PrivateAttr
+
+from agent.embeddings import load_embeddings
+
+
+class RetrievalMemory(BaseChatMemory):
+    """Top-k relevant earlier turns plus the most recent messages."""
+
+    embeddings: Any
+    k: int = 4
+    recent_messages: int = 4
+    memory_key: str = "chat_history"
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _index: Optional[faiss.IndexFlatIP] = PrivateAttr(default=None)
+    # Start offset in chat_memory.messages of each indexed turn
+    _turns: list[int] = PrivateAttr(default_factory=list)
+    _restored: bool = PrivateAttr(default=False)
+
+    @property
+    def memory_variables(self) -> list[str]:
+        return [self.memory_key]
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray([self.embeddings.embed_query(text)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _query(self, inputs: dict[str, Any]) -> str:
+        if self.input_key is not None:
+            return str(inputs.get(self.input_key, ""))
+        return str(inputs.get("input", next(iter(inputs.values()), "")))
+
+    def _restore(self) -> None:
+        # Index turns loaded from a persistent history on first use
+        if self._restored:
+            return
+        self._restored = True
+        messages = self.chat_memory.messages
+        # A turn is a question followed by its answer; unanswered questions
+        # and system messages are skipped rather than shifting every later pair
+        starts = [
+            i for i in range(len(messages) - 1)
+            if messages[i].type == "human" and messages[i + 1].type == "ai"
+        ]
+        if not starts:
+            return
+        vectors = np.concatenate([
+            self._embed(get_buffer_string(messages[start:start + 2], human_prefix=self.human_prefix, ai_prefix=self.ai_prefix))
+            for start in starts
+        ])
+        with self._lock:
+            self._index = faiss.IndexFlatIP(vectors.shape[1])
+            self._index.add(vectors)
+            self._turns = starts
+
+    def _select(self, messages: list[BaseMessage], query: str) -> list[BaseMessage]:
+        recent_start = max(len(messages) - self.recent_messages, 0)
+        with self._lock:
+            # Only turns that end before the recent window are candidates
+            candidates = sum(1 for start in self._turns if start + 2 <= recent_start)
+            if self._index is None or candidates == 0 or not query:
+                return messages[recent_start:]
+        # Embedded without the lock, so a slow embedder does not hold up other calls
+        vector = self._embed(query)
+        with self._lock:
+            # Recounted: the memory may have been cleared while embedding
+            candidates = sum(1 for start in self._turns if start + 2 <= recent_start)
+            if self._index is None or candidates == 0:
+                return messages[recent_start:]
+            # Recent turns can rank first, so search past them
+            _, ids = self._index.search(vector, min(len(self._turns), self.k + len(self._turns) - candidates))
+            relevant = [int(i) for i in ids[0] if 0 <= i < candidates][: self.k]
+            starts = sorted(self._turns[i] for i in relevant)
+        retrieved = [message for start in starts for message in messages[start:start + 2]]
+        return retrieved + messages[recent_start:]
+
+    def load_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        """Return the earlier turns relevant to the question followed by the recent messages."""
+        self._restore()
+        selected = self._select(list(self.chat_memory.messages), self._query(inputs))
+        if self.return_messages:
+            return {self.memory_key: selected}
+        return {self.memory_key: get_buffer_string(selected, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    async def aload_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        return self.load_memory_variables(inputs)
+
+    def save_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        """Save the turn and add it to the index."""
+        self._restore()
+        start = len(self.chat_memory.messages)
+        super().save_context(inputs, outputs)
+        turn = get_buffer_string(
+            self.chat_memory.messages[start:], human_prefix=self.human_prefix, ai_prefix=self.ai_prefix
+        )
+        vector = self._embed(turn)
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexFlatIP(vector.shape[1])
+            self._index.add(vector)
+            self._turns.append(start)
+
+    async def asave_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        self.save_context(inputs, outputs)
+
+    def clear(self) -> None:
+        """Clear the messages and the index."""
+        with self._lock:
+            super().clear()
+            self._index = None
+            self._turns = []
+            self._restored = True
+
+    async def aclear(self) -> None:
+        self.clear()
+
+
+_embeddings: Optional[Embeddings] = None
+_embeddings_lock = threading.Lock()
+
+
+def init_retrieval_memory(**kwargs: Any) -> RetrievalMemory:
+    """Create a `RetrievalMemory` configured from the environment.
+
+    The embedder is shared by every conversation.
+
+    Args:
+        **kwargs: Extra fields for the memory, e.g. `chat_memory`
+    """
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = load_embeddings()
+    return RetrievalMemory(
+        embeddings=_embeddings,
+        k=int(os.environ.get("AGENT_MEMORY_TOP_K", "4")),
+        recent_messages=int(os.environ.get("AGENT_MEMORY_RECENT", "4")),
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="output",
+        **kwargs,
+    )
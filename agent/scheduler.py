@@ -0,0 +1,206 @@
+"""Request scheduler with admission control.
+
+Every caller used to run its agent on its own thread with no global limit, so
+a burst of users could exhaust provider rate limits and memory at once.
+`RequestScheduler` runs agent requests on a bounded pool of workers. Requests
+wait in per-user queues that are served round-robin, so one user submitting
+many questions cannot starve the others. When the queues are full a request
+is rejected immediately with `SchedulerSaturated` instead of piling up.
+
+Requests run in a copy of the submitter's context, so context variables such
+as the session scope (agent/session_memory.py) and the request deadline
+(agent/deadline.py) carry over to the worker. A request whose deadline passed
+while it was queued fails with `DeadlineExceeded` without running.
+
+Configuration is read from the environment:
+    AGENT_MAX_CONCURRENT        requests executed at once (default 8)
+    AGENT_MAX_QUEUE             requests waiting across all users (default 64)
+    AGENT_MAX_QUEUE_PER_USER    requests waiting per user (default 4)
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from agent.deadline import DeadlineExceeded, expired
+from agent.metrics import METRICS
+
+
+class SchedulerSaturated(RuntimeError):
+    """Raised when a request is rejected because the queues are full."""
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "context", "future", "enqueued_at")
+
+    def __init__(self, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class RequestScheduler:
+    """Bounded worker pool with per-user fair queues and fast rejection."""
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 64, max_queue_per_user: int = 4, window: int = 1024):
+        """Initialize the scheduler; workers start on the first request.
+
+        Args:
+            max_workers: Requests executed at once
+            max_queue: Requests waiting across all users before new ones are rejected
+            max_queue_per_user: Requests waiting per user before that user's new ones are rejected
+            window: Number of recent queue wait times kept for percentiles
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self._queues: OrderedDict[str, deque[_Job]] = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._condition = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._shutdown = False
+        self._wait_times: deque[float] = deque(maxlen=window)
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.wait_time_total = 0.0
+
+    def submit(self, user: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue fn(*args, **kwargs) on behalf of user.
+
+        Args:
+            user: Key for fairness and per-user limits, e.g. a session id
+            fn: The request, typically `agent.invoke`
+
+        Returns:
+            Future: Resolves to the return value of fn
+
+        Raises:
+            SchedulerSaturated: If the global or per-user queue is full
+        """
+        job = _Job(fn, args, kwargs)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+            queue = self._queues.get(user)
+            if self._queued >= self.max_queue or (queue is not None and len(queue) >= self.max_queue_per_user):
+                self.rejected += 1
+                METRICS.inc("agent_scheduler_rejected_total")
+                raise SchedulerSaturated(
+                    f"Too many pending requests ({self._queued} queued, {self._running} running). Try again later."
+                )
+            if queue is None:
+                queue = self._queues[user] = deque()
+            queue.append(job)
+            self._queued += 1
+            self.submitted += 1
+            self._start_workers()
+            self._condition.notify()
+        return job.future
+
+    def run(self, user: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit a request and block until it finishes; see `submit`."""
+        return self.submit(user, fn, *args, **kwargs).result()
+
+    async def arun(self, user: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit a request and await its result without blocking the event loop; see `submit`."""
+        return await asyncio.wrap_future(self.submit(user, fn, *args, **kwargs))
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue depth, counters and queue wait time in seconds."""
+        with self._condition:
+            waits = sorted(self._wait_times)
+            stats = {
+                "running": self._running,
+                "queued": self._queued,
+                "users_waiting": len(self._queues),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "wait_time_total": self.wait_time_total,
+            }
+        if waits:
+            stats["wait_time_p50"] = waits[len(waits) // 2]
+            stats["wait_time_p95"] = waits[min(int(len(waits) * 0.95), len(waits) - 1)]
+            stats["wait_time_max"] = waits[-1]
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting requests; queued requests still run."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+            workers = list(self._workers)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _start_workers(self) -> None:
+        # Called with the condition held
+        if len(self._workers) >= self.max_workers or len(self._workers) >= self._running + self._queued:
+            return
+        worker = threading.Thread(target=self._work, name=f"agent-scheduler-{len(self._workers)}", daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        # Called with the condition held. Serve users round-robin: take the
+        # first user's oldest job, then move that user to the back.
+        for user, queue in self._queues.items():
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            self._queued -= 1
+            return job
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while (job := self._next_job()) is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                wait = time.monotonic() - job.enqueued_at
+                self._wait_times.append(wait)
+                self.wait_time_total += wait
+                self._running += 1
+            METRICS.observe("agent_scheduler_queue_wait_seconds", wait)
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    if job.context.run(expired):
+                        METRICS.inc("agent_scheduler_expired_total")
+                        job.future.set_exception(DeadlineExceeded("The request deadline passed while it was queued."))
+                        continue
+                    try:
+                        job.future.set_result(job.context.run(job.fn, *job.args, **job.kwargs))
+                    except BaseException as e:
+                        job.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self.completed += 1
+
+
+def _scheduler_from_env() -> RequestScheduler:
+    return RequestScheduler(
+        max_workers=int(os.environ.get("AGENT_MAX_CONCURRENT", "8")),
+        max_queue=int(os.environ.get("AGENT_MAX_QUEUE", "64")),
+        max_queue_per_user=int(os.environ.get("AGENT_MAX_QUEUE_PER_USER", "4")),
+    )
+
+
+# Process-wide scheduler shared by every entry point
+SCHEDULER = _scheduler_from_env()
@@ -0,0 +1,360 @@
+"""Semantic answer cache in front of the agent.
+
+Many users ask paraphrases of the same research question, and each one used
+to trigger a full multi-iteration agent run. `SemanticCache` embeds questions,
+keeps them in a FAISS inner-product index and returns the stored answer of
+the nearest previous question when its cosine similarity is above a
+threshold. `SemanticCachedAgent` puts the cache in front of any agent
+returned by `load_agent`.
+
+Embedding similarity alone does not tell a paraphrase from a question about
+another year or country, so a hit must also mention the same numbers, and
+the offline hashing embedder, which only sees shared words, is limited to
+near-verbatim repeats. Answers are only reused within the same conversation
+context: the last turns of the history are part of the key, so a follow-up
+such as "and in 2020?" never gets an answer given in another conversation.
+Time-sensitive questions (weather, "today", "latest", prices, news) are
+never cached.
+
+Stores only update memory; the index is written to disk on a background
+thread at most every FLUSH_DELAY seconds and when the process exits, so
+lookups never wait on disk I/O.
+
+Configuration is read from the environment:
+    AGENT_SEMANTIC_CACHE              "1" enables the cache in `load_agent` (default "0")
+    AGENT_SEMANTIC_CACHE_DIR          index directory (default ~/.cache/langchain-agent/semantic_cache)
+    AGENT_SEMANTIC_CACHE_THRESHOLD    minimum cosine similarity for a hit (default 0.9, 0.99 with hashing embeddings)
+    AGENT_SEMANTIC_CACHE_ENTRIES      maximum cached answers (default 10000)
+    AGENT_SEMANTIC_CACHE_TTL_DAYS     days an answer stays valid (default 7)
+    AGENT_EMBEDDINGS                  embedder spec, see agent/embeddings.py
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from agent.embeddings import HashingEmbeddings, load_embeddings
+from agent.streaming import AnswerStreamingMixin, FinalAnswerStreamHandler
+
+# Hashing embeddings score "GDP of France in 2019" against "... Germany in
+# 2019" about as high as against a paraphrase, so they only match repeats
+HASHING_THRESHOLD = 0.99
+
+# Messages of the conversation that are part of the cache key
+CONTEXT_MESSAGES = 4
+
+# Seconds between the first unsaved store and the write of the index
+FLUSH_DELAY = 5.0
+
+# Neighbours searched first; widened while other namespaces fill them
+_SEARCH_K = 8
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_TIME_SENSITIVE = re.compile(
+    r"\b(weather|forecast|temperature|today|tonight|tomorrow|yesterday|now|currently|current|latest|recent|"
+    r"this (?:week|month|year)|price|prices|stock|stocks|news)\b",
+    re.IGNORECASE,
+)
+
+
+def is_time_sensitive(question: str) -> bool:
+    """Return True for questions whose answer goes stale quickly, e.g. about the weather or today's news."""
+    return _TIME_SENSITIVE.search(question) is not None
+
+
+def _numbers(text: str) -> list[str]:
+    return sorted(_NUMBER.findall(text))
+
+
+class SemanticCache:
+    """FAISS-backed nearest-neighbour cache of question/answer pairs."""
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        path: Optional[Path] = None,
+        threshold: Optional[float] = None,
+        max_entries: int = 10000,
+        ttl: float = 7 * 24 * 60 * 60,
+    ):
+        """Initialize the cache, loading a persisted index from path if present.
+
+        Args:
+            embeddings: Embedder for questions; defaults to `load_embeddings()`
+            path: Directory for the persisted index; None keeps the cache in memory
+            threshold: Minimum cosine similarity for a hit; defaults to 0.9, or HASHING_THRESHOLD with hashing embeddings
+            max_entries: Maximum number of cached answers; least recently used go first
+            ttl: Seconds an answer stays valid
+        """
+        self.embeddings = embeddings or load_embeddings()
+        self.path = Path(path) if path is not None else None
+        if threshold is None:
+            threshold = HASHING_THRESHOLD if isinstance(self.embeddings, HashingEmbeddings) else 0.9
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: dict[int, dict[str, Any]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # Serializes writes to disk; taken without holding _lock
+        self._save_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        if self.path is not None:
+            self._load()
+            atexit.register(self.flush)
+
+    def lookup(self, question: str, namespace: str = "") -> Optional[dict[str, Any]]:
+        """Return the cached entry closest to question, or None below the threshold.
+
+        Args:
+            question: The user question
+            namespace: Only entries stored under the same namespace can match
+
+        Returns:
+            Optional[dict]: Entry with "question", "answer" and "score", or None
+        """
+        vector = self._embed(question)
+        numbers = _numbers(question)
+        now = time.time()
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0 or self._index.d != vector.shape[1]:
+                self.misses += 1
+                return None
+            checked: set[int] = set()
+            k = min(self._index.ntotal, _SEARCH_K)
+            while True:
+                scores, ids = self._index.search(vector, k)
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if entry_id < 0 or score < self.threshold:
+                        self.misses += 1
+                        return None
+                    # Ties may come back in another order from a wider search
+                    if int(entry_id) in checked:
+                        continue
+                    checked.add(int(entry_id))
+                    entry = self._entries.get(int(entry_id))
+                    if entry is None or not self._matches(entry, namespace, numbers, now):
+                        continue
+                    entry["last_hit"] = now
+                    self.hits += 1
+                    return {"question": entry["question"], "answer": entry["answer"], "score": float(score)}
+                if k == self._index.ntotal:
+                    self.misses += 1
+                    return None
+                # Every neighbour so far was close enough but belongs to another
+                # namespace or question, so a hit may rank further down
+                k = min(self._index.ntotal, k * 4)
+
+    def _matches(self, entry: dict[str, Any], namespace: str, numbers: list[str], now: float) -> bool:
+        if entry["namespace"] != namespace:
+            return False
+        # A question about another year or quantity is a different question
+        if _numbers(entry["question"]) != numbers:
+            return False
+        # Expired entries are dropped on the next store
+        return entry["created_at"] + self.ttl > now
+
+    def store(self, question: str, answer: str, namespace: str = "") -> None:
+        """Cache an answer for a question; the index is persisted in the background."""
+        vector = self._embed(question)
+        now = time.time()
+        with self._lock:
+            if self._index is not None and self._index.d != vector.shape[1]:
+                print("Warning: Embedding size changed. Discarding the semantic cache.")
+                self._index, self._entries = None, {}
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "question": question,
+                "answer": answer,
+                "namespace": namespace,
+                "created_at": now,
+                "last_hit": now,
+            }
+            self._evict(now)
+            self._schedule_flush()
+
+    def clear(self) -> None:
+        """Remove every cached answer."""
+        with self._lock:
+            self._index = None
+            self._entries.clear()
+            self._schedule_flush()
+
+    def flush(self) -> None:
+        """Write unsaved changes to disk now."""
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                if self._flush_timer is None:
+                    return
+                self._flush_timer.cancel()
+                self._flush_timer = None
+                # Copy under the lock; the slow disk writes happen without it
+                index = faiss.serialize_index(self._index) if self._index is not None else None
+                state = {"next_id": self._next_id, "entries": {str(i): dict(e) for i, e in self._entries.items()}}
+            try:
+                self._save(index, state)
+            except OSError as e:
+                print(f"Warning: Could not save semantic cache to {self.path}: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """Return entry count and hit/miss counters."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray([self.embeddings.embed_query(text)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _evict(self, now: float) -> None:
+        expired = {i for i, e in self._entries.items() if e["created_at"] + self.ttl <= now}
+        overflow = len(self._entries) - len(expired) - self.max_entries
+        if overflow > 0:
+            # Least recently hit answers go first
+            live = sorted((e["last_hit"], i) for i, e in self._entries.items() if i not in expired)
+            expired.update(i for _, i in live[:overflow])
+        if expired:
+            self._index.remove_ids(np.array(sorted(expired), dtype=np.int64))
+            for entry_id in expired:
+                del self._entries[entry_id]
+
+    def _schedule_flush(self) -> None:
+        # Called with the lock held
+        if self.path is None or self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _save(self, index: Optional[np.ndarray], state: dict[str, Any]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        index_file, entries_file = self.path / "index.faiss", self.path / "entries.json"
+        if index is None:
+            index_file.unlink(missing_ok=True)
+        else:
+            faiss.write_index(faiss.deserialize_index(index), str(index_file) + ".tmp")
+            os.replace(str(index_file) + ".tmp", index_file)
+        entries_file.with_suffix(".tmp").write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(entries_file.with_suffix(".tmp"), entries_file)
+
+    def _load(self) -> None:
+        index_file, entries_file = self.path / "index.faiss", self.path / "entries.json"
+        if not (index_file.exists() and entries_file.exists()):
+            return
+        try:
+            state = json.loads(entries_file.read_text(encoding="utf-8"))
+            self._index = faiss.read_index(str(index_file))
+            self._entries = {int(i): e for i, e in state["entries"].items()}
+            self._next_id = state["next_id"]
+        except Exception as e:
+            print(f"Warning: Could not load semantic cache from {self.path}: {e}")
+            self._index, self._entries, self._next_id = None, {}, 0
+
+
+class SemanticCachedAgent(AnswerStreamingMixin, Runnable):
+    """Answer from the semantic cache when possible, otherwise run the wrapped agent."""
+
+    def __init__(self, agent: Runnable, cache: SemanticCache, namespace: str = "", is_cacheable: Optional[Callable[[str], bool]] = None):
+        """Initialize the wrapper.
+
+        Args:
+            agent: Agent returned by `load_agent`
+            cache: Shared semantic cache
+            namespace: Separates answers of different agent configurations
+            is_cacheable: Decides whether an answer may be stored; defaults to any non-empty answer
+        """
+        self.agent = agent
+        self.cache = cache
+        self.namespace = namespace
+        self.is_cacheable = is_cacheable or bool
+
+    @property
+    def memory(self):
+        return getattr(self.agent, "memory", None)
+
+    def answer_stream_handler(self, on_token: Callable[[str], None]) -> FinalAnswerStreamHandler:
+        return self.agent.answer_stream_handler(on_token)
+
+    def _key(self, question: str) -> Optional[str]:
+        """Return the namespace to look the question up in, or None if it must not be cached."""
+        if is_time_sensitive(question):
+            return None
+        chat_memory = getattr(self.memory, "chat_memory", None)
+        messages = list(getattr(chat_memory, "messages", None) or [])[-CONTEXT_MESSAGES:]
+        if not messages:
+            return self.namespace
+        context = json.dumps([(m.type, m.content) for m in messages], ensure_ascii=False, default=str)
+        return f"{self.namespace}|{hashlib.sha256(context.encode('utf-8')).hexdigest()[:16]}"
+
+    def _cached_result(self, question: str, hit: dict[str, Any]) -> dict[str, Any]:
+        # Keep the conversation history consistent with an uncached run
+        if self.memory is not None:
+            self.memory.save_context({"input": question}, {"output": hit["answer"]})
+        return {"output": hit["answer"], "intermediate_steps": [], "cache_hit": hit}
+
+    def _store(self, question: str, result: Any, key: Optional[str]) -> None:
+        answer = result.get("output") if isinstance(result, dict) else None
+        if key is not None and isinstance(answer, str) and self.is_cacheable(answer):
+            self.cache.store(question, answer, key)
+
+    def invoke(self, input: dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> dict[str, Any]:
+        question = input.get("input", "")
+        # Taken before the run, which adds this turn to the history
+        key = self._key(question)
+        hit = self.cache.lookup(question, key) if key is not None else None
+        if hit is not None:
+            return self._cached_result(question, hit)
+        result = self.agent.invoke(input, config, **kwargs)
+        self._store(question, result, key)
+        return result
+
+    async def ainvoke(self, input: dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> dict[str, Any]:
+        question = input.get("input", "")
+        key = self._key(question)
+        hit = self.cache.lookup(question, key) if key is not None else None
+        if hit is not None:
+            return self._cached_result(question, hit)
+        result = await self.agent.ainvoke(input, config, **kwargs)
+        self._store(question, result, key)
+        return result
+
+
+_default_cache: Optional[SemanticCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            path = os.environ.get(
+                "AGENT_SEMANTIC_CACHE_DIR", Path.home() / ".cache" / "langchain-agent" / "semantic_cache"
+            )
+            threshold = os.environ.get("AGENT_SEMANTIC_CACHE_THRESHOLD")
+            _default_cache = SemanticCache(
+                path=Path(path),
+                threshold=float(threshold) if threshold else None,
+                max_entries=int(os.environ.get("AGENT_SEMANTIC_CACHE_ENTRIES", "10000")),
+                ttl=float(os.environ.get("AGENT_SEMANTIC_CACHE_TTL_DAYS", "7")) * 24 * 60 * 60,
+            )
+        return _default_cache
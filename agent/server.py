@@ -0,0 +1,271 @@
+"""Headless HTTP API for the agents.
+
+The Streamlit app ties agent execution to its rerun model. This module serves
+the same agent configurations over HTTP so they can run behind a load
+balancer:
+
+    GET  /health                        liveness probe
+    GET  /agents                        available strategies, tools and scheduler stats
+    POST /agents/{strategy}/invoke      run an agent and return the answer as JSON
+    POST /agents/{strategy}/stream      run an agent and stream steps and answer tokens as Server-Sent Events
+    GET  /metrics                       latency, token and error metrics in the Prometheus text format
+    GET  /metrics.json                  the same metrics as a JSON snapshot
+
+Request body (JSON):
+    input         the question (required)
+    tools         tool names (default: ddg-search, wikipedia, arxiv, openweathermap)
+    model         model name (default gpt-3.5-turbo)
+    session_id    conversation to continue: 1-128 letters, digits, "_", "." or "-"
+                  (default: a fresh one per request)
+    timeout       seconds until a best-effort answer is due, including queueing
+                  (default AGENT_REQUEST_TIMEOUT, 120)
+
+The stream emits `step` events for each tool call and its observation,
+`token` events with final-answer text, and a closing `end` (or `error`) event.
+Agents come from the shared `AGENT_FACTORY` and run on the shared
+`SCHEDULER`, so a saturated server answers 429 instead of queueing without
+bound. HTTP keep-alive is on, and LLM connections are pooled by `LLM_POOL`.
+
+Run it with `python -m agent.server --port 8000`.
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from typing import Any, Optional, get_args
+
+from aiohttp import web
+from langchain_core.agents import AgentAction
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent.agent import SUPPORTED_MODELS, ReasoningStrategies
+from agent.deadline import Deadline, DeadlineExceeded, deadline_scope, default_timeout
+from agent.factory import AGENT_FACTORY
+from agent.history_store import is_valid_session_id
+from agent.metrics import METRICS, METRICS_HANDLER
+from agent.scheduler import SCHEDULER, SchedulerSaturated
+from agent.session_memory import session_scope
+from agent.tool_loader import TOOL_FACTORIES
+from agent.tracing import trace_handlers
+
+DEFAULT_TOOLS = ["ddg-search", "wikipedia", "arxiv", "openweathermap"]
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+class _StepEventHandler(BaseCallbackHandler):
+    """Forward tool calls and observations to an event callback."""
+
+    run_inline = True
+
+    def __init__(self, emit):
+        self.emit = emit
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any) -> None:
+        self.emit("step", {"type": "action", "tool": action.tool, "tool_input": action.tool_input})
+
+    def on_tool_end(self, output: Any, *, name: Optional[str] = None, **kwargs: Any) -> None:
+        self.emit("step", {"type": "observation", "tool": name, "output": str(getattr(output, "content", output))})
+
+
+def _jsonable_steps(steps: Any) -> list[Any]:
+    result = []
+    for step in steps or []:
+        if isinstance(step, tuple) and len(step) == 2 and isinstance(step[0], AgentAction):
+            action, observation = step
+            result.append({"tool": action.tool, "tool_input": action.tool_input, "observation": str(observation)})
+        else:
+            result.append(json.loads(json.dumps(step, ensure_ascii=False, default=str)))
+    return result
+
+
+def _format_result(result: Any) -> dict[str, Any]:
+    if not isinstance(result, dict):
+        return {"output": str(result), "intermediate_steps": []}
+    return {"output": result.get("output", ""), "intermediate_steps": _jsonable_steps(result.get("intermediate_steps"))}
+
+
+async def _parse_request(request: web.Request) -> dict[str, Any]:
+    strategy = request.match_info["strategy"]
+    if strategy not in get_args(ReasoningStrategies):
+        raise web.HTTPNotFound(text=f"Unknown strategy: {strategy}")
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    question = body.get("input") if isinstance(body, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        raise web.HTTPBadRequest(text="'input' must be a non-empty string")
+    tools = body.get("tools", DEFAULT_TOOLS)
+    if not isinstance(tools, list) or not all(isinstance(name, str) for name in tools):
+        raise web.HTTPBadRequest(text="'tools' must be a list of tool names")
+    unknown = [name for name in tools if name not in TOOL_FACTORIES]
+    if unknown:
+        raise web.HTTPBadRequest(text=f"Unknown tools: {', '.join(unknown)}")
+    model = body.get("model", DEFAULT_MODEL)
+    if model not in SUPPORTED_MODELS:
+        raise web.HTTPBadRequest(text=f"Unknown model: {model}. Supported: {', '.join(SUPPORTED_MODELS)}")
+    session_id = body.get("session_id") or uuid.uuid4().hex
+    if not is_valid_session_id(session_id):
+        raise web.HTTPBadRequest(text="'session_id' must be 1-128 letters, digits, '_', '.' or '-'")
+    timeout = body.get("timeout", default_timeout())
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise web.HTTPBadRequest(text="'timeout' must be a positive number of seconds")
+    return {
+        "strategy": strategy,
+        "input": question,
+        "tools": list(tools),
+        "model": model,
+        "session_id": session_id,
+        "timeout": float(timeout),
+    }
+
+
+async def _get_agent(params: dict[str, Any]) -> Any:
+    # Building a new configuration is slow; keep it off the event loop
+    return await asyncio.to_thread(AGENT_FACTORY.get, params["tools"], params["strategy"], params["model"])
+
+
+def _submit(agent: Any, params: dict[str, Any], callbacks: list[BaseCallbackHandler]) -> tuple[asyncio.Future, Deadline]:
+    """Queue the agent run on the scheduler; raises `SchedulerSaturated` when full.
+
+    Returns:
+        tuple[asyncio.Future, Deadline]: The run, and its deadline to cancel it with
+    """
+    with session_scope(params["session_id"]), deadline_scope(params["timeout"]) as deadline:
+        # The scheduler copies the session scope and deadline into the worker at submit time
+        future = SCHEDULER.submit(
+            params["session_id"], agent.invoke, {"input": params["input"]}, {"callbacks": [*callbacks, METRICS_HANDLER, *trace_handlers()]}
+        )
+    return asyncio.wrap_future(future), deadline
+
+
+def _cancel(run: asyncio.Future, deadline: Deadline) -> None:
+    """Stop a run whose client went away: drop it if still queued, else end it at its next step."""
+    run.cancel()
+    deadline.cancel()
+
+
+def _too_many_requests(error: SchedulerSaturated) -> web.HTTPTooManyRequests:
+    return web.HTTPTooManyRequests(text=str(error), headers={"Retry-After": "1"})
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def list_agents(request: web.Request) -> web.Response:
+    return web.json_response({
+        "strategies": list(get_args(ReasoningStrategies)),
+        "tools": sorted(TOOL_FACTORIES),
+        "scheduler": SCHEDULER.stats(),
+    })
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=METRICS.to_prometheus(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def metrics_json(request: web.Request) -> web.Response:
+    return web.json_response(METRICS.snapshot())
+
+
+async def invoke(request: web.Request) -> web.Response:
+    params = await _parse_request(request)
+    agent = await _get_agent(params)
+    try:
+        run, deadline = _submit(agent, params, [])
+    except SchedulerSaturated as e:
+        raise _too_many_requests(e)
+    try:
+        result = await run
+    except DeadlineExceeded as e:
+        raise web.HTTPGatewayTimeout(text=str(e))
+    except asyncio.CancelledError:
+        # The client disconnected
+        _cancel(run, deadline)
+        raise
+    return web.json_response({**_format_result(result), "session_id": params["session_id"]})
+
+
+async def _stream_events(request: web.Request, params: dict[str, Any], run: asyncio.Future, events: asyncio.Queue) -> web.StreamResponse:
+    """Send the events of a run as Server-Sent Events until it finishes."""
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    async def send(event: str, data: Any) -> None:
+        await response.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    await send("start", {"session_id": params["session_id"]})
+    while not run.done():
+        getter = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait({getter, run}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            await send(*getter.result())
+        else:
+            getter.cancel()
+    # Let events scheduled from worker threads land before draining
+    await asyncio.sleep(0)
+    while not events.empty():
+        await send(*events.get_nowait())
+    if run.exception() is not None:
+        await send("error", {"error": str(run.exception())})
+    else:
+        await send("end", _format_result(run.result()))
+    await response.write_eof()
+    return response
+
+
+async def stream(request: web.Request) -> web.StreamResponse:
+    params = await _parse_request(request)
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Any) -> None:
+        # Called from scheduler worker threads
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    agent = await _get_agent(params)
+    callbacks = [_StepEventHandler(emit), agent.answer_stream_handler(lambda token: emit("token", {"text": token}))]
+    try:
+        # Rejections get a plain 429 before the event stream starts
+        run, deadline = _submit(agent, params, callbacks)
+    except SchedulerSaturated as e:
+        raise _too_many_requests(e)
+    try:
+        return await _stream_events(request, params, run, events)
+    except (ConnectionError, asyncio.CancelledError):
+        # The client disconnected; nobody is left to read the answer
+        _cancel(run, deadline)
+        raise
+
+
+def create_app() -> web.Application:
+    """Create the aiohttp application."""
+    app = web.Application()
+    app.add_routes([
+        web.get("/health", health),
+        web.get("/agents", list_agents),
+        web.get("/metrics", metrics),
+        web.get("/metrics.json", metrics_json),
+        web.post("/agents/{strategy}/invoke", invoke),
+        web.post("/agents/{strategy}/stream", stream),
+    ])
+    return app
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Serve the API."""
+    parser = argparse.ArgumentParser(description="Serve the agents over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--keepalive", type=float, default=75.0, help="Seconds an idle client connection is kept open")
+    args = parser.parse_args(argv)
+    web.run_app(create_app(), host=args.host, port=args.port, keepalive_timeout=args.keepalive)
+
+
+if __name__ == "__main__":
+    main()
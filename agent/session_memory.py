@@ -0,0 +1,162 @@
+"""Per-session conversation memory.
+
+Agents are cached and shared across Streamlit sessions (see agent/factory.py),
+so the memory they hold must not be a single conversation. `SessionMemory` is
+the memory object handed to every agent; it routes each load/save to the
+conversation of the session that is currently running, which callers select
+with `session_scope`. Conversations live in a `SessionStore` that keeps a
+bounded number of sessions and drops the ones left idle.
+
+Reads and writes of an existing session only do a dict lookup, so concurrent
+sessions never wait on each other; the store lock is taken only to create or
+evict sessions.
+
+Configuration is read from the environment:
+    AGENT_MAX_SESSIONS        conversations kept in memory (default 1000)
+    AGENT_SESSION_IDLE_TTL    seconds an idle conversation is kept (default 3600)
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from langchain_core.memory import BaseMemory
+
+DEFAULT_SESSION = "default"
+
+_current_session: contextvars.ContextVar[str] = contextvars.ContextVar("agent_session", default=DEFAULT_SESSION)
+
+
+def current_session_id() -> str:
+    """Return the session id of the running context."""
+    return _current_session.get()
+
+
+def set_current_session(session_id: str) -> contextvars.Token:
+    """Route memory access in the running context to the conversation of session_id.
+
+    Use this where a whole script run belongs to one session (Streamlit);
+    prefer `session_scope` elsewhere.
+    """
+    return _current_session.set(session_id)
+
+
+@contextmanager
+def session_scope(session_id: str) -> Iterator[None]:
+    """Route memory access inside the block to the conversation of session_id."""
+    token = _current_session.set(session_id)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+class _Session:
+    __slots__ = ("memory", "last_used")
+
+    def __init__(self, memory: BaseMemory):
+        self.memory = memory
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """Bounded map of session id to conversation memory with idle eviction."""
+
+    def __init__(self, factory: Callable[[str], BaseMemory], max_sessions: int = 1000, idle_ttl: float = 3600):
+        """Initialize the store.
+
+        Args:
+            factory: Creates the memory of a new session from its id
+            max_sessions: Maximum live sessions; least recently used are evicted beyond it
+            idle_ttl: Seconds after which an unused session is evicted
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: dict[str, _Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> BaseMemory:
+        """Return the memory of session_id, creating it on first use."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    self._evict(time.monotonic())
+                    session = self._sessions[session_id] = _Session(self.factory(session_id))
+        session.last_used = time.monotonic()
+        return session.memory
+
+    def drop(self, session_id: str) -> None:
+        """Forget the conversation of session_id."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        idle = [sid for sid, s in self._sessions.items() if s.last_used + self.idle_ttl <= now]
+        for sid in idle:
+            del self._sessions[sid]
+        overflow = len(self._sessions) - self.max_sessions + 1
+        if overflow > 0:
+            oldest = sorted(self._sessions, key=lambda sid: self._sessions[sid].last_used)[:overflow]
+            for sid in oldest:
+                del self._sessions[sid]
+
+
+class SessionMemory(BaseMemory):
+    """Memory that delegates to the conversation of the current session."""
+
+    store: Any
+    memory_key: str = "chat_history"
+
+    def _session_memory(self) -> BaseMemory:
+        return self.store.get(current_session_id())
+
+    @property
+    def chat_memory(self):
+        """Chat message history of the current session."""
+        return self._session_memory().chat_memory
+
+    @property
+    def memory_variables(self) -> list[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        return self._session_memory().load_memory_variables(inputs)
+
+    async def aload_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        return await self._session_memory().aload_memory_variables(inputs)
+
+    def save_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        self._session_memory().save_context(inputs, outputs)
+
+    async def asave_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        await self._session_memory().asave_context(inputs, outputs)
+
+    def clear(self) -> None:
+        self._session_memory().clear()
+
+
+def init_session_memory(factory: Callable[[str], BaseMemory], store: Optional[SessionStore] = None) -> SessionMemory:
+    """Create a `SessionMemory` over a store configured from the environment.
+
+    Args:
+        factory: Creates the memory of a new session from its id
+        store: Existing store to use instead of a new one
+
+    Returns:
+        SessionMemory: Memory to pass to agents
+    """
+    if store is None:
+        store = SessionStore(
+            factory,
+            max_sessions=int(os.environ.get("AGENT_MAX_SESSIONS", "1000")),
+            idle_ttl=float(os.environ.get("AGENT_SESSION_IDLE_TTL", "3600")),
+        )
+    return SessionMemory(store=store)
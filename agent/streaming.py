@@ -0,0 +1,310 @@
+"""Token streaming of the final answer.
+
+Every strategy produces its final answer inside an ordinary LLM call: the
+ReAct agent writes it after "Final Answer:", the plan-and-execute step agent
+writes it as the `action_input` of a `{"action": "Final Answer"}` JSON blob,
+and the tool-calling agent writes it as the content of a turn without tool
+calls. A tool-calling turn can write text before its tool calls, so its
+content is only forwarded once the turn has ended without any.
+`FinalAnswerStreamHandler` watches LLM tokens, detects where the final answer
+starts and forwards only the answer text, so callers can render it as soon as
+the model starts writing it instead of waiting for the whole run. LLM runs
+inside tool calls (e.g. the llm-math chain or the critical_search self-ask
+agent) are ignored: their "Final Answer:" is an observation, not the answer.
+"""
+import asyncio
+import contextvars
+import queue
+import re
+import threading
+from typing import Any, AsyncIterator, Callable, ClassVar, Iterator, Optional
+from uuid import UUID
+
+from langchain.agents import AgentExecutor
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.runnables import RunnableConfig
+
+from agent.deadline import DeadlineAwareExecutorMixin
+
+
+class ReActFinalAnswerParser:
+    """Extract the text following "Final Answer:" from a ReAct completion."""
+
+    marker = "Final Answer:"
+
+    def __init__(self):
+        self._buffer = ""
+        self.found = False
+        self._started = False
+
+    def feed(self, token: str) -> str:
+        """Consume a token and return the part of it that belongs to the final answer."""
+        if not self.found:
+            self._buffer += token
+            index = self._buffer.find(self.marker)
+            if index < 0:
+                return ""
+            self.found = True
+            token = self._buffer[index + len(self.marker):]
+        if not self._started:
+            # The space after the marker may arrive in a later token
+            token = token.lstrip()
+            self._started = bool(token)
+        return token
+
+
+class FinalTurnAnswerParser:
+    """Forward the content of a tool-calling turn that ends without tool calls."""
+
+    def feed(self, token: str) -> str:
+        return ""
+
+    def finish(self, response: Any) -> str:
+        """Return the answer text of the finished turn, or "" if it called tools."""
+        generations = response.generations[0] if response.generations else []
+        message = getattr(generations[0], "message", None) if generations else None
+        if message is None or getattr(message, "tool_calls", None):
+            return ""
+        return message.content if isinstance(message.content, str) else ""
+
+
+class JsonFinalAnswerParser:
+    """Extract the `action_input` string of a structured-chat "Final Answer" action."""
+
+    _start = re.compile(r'"action"\s*:\s*"Final Answer"\s*,\s*"action_input"\s*:\s*"')
+    _escapes = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._done = False
+        self.found = False
+
+    def feed(self, token: str) -> str:
+        """Consume a token and return the decoded answer characters it completes."""
+        if self._done:
+            return ""
+        self._buffer += token
+        if not self.found:
+            match = self._start.search(self._buffer)
+            if match is None:
+                return ""
+            self.found = True
+            self._pos = match.end()
+
+        out = []
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char == '"':
+                self._done = True
+                break
+            if char != "\\":
+                out.append(char)
+                pos += 1
+                continue
+            # Escape sequences may be split across tokens; wait for the rest
+            if pos + 1 >= len(buffer):
+                break
+            code = buffer[pos + 1]
+            if code == "u":
+                if pos + 6 > len(buffer):
+                    break
+                out.append(chr(int(buffer[pos + 2:pos + 6], 16)))
+                pos += 6
+            else:
+                out.append(self._escapes.get(code, code))
+                pos += 2
+        self._pos = pos
+        return "".join(out)
+
+
+class FinalAnswerStreamHandler(BaseCallbackHandler):
+    """Forward final-answer tokens of the agent's own LLM runs to `on_token`.
+
+    Runs inline so tokens arrive in order on the thread or event loop that
+    produced them.
+    """
+
+    run_inline = True
+
+    def __init__(self, parser_factory: Callable[[], Any], on_token: Callable[[str], None], tag: Optional[str] = None):
+        """Initialize the handler.
+
+        Args:
+            parser_factory: Creates a fresh parser per LLM run; `feed` gets each
+                token and an optional `finish` the completed response
+            on_token: Called with each piece of final-answer text
+            tag: Only watch LLM runs carrying this tag; None watches every run outside tool calls
+        """
+        self.parser_factory = parser_factory
+        self.on_token = on_token
+        self.tag = tag
+        self.emitted = False
+        self._parsers: dict[UUID, Any] = {}
+        # Tool runs and every run nested inside one; tags are inherited by
+        # nested runs, so the tag alone does not exclude them
+        self._in_tool: set[UUID] = set()
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], tags: Optional[list[str]]) -> None:
+        if parent_run_id in self._in_tool:
+            return
+        if self.tag is None or self.tag in (tags or []):
+            with self._lock:
+                self._parsers[run_id] = self.parser_factory()
+
+    def _enter(self, run_id: UUID, parent_run_id: Optional[UUID], is_tool: bool = False) -> None:
+        if is_tool or parent_run_id in self._in_tool:
+            with self._lock:
+                self._in_tool.add(run_id)
+
+    def _exit(self, run_id: UUID) -> None:
+        with self._lock:
+            self._in_tool.discard(run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._enter(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_tool_start(self, serialized, input_str: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._enter(run_id, parent_run_id, is_tool=True)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, tags: Optional[list[str]] = None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, tags)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None, tags: Optional[list[str]] = None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, tags)
+
+    def _emit(self, text: str) -> None:
+        if text:
+            self.emitted = True
+            self.on_token(text)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        parser = self._parsers.get(run_id)
+        if parser is not None:
+            self._emit(parser.feed(token))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            parser = self._parsers.pop(run_id, None)
+        if parser is not None and hasattr(parser, "finish"):
+            self._emit(parser.finish(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._parsers.pop(run_id, None)
+
+
+def _with_handler(config: Optional[RunnableConfig], handler: BaseCallbackHandler) -> RunnableConfig:
+    """Return a copy of config whose callbacks include handler."""
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    else:
+        callbacks = [*(callbacks or []), handler]
+    config["callbacks"] = callbacks
+    return config
+
+
+class AnswerStreamingMixin:
+    """Add `stream_answer`/`astream_answer` to an agent runnable.
+
+    Subclasses set `answer_parser` (and optionally `answer_tag`) to describe
+    where their final answer appears in the LLM output.
+    """
+
+    answer_parser: ClassVar[Callable[[], Any]] = ReActFinalAnswerParser
+    answer_tag: ClassVar[Optional[str]] = None
+
+    def answer_stream_handler(self, on_token: Callable[[str], None]) -> FinalAnswerStreamHandler:
+        """Return a callback handler that calls `on_token` with final-answer text.
+
+        Pass it in the run config's callbacks to render the answer
+        incrementally from a regular `invoke` call.
+        """
+        return FinalAnswerStreamHandler(type(self).answer_parser, on_token, tag=self.answer_tag)
+
+    async def astream_answer(self, input: dict[str, Any], config: Optional[RunnableConfig] = None) -> AsyncIterator[str]:
+        """Run the agent and yield final-answer tokens as the model writes them.
+
+        If no token could be attributed to the final answer (e.g. the answer
+        came from early stopping or a parsing fallback), the complete output
+        is yielded once the run finishes.
+        """
+        loop = asyncio.get_running_loop()
+        tokens: asyncio.Queue[str] = asyncio.Queue()
+        handler = self.answer_stream_handler(lambda text: loop.call_soon_threadsafe(tokens.put_nowait, text))
+        run = asyncio.ensure_future(self.ainvoke(input, _with_handler(config, handler)))
+        try:
+            while not run.done():
+                getter = asyncio.ensure_future(tokens.get())
+                done, _ = await asyncio.wait({getter, run}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            # Let tokens scheduled from worker threads land before draining
+            await asyncio.sleep(0)
+            while not tokens.empty():
+                yield tokens.get_nowait()
+            result = run.result()
+            if not handler.emitted:
+                yield result.get("output", "") if isinstance(result, dict) else str(result)
+        finally:
+            if not run.done():
+                run.cancel()
+
+    def stream_answer(self, input: dict[str, Any], config: Optional[RunnableConfig] = None) -> Iterator[str]:
+        """Synchronous counterpart of `astream_answer`.
+
+        The agent runs on a worker thread (in a copy of the caller's context,
+        so the session scope carries over), and callbacks in config are
+        invoked from that thread.
+        """
+        done = object()
+        tokens: queue.Queue = queue.Queue()
+        handler = self.answer_stream_handler(tokens.put)
+        outcome: dict[str, Any] = {}
+
+        def run() -> None:
+            try:
+                outcome["result"] = self.invoke(input, _with_handler(config, handler))
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                tokens.put(done)
+
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(run,), name="stream-answer", daemon=True)
+        worker.start()
+        while (token := tokens.get()) is not done:
+            yield token
+        worker.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        result = outcome["result"]
+        if not handler.emitted:
+            yield result.get("output", "") if isinstance(result, dict) else str(result)
+
+
+class DeadlineAgentExecutor(DeadlineAwareExecutorMixin, AgentExecutor):
+    """`AgentExecutor` that answers before the request deadline (agent/deadline.py)."""
+
+
+class StreamingAgentExecutor(AnswerStreamingMixin, DeadlineAgentExecutor):
+    """`AgentExecutor` for the ReAct prompt with final-answer token streaming."""
@@ -0,0 +1,166 @@
+"""Token-budgeted conversation memory with a rolling summary.
+
+`ConversationBufferMemory` replays the whole conversation, so prompt size and
+latency grow with every turn. `RollingSummaryMemory` keeps the most recent
+messages verbatim within a token budget and folds older ones into a running
+summary. Unlike LangChain's `ConversationSummaryBufferMemory`, the summary is
+computed on a background thread after the turn is saved, so the extra LLM
+call never delays the response.
+
+Messages that left the verbatim window but are not summarized yet are still
+returned, so no context is lost while a summary is in flight; the prompt may
+exceed the budget by those messages until the summary lands.
+
+With a persistent history (AGENT_HISTORY_DIR), the summary and the number of
+messages it covers are saved with the session, so a restart resumes from the
+summary instead of summarizing the whole log again.
+
+Selected with AGENT_MEMORY=summary (see `init_memory`):
+    AGENT_MEMORY_TOKENS    token budget of the verbatim window (default 2000)
+    AGENT_SUMMARY_MODEL    model that writes the summary (default gpt-3.5-turbo)
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import BaseMessage, get_buffer_string
+from pydantic import PrivateAttr
+
+# Shared by every conversation; summaries are short, cheap calls
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-summary")
+
+
+class RollingSummaryMemory(ConversationSummaryBufferMemory):
+    """Recent messages within a token budget plus a summary refreshed in the background."""
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _pending: list[BaseMessage] = PrivateAttr(default_factory=list)
+    _future: Optional[Future] = PrivateAttr(default=None)
+    _generation: int = PrivateAttr(default=0)
+    # Messages at the start of the history that the summary covers
+    _summarized: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if hasattr(self.chat_memory, "load_state"):
+            state = self.chat_memory.load_state()
+            self._summarized = min(state.get("summarized", 0), self.chat_memory.count())
+            if self._summarized:
+                self.moving_summary_buffer = state.get("summary", "")
+                # Messages the summary covers are never read from disk
+                self.chat_memory.start_at(self._summarized)
+
+    def _messages(self) -> list[BaseMessage]:
+        with self._lock:
+            messages = self._pending + list(self.chat_memory.messages)
+            summary = self.moving_summary_buffer
+        if summary:
+            messages = [self.summary_message_cls(content=summary)] + messages
+        return messages
+
+    def load_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        """Return the summary followed by the verbatim messages."""
+        messages = self._messages()
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    async def aload_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        return self.load_memory_variables(inputs)
+
+    def save_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        """Save the turn and schedule summarization of messages beyond the budget."""
+        with self._lock:
+            BaseChatMemory.save_context(self, inputs, outputs)
+            self._prune()
+
+    async def asave_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        self.save_context(inputs, outputs)
+
+    def prune(self) -> None:
+        """Move messages beyond the token budget out of the window and summarize them in the background."""
+        with self._lock:
+            self._prune()
+
+    def _prune(self) -> None:
+        # Called with the lock held, like every other change of the history
+        if self._future is not None:
+            # The running summary re-checks the budget when it finishes
+            return
+        buffer = self.chat_memory.messages
+        pruned = []
+        while buffer and self.llm.get_num_tokens_from_messages(buffer) > self.max_token_limit:
+            pruned.append(buffer.pop(0))
+        if not pruned:
+            return
+        self._pending = pruned
+        self._future = _SUMMARY_EXECUTOR.submit(
+            self._summarize, pruned, self.moving_summary_buffer, self._generation
+        )
+
+    async def aprune(self) -> None:
+        self.prune()
+
+    def _summarize(self, pruned: list[BaseMessage], summary: str, generation: int) -> None:
+        try:
+            new_summary = self.predict_new_summary(pruned, summary)
+        except Exception as e:
+            print(f"Warning: Could not summarize conversation history: {e}")
+            new_summary = None
+        with self._lock:
+            if generation != self._generation:
+                # Cleared while summarizing
+                return
+            self._future = None
+            self._pending = []
+            if new_summary is None:
+                # Keep the messages verbatim and retry after the next turn
+                self.chat_memory.messages[:0] = pruned
+                return
+            self.moving_summary_buffer = new_summary
+            self._summarized += len(pruned)
+            if hasattr(self.chat_memory, "save_state"):
+                try:
+                    self.chat_memory.save_state({"summary": new_summary, "summarized": self._summarized})
+                except OSError as e:
+                    print(f"Warning: Could not save the conversation summary: {e}")
+            self._prune()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until the summary in flight, if any, has been written."""
+        while (future := self._future) is not None:
+            future.result(timeout)
+
+    def clear(self) -> None:
+        """Clear the messages and the summary."""
+        with self._lock:
+            self._generation += 1
+            self._pending = []
+            self._future = None
+            self._summarized = 0
+            self.chat_memory.clear()
+            self.moving_summary_buffer = ""
+
+    async def aclear(self) -> None:
+        self.clear()
+
+
+def init_summary_memory(**kwargs: Any) -> RollingSummaryMemory:
+    """Create a `RollingSummaryMemory` configured from the environment.
+
+    Args:
+        **kwargs: Extra fields for the memory, e.g. `chat_memory`
+    """
+    from agent.agent import create_llm
+
+    return RollingSummaryMemory(
+        llm=create_llm(os.environ.get("AGENT_SUMMARY_MODEL", "gpt-3.5-turbo")),
+        max_token_limit=int(os.environ.get("AGENT_MEMORY_TOKENS", "2000")),
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="output",
+        **kwargs,
+    )
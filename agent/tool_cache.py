@@ -0,0 +1,298 @@
+"""Two-tier cache for tool results.
+
+Search, encyclopedia and weather tools used to hit the network for every
+identical query, across turns and users. `CachedTool` wraps a tool built by
+`load_tools` and looks results up first in an in-process LRU, then, when
+configured, in a persistent SQLite file shared by every process on the host.
+Entries expire after a per-tool TTL and the SQLite tier is kept under a size
+budget by evicting the least recently used entries.
+
+Configuration is read from the environment:
+    AGENT_TOOL_CACHE            "0" disables the cache (default "1")
+    AGENT_TOOL_CACHE_PATH       SQLite file of the persistent tier; unset keeps results in memory only
+    AGENT_TOOL_CACHE_MB         size budget of the SQLite tier in megabytes (default 64)
+    AGENT_TOOL_CACHE_ENTRIES    entries kept in the in-process tier (default 1024)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from langchain_core.tools import BaseTool, Tool
+
+MINUTE, HOUR, DAY = 60, 60 * 60, 24 * 60 * 60
+
+# Seconds a result stays valid, keyed by the tool name used in `load_tools`.
+# Tools not listed here (python_repl, llm-math, critical_search) are not cached.
+DEFAULT_TOOL_TTLS: dict[str, float] = {
+    "openweathermap": 10 * MINUTE,
+    "ddg-search": 6 * HOUR,
+    "google-search": 6 * HOUR,
+    "meta-search": 6 * HOUR,
+    "wikipedia": DAY,
+    "wolfram-alpha": DAY,
+    "arxiv": 7 * DAY,
+}
+
+# Results starting with these come from the tools' own error handling and
+# must not be served again from the cache
+FAILURE_PREFIXES = (
+    "Search failed:",
+    "Could not retrieve weather data",
+    "Wolfram Alpha query failed:",
+    "Arxiv exception:",
+)
+
+
+# Argument schema of a plain single-input `Tool` as seen by tool-calling models
+_SINGLE_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {"__arg1": {"title": "__arg1", "type": "string"}},
+    "required": ["__arg1"],
+}
+
+
+class ToolResultCache:
+    """In-process LRU in front of a size-bounded SQLite store."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 1024,
+    ):
+        """Initialize the cache.
+
+        Args:
+            path: SQLite file for the persistent tier; None keeps only the in-process tier
+            max_bytes: Size budget of the persistent tier
+            max_entries: Number of entries kept in the in-process tier
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        )
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results ("
+                "key TEXT PRIMARY KEY, tool TEXT, value TEXT, size INTEGER, expires_at REAL, accessed_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS tool_results_accessed ON tool_results(accessed_at)")
+
+    @staticmethod
+    def make_key(tool: str, tool_input: Any) -> str:
+        """Return the cache key for a tool call."""
+        # "q" and {"query": "q"} are the same call to a single-input tool
+        if isinstance(tool_input, dict) and len(tool_input) == 1:
+            tool_input = next(iter(tool_input.values()))
+        payload = json.dumps([tool, tool_input], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, tool: str, key: str) -> Optional[str]:
+        """Return the cached result, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            counters = self._counters[tool]
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM tool_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._db.execute("UPDATE tool_results SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._remember(key, value, expires_at)
+                        counters["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM tool_results WHERE key = ?", (key,))
+
+            counters["misses"] += 1
+            return None
+
+    def put(self, tool: str, key: str, value: str, ttl: float) -> None:
+        """Store a result in both tiers for ttl seconds."""
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._counters[tool]["stores"] += 1
+            self._remember(key, value, expires_at)
+            if self._db is None:
+                return
+            size = len(value.encode("utf-8"))
+            self._db.execute(
+                "INSERT OR REPLACE INTO tool_results (key, tool, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool, value, size, expires_at, now),
+            )
+            self._evict_disk(now)
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM tool_results")
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters in total and per tool."""
+        with self._lock:
+            per_tool = {tool: dict(counters) for tool, counters in self._counters.items()}
+            memory_entries = len(self._memory)
+        total = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        for counters in per_tool.values():
+            for name, count in counters.items():
+                total[name] += count
+        return {**total, "memory_entries": memory_entries, "tools": per_tool}
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        self._db.execute("DELETE FROM tool_results WHERE expires_at <= ?", (now,))
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM tool_results").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the store fits again
+        excess = total - self.max_bytes
+        rows = self._db.execute("SELECT key, size FROM tool_results ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            doomed.append((key,))
+            excess -= size
+        self._db.executemany("DELETE FROM tool_results WHERE key = ?", doomed)
+
+
+class CachedTool(BaseTool):
+    """Serve results of the wrapped tool from a `ToolResultCache`."""
+
+    inner: BaseTool
+    cache: Any
+    cache_name: str
+    ttl: float
+
+    @classmethod
+    def wrap(cls, tool: BaseTool, cache: ToolResultCache, cache_name: str, ttl: float) -> "CachedTool":
+        """Wrap a tool, keeping its name, description and argument schema."""
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            inner=tool,
+            cache=cache,
+            cache_name=cache_name,
+            ttl=ttl,
+        )
+
+    # Plain `Tool`s have no args_schema; without these the wrapper would
+    # describe the signature of `_run` to the model instead of the tool's input
+    @property
+    def args(self) -> dict:
+        return self.inner.args
+
+    @property
+    def tool_call_schema(self) -> Any:
+        if isinstance(self.inner, Tool) and not self.inner.args_schema:
+            # The schema OpenAI function formatting gives plain tools
+            return _SINGLE_INPUT_SCHEMA
+        return self.inner.tool_call_schema
+
+    @staticmethod
+    def _inner_input(args: tuple, kwargs: dict) -> Any:
+        return args[0] if len(args) == 1 and not kwargs else kwargs
+
+    def _store(self, key: str, result: Any) -> None:
+        if isinstance(result, str) and not result.startswith(FAILURE_PREFIXES):
+            self.cache.put(self.cache_name, key, result, self.ttl)
+
+    def _run(self, *args: Any, run_manager: Optional[CallbackManagerForToolRun] = None, **kwargs: Any) -> Any:
+        tool_input = self._inner_input(args, kwargs)
+        key = self.cache.make_key(self.cache_name, tool_input)
+        cached = self.cache.get(self.cache_name, key)
+        if cached is not None:
+            return cached
+        result = self.inner.run(tool_input, callbacks=run_manager.get_child() if run_manager else None)
+        self._store(key, result)
+        return result
+
+    async def _arun(self, *args: Any, run_manager: Optional[AsyncCallbackManagerForToolRun] = None, **kwargs: Any) -> Any:
+        tool_input = self._inner_input(args, kwargs)
+        key = self.cache.make_key(self.cache_name, tool_input)
+        cached = self.cache.get(self.cache_name, key)
+        if cached is not None:
+            return cached
+        result = await self.inner.arun(tool_input, callbacks=run_manager.get_child() if run_manager else None)
+        self._store(key, result)
+        return result
+
+
+_default_cache: Optional[ToolResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> Optional[ToolResultCache]:
+    """Return the process-wide tool cache, or None when disabled by AGENT_TOOL_CACHE=0."""
+    global _default_cache
+    if os.environ.get("AGENT_TOOL_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            path = os.environ.get("AGENT_TOOL_CACHE_PATH")
+            _default_cache = ToolResultCache(
+                path=Path(path).expanduser() if path else None,
+                max_bytes=int(float(os.environ.get("AGENT_TOOL_CACHE_MB", "64")) * 1024 * 1024),
+                max_entries=int(os.environ.get("AGENT_TOOL_CACHE_ENTRIES", "1024")),
+            )
+        return _default_cache
+
+
+def cache_tool(
+    name: str,
+    tool: BaseTool,
+    cache: Optional[ToolResultCache] = None,
+    ttls: Optional[dict[str, float]] = None,
+) -> BaseTool:
+    """Wrap a tool in the cache if it has a TTL; return other tools unchanged.
+
+    Args:
+        name: Tool name as used in `load_tools` (e.g. "arxiv")
+        tool: The tool instance
+        cache: Cache to use; defaults to the process-wide cache
+        ttls: Per-tool TTLs in seconds; defaults to DEFAULT_TOOL_TTLS
+
+    Returns:
+        BaseTool: The cached wrapper, or the original tool
+    """
+    ttl = (DEFAULT_TOOL_TTLS if ttls is None else ttls).get(name)
+    cache = cache or get_tool_cache()
+    if ttl is None or cache is None:
+        return tool
+    return CachedTool.wrap(tool, cache, name, ttl)
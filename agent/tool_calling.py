@@ -0,0 +1,101 @@
+"""Tool-calling agent that executes parallel tool calls concurrently.
+
+With native tool calling the model can request several tools in one turn
+(e.g. Wikipedia, Arxiv and a web search at once). `AgentExecutor` already runs
+such batches concurrently on the async path; `ParallelToolAgentExecutor` does
+the same for the sync path, so one LLM round trip replaces several.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import ClassVar, Iterator, Optional, Union
+
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import BaseTool
+
+from agent.streaming import FinalTurnAnswerParser, StreamingAgentExecutor
+from agent.utils import CHAT_HISTORY
+
+SYSTEM_PROMPT = (
+    "You are a helpful research assistant. Use the available tools to answer the user's question. "
+    "When several independent lookups are needed, request all of the tool calls at once."
+)
+
+# Actions planned in the current step, per thread; see _iter_next_step
+_batch = threading.local()
+
+
+def create_tool_calling_prompt(system_prompt: str = SYSTEM_PROMPT) -> ChatPromptTemplate:
+    """Create the chat prompt used by the tool-calling agent."""
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            CHAT_HISTORY,
+            ("human", "{input}"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ]
+    )
+
+
+class _ActionBatch:
+    def __init__(self):
+        self.actions: list[AgentAction] = []
+        self.results: Optional[list[AgentStep]] = None
+
+
+class ParallelToolAgentExecutor(StreamingAgentExecutor):
+    """`AgentExecutor` that runs all tool calls of one LLM turn in a thread pool."""
+
+    answer_parser: ClassVar = FinalTurnAnswerParser
+
+    max_parallel_tools: int = 4
+    """Maximum number of tool calls executed at the same time."""
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map: dict[str, BaseTool],
+        color_mapping: dict[str, str],
+        inputs: dict[str, str],
+        intermediate_steps: list[tuple[AgentAction, str]],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        # AgentExecutor yields every planned action before performing the
+        # first one, so by the time _perform_agent_action is called the batch
+        # holds the complete list and can be executed at once.
+        batch = _ActionBatch()
+        previous = getattr(_batch, "current", None)
+        _batch.current = batch
+        try:
+            for item in super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                if isinstance(item, AgentAction):
+                    batch.actions.append(item)
+                yield item
+        finally:
+            _batch.current = previous
+
+    def _perform_agent_action(
+        self,
+        name_to_tool_map: dict[str, BaseTool],
+        color_mapping: dict[str, str],
+        agent_action: AgentAction,
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> AgentStep:
+        perform = super()._perform_agent_action
+        batch = getattr(_batch, "current", None)
+        if batch is None or len(batch.actions) < 2:
+            return perform(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        if batch.results is None:
+            workers = max(1, min(self.max_parallel_tools, len(batch.actions)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool-call") as pool:
+                futures = [
+                    pool.submit(copy_context().run, perform, name_to_tool_map, color_mapping, action, run_manager)
+                    for action in batch.actions
+                ]
+                batch.results = [future.result() for future in futures]
+        index = next(i for i, action in enumerate(batch.actions) if action is agent_action)
+        return batch.results[index]
@@ -1,107 +1,165 @@
 #tool_loader.py
-"""Utilities for tools."""
-from typing import Optional
-
-from langchain import hub
-from langchain.agents import AgentExecutor, Tool, create_self_ask_with_search_agent
-from langchain.chains import LLMMathChain
-from langchain_community.tools.arxiv.tool import ArxivQueryRun
-from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
-from langchain_community.utilities.arxiv import ArxivAPIWrapper
-from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+"""Utilities for tools.
+
+Tools are built by factories registered in `TOOL_FACTORIES`. Each factory
+imports its own dependencies, so `load_tools` only imports and instantiates
+the tools that were actually requested.
+"""
+import os
+import time
+from typing import Callable, Optional
+
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.tools import BaseTool
-from langchain_experimental.tools import PythonREPLTool
-import os
 
-# Initialize Python REPL tool for code execution
-python_repl = PythonREPLTool()
+from agent.prompts import get_prompt
 
-# Configure Wikipedia API wrapper with English language and top 3 results
-wikipedia_api_wrapper = WikipediaAPIWrapper(lang="en", top_k_results=3)
+ToolFactory = Callable[[Optional[BaseLanguageModel]], Optional[BaseTool]]
 
 
-def load_tools(
-    tool_names: list[str],
-    llm: Optional[BaseLanguageModel] = None,
-) -> list[BaseTool]:
-    """Load and configure tools based on requested tool names.
-    
-    Args:
-        tool_names: List of tool names to load
-        llm: Language model for tools that require it (e.g., math calculations)
-        
-    Returns:
-        list[BaseTool]: List of configured tool instances
-    """
-    
-    # Try to create DuckDuckGo search tool first using the newer ddgs package
-    ddg_tool = None
+class CustomDuckDuckGoSearch:
+    """DuckDuckGo search on the shared rate-limited client (agent/ddg_client.py)."""
+
+    def search(self, query: str) -> str:
+        """Search the web using DuckDuckGo and format results.
+
+        Args:
+            query: Search query string
+
+        Returns:
+            str: Formatted search results
+
+        Raises:
+            SearchError: If the search still fails after retrying rate limits and timeouts
+        """
+        from agent.ddg_client import get_ddg_client
+
+        results = get_ddg_client().text(query, max_results=5)
+        if not results:
+            return f"No results found for '{query}'."
+
+        # Format each search result
+        formatted_results = []
+        for r in results:
+            title = r.get('title', 'No title')
+            body = r.get('body', 'No description')
+            formatted_results.append(f"{title}: {body}")
+        return "\n".join(formatted_results)
+
+
+def _make_ddg_search(llm: Optional[BaseLanguageModel]) -> Optional[BaseTool]:
+    """Create DuckDuckGo search tool, preferring the newer ddgs package."""
+    from langchain.agents import Tool
+
     try:
-        from ddgs import DDGS
-        
-        # Custom DuckDuckGo search implementation with error handling
-        class CustomDuckDuckGoSearch:
-            def search(self, query: str) -> str:
-                """Search the web using DuckDuckGo and format results.
-                
-                Args:
-                    query: Search query string
-                    
-                Returns:
-                    str: Formatted search results or error message
-                """
-                try:
-                    # Perform search with DDGS context manager
-                    with DDGS() as ddgs:
-                        results = ddgs.text(query, max_results=5)
-                        formatted_results = []
-                        
-                        # Format each search result
-                        for r in results:
-                            title = r.get('title', 'No title')
-                            body = r.get('body', 'No description')
-                            formatted_results.append(f"{title}: {body}")
-                            
-                        return "\n".join(formatted_results)
-                except Exception as e:
-                    # Return error message if search fails
-                    return f"Search failed: {str(e)}"
-        
-        # Create DuckDuckGo search tool
-        ddg_tool = Tool(
+        import ddgs  # noqa: F401
+
+        return Tool(
             name="ddg-search",
             description="Search the web using DuckDuckGo. Input should be a search query.",
             func=CustomDuckDuckGoSearch().search,
+            # A search that failed after its retries becomes an observation
+            handle_tool_error=True,
         )
     except ImportError:
         # Fallback warning if ddgs package is not installed
         print("Warning: ddgs package not installed. Please install it with `pip install ddgs`")
-        
-        # Fallback to old implementation if new package not available
-        try:
-            from langchain_community.tools.ddg_search import DuckDuckGoSearchRun
-            from langchain_community.utilities.duckduckgo_search import DuckDuckGoSearchAPIWrapper
-            import warnings
-            
-            # Suppress warnings for deprecated components
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore", RuntimeWarning)
-                ddg_tool = DuckDuckGoSearchRun(
-                    api_wrapper=DuckDuckGoSearchAPIWrapper(
-                        region="wt-wt",
-                        safesearch="moderate"
-                    )
+
+    # Fallback to old implementation if new package not available
+    try:
+        from langchain_community.tools.ddg_search import DuckDuckGoSearchRun
+        from langchain_community.utilities.duckduckgo_search import DuckDuckGoSearchAPIWrapper
+        import warnings
+
+        # Suppress warnings for deprecated components
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return DuckDuckGoSearchRun(
+                api_wrapper=DuckDuckGoSearchAPIWrapper(
+                    region="wt-wt",
+                    safesearch="moderate"
                 )
-        except Exception as e:
-            print(f"Warning: Could not initialize DuckDuckGo search tool: {e}")
+            )
+    except Exception as e:
+        print(f"Warning: Could not initialize DuckDuckGo search tool: {e}")
+    return None
+
+
+def _make_meta_search(llm: Optional[BaseLanguageModel]) -> Optional[BaseTool]:
+    from langchain.agents import Tool
+
+    from agent.meta_search import get_meta_search
+
+    meta_search = get_meta_search()
+    if meta_search is None:
+        print("Warning: No search engine is available for meta-search.")
+        return None
+    return Tool(
+        name="meta-search",
+        description="Search the web with several search engines and Wikipedia at once. "
+        "Returns merged, ranked results with their sources. Input should be a search query.",
+        func=meta_search.run,
+        handle_tool_error=True,
+    )
+
+
+def _make_arxiv(llm: Optional[BaseLanguageModel]) -> BaseTool:
+    from langchain_community.tools.arxiv.tool import ArxivQueryRun
+    from langchain_community.utilities.arxiv import ArxivAPIWrapper
+
+    return ArxivQueryRun(api_wrapper=ArxivAPIWrapper())
+
+
+def _make_wikipedia(llm: Optional[BaseLanguageModel]) -> BaseTool:
+    from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
+    from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+
+    # Configure Wikipedia API wrapper with English language and top 3 results
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(lang="en", top_k_results=3))
+
+
+def _make_python_repl(llm: Optional[BaseLanguageModel]) -> BaseTool:
+    from langchain.agents import Tool
+    from langchain_experimental.tools import PythonREPLTool
+
+    python_repl = PythonREPLTool()
+    return Tool(
+        name="python_repl",
+        description="A Python shell. Use this to execute python commands."
+        " Input should be a valid python command. If you want to see"
+        " the output of a value, you should print it out with `print(...)`. ",
+        func=python_repl.run,
+    )
+
+
+def _make_llm_math(llm: Optional[BaseLanguageModel]) -> BaseTool:
+    from langchain.agents import Tool
+    from langchain.chains import LLMMathChain
+
+    # One chain serves both the sync and async paths
+    math_chain = LLMMathChain.from_llm(llm=llm)
+    return Tool(
+        name="Calculator",
+        description="Useful for when you need to answer questions about math.",
+        func=math_chain.run,
+        coroutine=math_chain.arun,
+    )
+
+
+def _make_critical_search(llm: Optional[BaseLanguageModel]) -> BaseTool:
+    from langchain.agents import Tool, create_self_ask_with_search_agent
+
+    from agent.streaming import DeadlineAgentExecutor
 
     # Load prompt for self-ask with search agent
-    prompt = hub.pull("hwchase17/self-ask-with-search")
-    
-    # Create search tool for self-ask agent
-    search_wrapper = ddg_tool if ddg_tool else None
+    prompt = get_prompt("hwchase17/self-ask-with-search")
+
+    # Create search tool for self-ask agent, sharing cached search results
+    search_wrapper = _make_ddg_search(llm)
     if search_wrapper:
+        from agent.tool_cache import cache_tool
+
+        search_wrapper = cache_tool("ddg-search", search_wrapper)
         # Use actual search tool if available
         search_tool = Tool(
             name="Intermediate Answer",
@@ -115,9 +173,9 @@ def load_tools(
             func=lambda x: "Search tool not available",
             description="Search",
         )
-    
+
     # Create self-ask agent for handling complex questions that require search
-    self_ask_agent = AgentExecutor(
+    self_ask_agent = DeadlineAgentExecutor(
         agent=create_self_ask_with_search_agent(
             llm=llm,
             tools=[search_tool],
@@ -127,183 +185,229 @@ def load_tools(
         handle_parsing_errors=True,
     )
 
-    # Build available tools dictionary dynamically
-    available_tools = {
-        "arxiv": ArxivQueryRun(api_wrapper=ArxivAPIWrapper()),
-        "wikipedia": WikipediaQueryRun(api_wrapper=wikipedia_api_wrapper),
-        "python_repl": Tool(
-            name="python_repl",
-            description="A Python shell. Use this to execute python commands."
-            " Input should be a valid python command. If you want to see"
-            " the output of a value, you should print it out with `print(...)`. ",
-            func=python_repl.run,
-        ),
-        "llm-math": Tool(
-            name="Calculator",
-            description="Useful for when you need to answer questions about math.",
-            func=LLMMathChain.from_llm(llm=llm).run,
-            coroutine=LLMMathChain.from_llm(llm=llm).arun,
-        ),
-        "critical_search": Tool.from_function(
-            func=self_ask_agent.invoke,
-            name="Self-ask agent",
-            description="A tool to answer complicated questions. "
-            "Useful for when you need to answer questions about current events. "
-            "Input should be a question.",
-        ),
-    }
+    # Tool passes its run manager's child callbacks to functions that accept
+    # them, so the nested agent's LLM and search calls join the caller's trace
+    def ask(query: str, callbacks=None):
+        return self_ask_agent.invoke({"input": query}, {"callbacks": callbacks})
 
-    # Add DuckDuckGo search tool if available
-    if ddg_tool:
-        available_tools["ddg-search"] = ddg_tool
+    async def aask(query: str, callbacks=None):
+        return await self_ask_agent.ainvoke({"input": query}, {"callbacks": callbacks})
 
-    # Try to add OpenWeatherMap tool if credentials are available
-    if os.environ.get("OWM_API_KEY"):
-        try:
-            from pyowm import OWM
-            
-            # Custom OpenWeatherMap tool implementation
-            class OpenWeatherMapTool:
-                def __init__(self, api_key: str):
-                    """Initialize OpenWeatherMap tool with API key.
-                    
-                    Args:
-                        api_key: OpenWeatherMap API key from environment variables
-                    """
-                    self.owm = OWM(api_key)
-                    self.mgr = self.owm.weather_manager()
-                
-                def get_current_weather(self, location: str) -> str:
-                    """Get current weather information for a specific location.
-                    
-                    Args:
-                        location: Location name or city name
-                        
-                    Returns:
-                        str: Formatted weather information or error message
-                    """
-                    try:
-                        # Get weather observation for the location
-                        observation = self.mgr.weather_at_place(location)
-                        weather = observation.weather
-                        
-                        # Extract weather data
-                        temp = weather.temperature('celsius')['temp']
-                        status = weather.detailed_status
-                        humidity = weather.humidity
-                        wind_speed = weather.wind()['speed']
-                        
-                        # Format and return weather information
-                        return f"Current weather in {location}: {temp}°C, {status}, Humidity: {humidity}%, Wind Speed: {wind_speed} m/s"
-                    except Exception as e:
-                        # Return error message if weather data cannot be retrieved
-                        return f"Could not retrieve weather data for {location}: {str(e)}"
-            
-            # Create a proper Langchain Tool from our custom class
-            owm_tool = OpenWeatherMapTool(os.environ["OWM_API_KEY"])
-            
-            # Add OpenWeatherMap tool to available tools
-            available_tools["openweathermap"] = Tool(
-                name="OpenWeatherMap",
-                description="Get current weather information for a specific location. Use this when asked about current weather conditions. Input should be a location name or a city name like 'Beijing' or 'New York'.",
-                func=owm_tool.get_current_weather,
-            )
-        except ImportError:
-            print("Warning: pyowm package not installed. Please install it with `pip install pyowm`")
-        except Exception as e:
-            print(f"Warning: Could not initialize OpenWeatherMap tool: {e}")
-    else:
+    return Tool.from_function(
+        func=ask,
+        coroutine=aask,
+        name="Self-ask agent",
+        description="A tool to answer complicated questions. "
+        "Useful for when you need to answer questions about current events. "
+        "Input should be a question.",
+    )
+
+
+def _make_openweathermap(llm: Optional[BaseLanguageModel]) -> Optional[BaseTool]:
+    # Try to create OpenWeatherMap tool if credentials are available
+    if not os.environ.get("OWM_API_KEY"):
         print("Info: OWM_API_KEY not found. OpenWeatherMap tool will not be available.")
-    
-    # Try to add Wolfram Alpha tool if credentials and dependencies are available
-    if os.environ.get("WOLFRAM_ALPHA_APPID"):
-        try:
-            from langchain_community.tools.wolfram_alpha import WolframAlphaQueryRun
-            from langchain_community.utilities.wolfram_alpha import WolframAlphaAPIWrapper
-            
-            # Create a wrapper with error handling
-            class WolframAlphaTool(WolframAlphaQueryRun):
-                def _run(self, query: str) -> str:
-                    """Execute Wolfram Alpha query with error handling.
-                    
-                    Args:
-                        query: Query string for Wolfram Alpha
-                        
-                    Returns:
-                        str: Query results or error message
-                    """
-                    try:
-                        return super()._run(query)
-                    except Exception as e:
-                        return f"Wolfram Alpha query failed: {str(e)}. Please try a different tool or rephrase your query."
-                
-                async def _arun(self, query: str) -> str:
-                    """Execute async Wolfram Alpha query with error handling.
-                    
-                    Args:
-                        query: Query string for Wolfram Alpha
-                        
-                    Returns:
-                        str: Query results or error message
-                    """
-                    try:
-                        return await super()._arun(query)
-                    except Exception as e:
-                        return f"Wolfram Alpha query failed: {str(e)}. Please try a different tool or rephrase your query."
-            
-            # Add Wolfram Alpha tool to available tools
-            available_tools["wolfram-alpha"] = WolframAlphaTool(api_wrapper=WolframAlphaAPIWrapper())
-        except ImportError:
-            print("Warning: wolframalpha package not installed. Please install it with `pip install wolframalpha`")
-        except Exception as e:
-            print(f"Warning: Could not initialize Wolfram Alpha tool: {e}")
-    else:
+        return None
+    try:
+        from langchain.agents import Tool
+        from pyowm import OWM
+
+        # Custom OpenWeatherMap tool implementation
+        class OpenWeatherMapTool:
+            def __init__(self, api_key: str):
+                """Initialize OpenWeatherMap tool with API key.
+
+                Args:
+                    api_key: OpenWeatherMap API key from environment variables
+                """
+                self.owm = OWM(api_key)
+                self.mgr = self.owm.weather_manager()
+
+            def get_current_weather(self, location: str) -> str:
+                """Get current weather information for a specific location.
+
+                Args:
+                    location: Location name or city name
+
+                Returns:
+                    str: Formatted weather information or error message
+                """
+                try:
+                    # Get weather observation for the location
+                    observation = self.mgr.weather_at_place(location)
+                    weather = observation.weather
+
+                    # Extract weather data
+                    temp = weather.temperature('celsius')['temp']
+                    status = weather.detailed_status
+                    humidity = weather.humidity
+                    wind_speed = weather.wind()['speed']
+
+                    # Format and return weather information
+                    return f"Current weather in {location}: {temp}°C, {status}, Humidity: {humidity}%, Wind Speed: {wind_speed} m/s"
+                except Exception as e:
+                    # Return error message if weather data cannot be retrieved
+                    return f"Could not retrieve weather data for {location}: {str(e)}"
+
+        # Create a proper Langchain Tool from our custom class
+        owm_tool = OpenWeatherMapTool(os.environ["OWM_API_KEY"])
+        return Tool(
+            name="OpenWeatherMap",
+            description="Get current weather information for a specific location. Use this when asked about current weather conditions. Input should be a location name or a city name like 'Beijing' or 'New York'.",
+            func=owm_tool.get_current_weather,
+        )
+    except ImportError:
+        print("Warning: pyowm package not installed. Please install it with `pip install pyowm`")
+    except Exception as e:
+        print(f"Warning: Could not initialize OpenWeatherMap tool: {e}")
+    return None
+
+
+def _make_wolfram_alpha(llm: Optional[BaseLanguageModel]) -> Optional[BaseTool]:
+    # Try to create Wolfram Alpha tool if credentials and dependencies are available
+    if not os.environ.get("WOLFRAM_ALPHA_APPID"):
         print("Info: WOLFRAM_ALPHA_APPID not found. Wolfram Alpha tool will not be available.")
+        return None
+    try:
+        from langchain_community.tools.wolfram_alpha import WolframAlphaQueryRun
+        from langchain_community.utilities.wolfram_alpha import WolframAlphaAPIWrapper
+
+        # Create a wrapper with error handling
+        class WolframAlphaTool(WolframAlphaQueryRun):
+            def _run(self, query: str) -> str:
+                """Execute Wolfram Alpha query with error handling.
+
+                Args:
+                    query: Query string for Wolfram Alpha
+
+                Returns:
+                    str: Query results or error message
+                """
+                try:
+                    return super()._run(query)
+                except Exception as e:
+                    return f"Wolfram Alpha query failed: {str(e)}. Please try a different tool or rephrase your query."
+
+            async def _arun(self, query: str) -> str:
+                """Execute async Wolfram Alpha query with error handling.
+
+                Args:
+                    query: Query string for Wolfram Alpha
+
+                Returns:
+                    str: Query results or error message
+                """
+                try:
+                    return await super()._arun(query)
+                except Exception as e:
+                    return f"Wolfram Alpha query failed: {str(e)}. Please try a different tool or rephrase your query."
+
+        return WolframAlphaTool(api_wrapper=WolframAlphaAPIWrapper())
+    except ImportError:
+        print("Warning: wolframalpha package not installed. Please install it with `pip install wolframalpha`")
+    except Exception as e:
+        print(f"Warning: Could not initialize Wolfram Alpha tool: {e}")
+    return None
+
 
-    # Try to add Google Search tool if credentials are available
-    if os.environ.get("GOOGLE_API_KEY") and os.environ.get("GOOGLE_CSE_ID"):
+def _make_google_search(llm: Optional[BaseLanguageModel]) -> Optional[BaseTool]:
+    # Try to create Google Search tool if credentials are available
+    if not (os.environ.get("GOOGLE_API_KEY") and os.environ.get("GOOGLE_CSE_ID")):
+        print("Info: GOOGLE_API_KEY and/or GOOGLE_CSE_ID not found. Google Search tool will not be available.")
+        return None
+    try:
+        # Using the newer imports to avoid deprecation warnings
+        from langchain_google_community import GoogleSearchAPIWrapper, GoogleSearchRun
+
+        return GoogleSearchRun(
+            api_wrapper=GoogleSearchAPIWrapper(
+                k=5,
+            ),
+            search_params={"dateRestrict": "m12"}
+        )
+    except ImportError:
+        print("Warning: langchain-google-community package not installed. Please install it with `pip install -U langchain-google-community`")
+
+        # Fallback to deprecated versions with warning suppression
         try:
-            # Using the newer imports to avoid deprecation warnings
-            from langchain_google_community import GoogleSearchAPIWrapper, GoogleSearchRun
-            
-            # Add Google Search tool using newer implementation
-            available_tools["google-search"] = GoogleSearchRun(
-                api_wrapper=GoogleSearchAPIWrapper(
-                    k=5,
-                ),
-                search_params={"dateRestrict": "m12"}
-            )
-        except ImportError:
-            print("Warning: langchain-google-community package not installed. Please install it with `pip install -U langchain-google-community`")
-            
-            # Fallback to deprecated versions with warning suppression
-            try:
-                from langchain_community.utilities.google_search import GoogleSearchAPIWrapper
-                from langchain_community.tools.google_search import GoogleSearchRun
-                import warnings
-                
-                # Suppress warnings for deprecated components
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    available_tools["google-search"] = GoogleSearchRun(
-                        api_wrapper=GoogleSearchAPIWrapper(
-                            k=5,
-                        ),
-                        search_params={"dateRestrict": "m12"}
-                    )
-            except Exception as e:
-                print(f"Warning: Could not initialize Google Search tool: {e}")
+            from langchain_community.utilities.google_search import GoogleSearchAPIWrapper
+            from langchain_community.tools.google_search import GoogleSearchRun
+            import warnings
+
+            # Suppress warnings for deprecated components
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                return GoogleSearchRun(
+                    api_wrapper=GoogleSearchAPIWrapper(
+                        k=5,
+                    ),
+                    search_params={"dateRestrict": "m12"}
+                )
         except Exception as e:
             print(f"Warning: Could not initialize Google Search tool: {e}")
-    else:
-        print("Info: GOOGLE_API_KEY and/or GOOGLE_CSE_ID not found. Google Search tool will not be available.")
-    
-    # Build list of requested tools
+    except Exception as e:
+        print(f"Warning: Could not initialize Google Search tool: {e}")
+    return None
+
+
+# Registry of tool factories; a factory returns None when its tool is unavailable
+TOOL_FACTORIES: dict[str, ToolFactory] = {
+    "arxiv": _make_arxiv,
+    "wikipedia": _make_wikipedia,
+    "python_repl": _make_python_repl,
+    "llm-math": _make_llm_math,
+    "critical_search": _make_critical_search,
+    "ddg-search": _make_ddg_search,
+    "meta-search": _make_meta_search,
+    "openweathermap": _make_openweathermap,
+    "wolfram-alpha": _make_wolfram_alpha,
+    "google-search": _make_google_search,
+}
+
+
+def register_tool(name: str, factory: ToolFactory) -> None:
+    """Register (or replace) the factory used to build a tool by name."""
+    TOOL_FACTORIES[name] = factory
+
+
+def load_tools(
+    tool_names: list[str],
+    llm: Optional[BaseLanguageModel] = None,
+    timings: Optional[dict[str, float]] = None,
+    cache: bool = True,
+) -> list[BaseTool]:
+    """Load and configure tools based on requested tool names.
+
+    Only the requested factories run, so unused tools are never imported.
+
+    Args:
+        tool_names: List of tool names to load
+        llm: Language model for tools that require it (e.g., math calculations)
+        timings: Optional dict filled with the construction time (seconds) of each tool
+        cache: Serve repeated queries of network tools from the tool result cache
+
+    Returns:
+        list[BaseTool]: List of configured tool instances
+    """
+    from agent.tool_cache import cache_tool
+
     tools = []
     for name in tool_names:
-        if name in available_tools:
-            tools.append(available_tools[name])
-        else:
+        factory = TOOL_FACTORIES.get(name)
+        if factory is None:
             print(f"Warning: Tool '{name}' not found in available tools.")
-    
-    return tools
\ No newline at end of file
+            continue
+
+        start = time.perf_counter()
+        tool = factory(llm)
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[name] = elapsed
+
+        if tool is None:
+            print(f"Warning: Tool '{name}' is not available.")
+            continue
+        print(f"Info: Loaded tool '{name}' in {elapsed * 1000:.1f} ms.")
+        tools.append(cache_tool(name, tool) if cache else tool)
+
+    return tools
@@ -0,0 +1,229 @@
+"""Local span tracing with head sampling.
+
+`SpanTracer` turns the callback events of a request into a tree of spans:
+
+    request                 the agent run (e.g. AgentExecutor, PlanAndExecute)
+      plan                  plan-and-solve planning
+      step                  one plan-and-solve step
+        chain / llm / tool  agent loops, LLM calls and tool calls
+          ...               runs nested inside tools, e.g. the critical_search self-ask agent
+
+Whether a request is traced is decided once when it starts (head
+sampling), so an unsampled request costs one random number and a dict
+lookup per event. The spans of a sampled request are buffered in memory and
+written together as JSON lines to a local file when the request ends, so
+tracing works offline and never touches the network. Export to LangSmith is
+separate and only enabled when LANGSMITH_API_KEY is set (agent/config.py).
+
+Configuration is read from the environment:
+    AGENT_TRACE_SAMPLE_RATE     fraction of requests traced, 0 disables tracing (default 0.1)
+    AGENT_TRACE_FILE            JSONL file spans are appended to (default ~/.cache/langchain-agent/traces.jsonl)
+    AGENT_TRACE_MAX_MB          size at which the file is rotated to <file>.1 (default 64)
+    AGENT_TRACE_MAX_SPANS       spans kept per request; later ones are counted but dropped (default 500)
+"""
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Callback metadata naming the kind of span a run starts, e.g. "plan" or
+# "step", and extra attributes of that span. Metadata is inherited by child
+# runs, so only the run where the kind first appears gets them.
+SPAN_KIND_KEY = "trace_span"
+SPAN_ATTRIBUTES_KEY = "trace_span_attributes"
+
+# Characters of tool inputs and outputs kept in span attributes
+_PREVIEW_CHARS = 200
+
+
+def _preview(value: Any) -> str:
+    text = str(getattr(value, "content", value))
+    return text if len(text) <= _PREVIEW_CHARS else text[:_PREVIEW_CHARS] + "..."
+
+
+class JSONLSpanSink:
+    """Append spans as JSON lines to a file, rotating it at a size limit."""
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def write(self, spans: list[dict[str, Any]]) -> None:
+        """Append the spans of one trace."""
+        data = "".join(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in spans)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size + len(data) > self.max_bytes:
+                self.path.replace(self.path.with_name(self.path.name + ".1"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: list[dict[str, Any]] = []
+        self.dropped = 0
+
+
+class SpanTracer(BaseCallbackHandler):
+    """Record sampled requests as nested spans and write them to a sink.
+
+    One instance can serve any number of concurrent requests; runs are
+    tracked by run id.
+    """
+
+    run_inline = True
+
+    def __init__(self, sink: JSONLSpanSink, sample_rate: float = 0.1, max_spans: int = 500):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.max_spans = max_spans
+        # run id -> (trace, span, started at, SPAN_KIND_KEY value of the run)
+        self._runs: dict[UUID, tuple[_Trace, dict[str, Any], float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str, metadata: Optional[dict[str, Any]], **attributes: Any) -> None:
+        marker = (metadata or {}).get(SPAN_KIND_KEY)
+        with self._lock:
+            if parent_run_id is None:
+                if random.random() >= self.sample_rate:
+                    return
+                trace, parent_id, kind = _Trace(), None, "request"
+            else:
+                parent = self._runs.get(parent_run_id)
+                if parent is None:
+                    # Part of an unsampled request
+                    return
+                trace, parent_id = parent[0], parent[1]["span_id"]
+                if marker is not None and marker != parent[3]:
+                    kind = marker
+                    attributes.update(metadata.get(SPAN_ATTRIBUTES_KEY) or {})
+            if len(trace.spans) >= self.max_spans:
+                trace.dropped += 1
+                return
+            span = {
+                "trace_id": trace.trace_id,
+                "span_id": run_id.hex,
+                "parent_id": parent_id,
+                "kind": kind,
+                "name": name,
+                "start_time": time.time(),
+                "attributes": {k: v for k, v in attributes.items() if v is not None},
+            }
+            trace.spans.append(span)
+            self._runs[run_id] = (trace, span, time.perf_counter(), marker)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        trace, span, started, _ = run
+        span["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        span["status"] = "error" if error is not None else "ok"
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        span["attributes"].update((k, v) for k, v in attributes.items() if v is not None)
+        if span["parent_id"] is None:
+            if trace.dropped:
+                span["attributes"]["dropped_spans"] = trace.dropped
+            try:
+                self.sink.write(trace.spans)
+            except OSError as e:
+                print(f"Warning: Could not write trace {trace.trace_id}: {e}")
+
+    @staticmethod
+    def _name(serialized: Optional[dict[str, Any]], kwargs: dict[str, Any], default: str) -> str:
+        return str(kwargs.get("name") or (serialized or {}).get("name") or default)
+
+    # Chains
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata=None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, "chain", self._name(serialized, kwargs, "chain"), metadata)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    # LLMs
+
+    def _start_llm(self, serialized, run_id: UUID, parent_run_id: Optional[UUID], metadata, kwargs: dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (metadata or {}).get("ls_model_name") or params.get("model_name") or params.get("model")
+        self._start(run_id, parent_run_id, "llm", self._name(serialized, kwargs, "llm"), metadata, model=model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata=None, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata=None, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and "ttft_ms" not in run[1]["attributes"]:
+            run[1]["attributes"]["ttft_ms"] = round((time.perf_counter() - run[2]) * 1000, 3)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._runs:
+            return
+        from agent.metrics import llm_token_usage
+
+        tokens_in, tokens_out = llm_token_usage(response)
+        self._end(run_id, tokens_in=tokens_in, tokens_out=tokens_out)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    # Tools
+
+    def on_tool_start(self, serialized, input_str: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata=None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, "tool", self._name(serialized, kwargs, "tool"), metadata, input=_preview(input_str))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, output=_preview(output))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+
+_tracer: Optional[SpanTracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Optional[SpanTracer]:
+    """Return the process-wide tracer, or None when AGENT_TRACE_SAMPLE_RATE is 0."""
+    global _tracer
+    sample_rate = float(os.environ.get("AGENT_TRACE_SAMPLE_RATE", "0.1"))
+    if sample_rate <= 0:
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            path = os.environ.get("AGENT_TRACE_FILE", Path.home() / ".cache" / "langchain-agent" / "traces.jsonl")
+            _tracer = SpanTracer(
+                JSONLSpanSink(
+                    Path(path).expanduser(),
+                    max_bytes=int(float(os.environ.get("AGENT_TRACE_MAX_MB", "64")) * 1024 * 1024),
+                ),
+                sample_rate=sample_rate,
+                max_spans=int(os.environ.get("AGENT_TRACE_MAX_SPANS", "500")),
+            )
+        return _tracer
+
+
+def trace_handlers() -> list[BaseCallbackHandler]:
+    """Return the callbacks to add to a request for local tracing."""
+    tracer = get_tracer()
+    return [tracer] if tracer is not None else []
@@ -1,13 +1,64 @@
-from langchain.memory import ConversationBufferMemory
-from langchain_core.prompts import MessagesPlaceholder
+import os
+from typing import Optional
+
+
+def init_memory(session_id: Optional[str] = None):
+    """Initialize the memory for the conversation of one session.
+
+    AGENT_MEMORY selects the kind of memory:
+        "buffer"     the whole conversation verbatim (default)
+        "summary"    recent turns within a token budget plus a rolling summary
+        "retrieval"  recent turns plus the earlier turns relevant to the question
+
+    When AGENT_HISTORY_DIR is set, the messages of session_id are kept in a
+    persistent session log (see agent/history_store.py).
+    """
+    extra = {}
+    if session_id is not None:
+        from agent.history_store import PersistentChatMessageHistory, get_session_log
+
+        log = get_session_log()
+        if log is not None:
+            extra["chat_memory"] = PersistentChatMessageHistory(log, session_id)
+
+    mode = os.environ.get("AGENT_MEMORY", "buffer")
+    if mode == "summary":
+        from agent.summary_memory import init_summary_memory
+
+        return init_summary_memory(**extra)
+    if mode == "retrieval":
+        from agent.retrieval_memory import init_retrieval_memory
+
+        return init_retrieval_memory(**extra)
+    if mode != "buffer":
+        print(f"Warning: Unknown AGENT_MEMORY '{mode}'. Using the conversation buffer.")
+
+    from langchain.memory import ConversationBufferMemory
 
-def init_memory():
-    """Initialize the memory for contextual conversation."""
     return ConversationBufferMemory(
+        **extra,
         memory_key="chat_history",
         return_messages=True,
         output_key="output"  # Updated from "answer" to "output"
     )
 
-MEMORY = init_memory()
-CHAT_HISTORY = MessagesPlaceholder(variable_name="chat_history")
\ No newline at end of file
+
+def __getattr__(name):
+    """Create the shared MEMORY and CHAT_HISTORY on first access.
+
+    Building them needs `langchain.memory`, which is slow to import, so they
+    are not created when this module is imported. MEMORY keeps a separate
+    conversation per session (see agent/session_memory.py).
+    """
+    if name == "MEMORY":
+        from agent.session_memory import init_session_memory
+
+        value = init_session_memory(init_memory)
+    elif name == "CHAT_HISTORY":
+        from langchain_core.prompts import MessagesPlaceholder
+
+        value = MessagesPlaceholder(variable_name="chat_history")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache on the module so later lookups bypass __getattr__
+    return globals().setdefault(name, value)
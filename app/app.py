@@ -7,6 +7,8 @@ Run this as follows:
 
 import os
 import sys
+import threading
+import uuid
 
 # current_script = os.path.abspath(__file__)
 # project_root = os.path.dirname(current_script)
@@ -16,32 +18,51 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from agent.config import set_environment
 set_environment()
+# Keep conversations across app restarts
+os.environ.setdefault(
+    "AGENT_HISTORY_DIR", os.path.join(os.path.expanduser("~"), ".local", "share", "langchain-agent", "sessions")
+)
+HISTORY_PAGE_SIZE = 50
+# Seconds a question may take, including time spent waiting for a worker
+REQUEST_TIMEOUT = 120
 
 import streamlit as st
 from langchain_community.callbacks.streamlit import StreamlitCallbackHandler
-from agent.agent import load_agent
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from agent.agent import SUPPORTED_MODELS
+from agent.deadline import DeadlineExceeded, deadline_scope
+from agent.factory import AGENT_FACTORY, get_agent
+from agent.history_store import PersistentChatMessageHistory, is_valid_session_id
+from agent.metrics import METRICS, METRICS_HANDLER
+from agent.scheduler import SCHEDULER, SchedulerSaturated
+from agent.session_memory import set_current_session
+from agent.tracing import trace_handlers
 from agent.utils import MEMORY
 
 # Initialize session state for chat history
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+# Every browser session keeps its own conversation in the shared MEMORY.
+# The id is kept in the URL so a reload or restart resumes the conversation.
+if "session_id" not in st.session_state:
+    session_id = st.query_params.get("session")
+    # A hand-edited URL must not name a file outside the history directory
+    st.session_state.session_id = session_id if is_valid_session_id(session_id) else uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+set_current_session(st.session_state.session_id)
+
 st.set_page_config(page_title="LangChain Question Answering", page_icon=":robot:")
 st.header("Ask a research question!")
 
 strategy = st.radio(
     "Reasoning strategy",
-    ("plan-and-solve", "zero-shot-react"),
+    ("plan-and-solve", "zero-shot-react", "tool-calling"),
 )
 
 model_name = st.selectbox(
     "Select Model",
-    [
-        "gpt-3.5-turbo",
-        "gpt-4",
-        "Qwen/Qwen3-8B",
-        "Qwen/Qwen2.5-7B",
-    ],
+    SUPPORTED_MODELS,
     index=0
 )
 
@@ -56,36 +77,76 @@ tool_names = st.multiselect(
         "google-search",
         "wolfram-alpha",
         "ddg-search",
+        "meta-search",
         "openweathermap",
     ],
     ["ddg-search", "wikipedia", "arxiv", "openweathermap"],
 )
 
 if st.sidebar.button("Clear message history"):
-    MEMORY.chat_memory.clear()
+    MEMORY.clear()
+
+if st.sidebar.button("Rebuild agents"):
+    AGENT_FACTORY.invalidate()
+
+with st.sidebar.expander("Metrics"):
+    # Latency, token and error histograms of every request served by this process
+    st.json(METRICS.snapshot(), expanded=False)
+
+# Render only the latest page of a long history; earlier pages load on demand
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
+history = MEMORY.chat_memory
+shown = st.session_state.history_pages * HISTORY_PAGE_SIZE
+if isinstance(history, PersistentChatMessageHistory):
+    total = history.count()
+    messages = history.page(-shown) if total else []
+else:
+    total = len(history.messages)
+    messages = history.messages[-shown:]
+if total > shown and st.button("Show earlier messages"):
+    st.session_state.history_pages += 1
+    st.rerun()
 
 avatars = {"human": "user", "ai": "assistant"}
-for msg in MEMORY.chat_memory.messages:
+for msg in messages:
     st.chat_message(avatars[msg.type]).write(msg.content)
 
 assert strategy is not None
-agent_chain = load_agent(tool_names=tool_names, strategy=strategy, model_name=model_name)
+# Reuse a warm agent across reruns; only new configurations are built
+agent_chain = get_agent(tool_names=tool_names, strategy=strategy, model_name=model_name)
 
 if prompt := st.chat_input(placeholder="Ask me anything!"):
     st.chat_message("user").write(prompt)
     
     with st.chat_message("assistant"):
         st_callback = StreamlitCallbackHandler(st.container())
-        
-        try:
-            # Invoke the agent with the provided input and callback handler
-            response = agent_chain.invoke(
-                {"input": prompt}, 
-                {"callbacks": [st_callback], "timeout": 120}
+
+        # Render final-answer tokens as soon as the model starts writing them
+        answer_box = st.empty()
+        streamed_tokens = []
+
+        def show_token(token: str) -> None:
+            streamed_tokens.append(token)
+            answer_box.markdown("".join(streamed_tokens))
+
+        stream_handler = agent_chain.answer_stream_handler(show_token)
+
+        script_ctx = get_script_run_ctx()
+
+        def run_agent():
+            # Scheduler workers need this session's script context to draw
+            add_script_run_ctx(threading.current_thread(), script_ctx)
+            return agent_chain.invoke(
+                {"input": prompt},
+                {"callbacks": [st_callback, stream_handler, METRICS_HANDLER, *trace_handlers()]}
             )
-            
-            # Debugging: Print the raw response for inspection
-            print(f"Raw response: {response}")
+
+        try:
+            # Run the agent on the shared scheduler so bursts of users are queued fairly.
+            # The deadline covers queueing and is enforced down to tools and LLM calls.
+            with deadline_scope(REQUEST_TIMEOUT):
+                response = SCHEDULER.run(st.session_state.session_id, run_agent)
 
             # Process the response from the agent
             if isinstance(response, dict):
@@ -96,15 +157,18 @@ if prompt := st.chat_input(placeholder="Ask me anything!"):
                     output = response.get("output", response.get("answer", "未能生成答案，请尝试其他问题或工具。"))
             else:
                 output = str(response)
-            
-            # Debugging: Print the processed output
-            print(f"Processed output: {output}")
-            
+
             # Append the assistant's response to the chat history
             st.session_state.chat_history.append({"role": "Assistant", "content": output})
             
-            # Display the output
-            st.write(output)
+            # Replace the streamed text with the complete output
+            answer_box.write(output)
+
+        except SchedulerSaturated:
+            st.warning("The assistant is busy right now. Please try again in a moment.")
+
+        except DeadlineExceeded:
+            st.warning("The question took too long to answer. Please try again or select fewer tools.")
 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
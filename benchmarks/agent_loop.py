@@ -0,0 +1,256 @@
+"""Agent loop benchmark with scripted LLMs and tools.
+
+Drives the ReAct executor (`StreamingAgentExecutor`) and plan-and-execute
+(`PlanAndExecuteWrapper`) with a scripted chat model and fake tools whose
+latency is configurable, so the framework overhead can be measured without
+any network. Reported metrics:
+
+    construction       time to build an agent, and `load_tools` per tool
+    overhead           wall time per loop iteration with zero LLM/tool latency
+    memory growth      traced bytes retained per request after warm-up
+    throughput         requests per second with the configured latencies
+
+Results can be saved as a baseline and later checked against it; the check
+exits non-zero when a metric regresses beyond the tolerance. Baselines are
+machine-specific, so regenerate them with --save-baseline on the machine
+that runs the check.
+
+Run this as follows:
+> PYTHONPATH=. python benchmarks/agent_loop.py --check
+> PYTHONPATH=. python benchmarks/agent_loop.py --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool, Tool
+
+BASELINE_FILE = Path(__file__).with_name("baselines.json")
+
+# Metrics where a larger value is better; all others are costs
+HIGHER_IS_BETTER = {"react_throughput_rps", "plan_throughput_rps"}
+
+# Retained memory below this many bytes per request is allocator noise, not a leak
+MEMORY_NOISE_FLOOR = 4096
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers with `script(prompt_text)` after a fixed latency."""
+
+    script: Callable[[str], str]
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.script("\n".join(str(m.content) for m in messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def make_tools(latency: float, count: int = 3) -> list[BaseTool]:
+    """Return `count` echo tools that sleep for `latency` seconds."""
+
+    def echo(query: str) -> str:
+        if latency:
+            time.sleep(latency)
+        return f"result for {query}"
+
+    return [Tool(name=f"echo{i}", func=echo, description="Echo the query.") for i in range(count)]
+
+
+def react_script(iterations: int) -> Callable[[str], str]:
+    """Call a tool `iterations` times, then answer."""
+
+    def script(text: str) -> str:
+        done = text.split("Question:")[-1].count("Observation:")
+        if done < iterations:
+            return f"Thought: look it up\nAction: echo0\nAction Input: query {done}"
+        return "Thought: I now know the final answer\nFinal Answer: done"
+
+    return script
+
+
+def plan_script(steps: int) -> Callable[[str], str]:
+    """Plan `steps` steps; every step calls one tool, then answers."""
+
+    def script(text: str) -> str:
+        if "devise a plan" in text:
+            lines = [f"{i}. Look up fact {i}" for i in range(1, steps)]
+            lines.append(f"{steps}. Given the above steps taken, respond to the user")
+            return "Plan:\n" + "\n".join(lines)
+        objective = text.split("Current objective:")[-1]
+        if "Observation:" not in objective:
+            return '```json\n{"action": "echo0", "action_input": "fact"}\n```'
+        return '```json\n{"action": "Final Answer", "action_input": "done"}\n```'
+
+    return script
+
+
+def build_react(llm: BaseChatModel, tools: list[BaseTool], max_iterations: int):
+    from langchain.agents import create_react_agent
+
+    from agent.prompts import get_prompt
+    from agent.streaming import StreamingAgentExecutor
+
+    return StreamingAgentExecutor(
+        agent=create_react_agent(llm, tools, get_prompt("hwchase17/react")),
+        tools=tools,
+        handle_parsing_errors=True,
+        max_iterations=max_iterations + 2,
+    )
+
+
+def build_plan(llm: BaseChatModel, tools: list[BaseTool]):
+    from langchain_experimental.plan_and_execute import load_agent_executor, load_chat_planner
+
+    from agent.plan_and_execute import PlanAndExecuteWrapper
+
+    agent = PlanAndExecuteWrapper(load_chat_planner(llm), load_agent_executor(llm, tools))
+    # Console output of the plan and step responses would dominate the timings
+    agent.plan_and_execute.verbose = False
+    return agent
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _memory_growth(invoke: Callable[[], Any], requests: int) -> float:
+    for _ in range(3):
+        invoke()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(requests):
+            invoke()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return max(after - before, 0) / requests
+
+
+def _throughput(invoke: Callable[[], Any], requests: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: invoke(), range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def run(args: argparse.Namespace) -> dict[str, float]:
+    """Run every benchmark and return the metrics."""
+    from agent.tool_loader import load_tools, register_tool
+
+    metrics: dict[str, float] = {}
+    question = {"input": "benchmark question"}
+
+    # Construction
+    fast_tools = make_tools(0.0)
+    react_llm = ScriptedChatModel(script=react_script(args.iterations))
+    plan_llm = ScriptedChatModel(script=plan_script(args.iterations))
+    build_react(react_llm, fast_tools, args.iterations)  # warm imports
+    build_plan(plan_llm, fast_tools)
+    metrics["react_construction_ms"] = _best(lambda: build_react(react_llm, fast_tools, args.iterations), args.repeat) * 1000
+    metrics["plan_construction_ms"] = _best(lambda: build_plan(plan_llm, fast_tools), args.repeat) * 1000
+    names = []
+    for i, tool in enumerate(fast_tools):
+        name = f"bench-echo{i}"
+        register_tool(name, lambda llm, tool=tool: tool)
+        names.append(name)
+    metrics["load_tools_ms_per_tool"] = _best(lambda: load_tools(names, cache=False), args.repeat) * 1000 / len(names)
+
+    # Per-iteration overhead with zero latency
+    react = build_react(react_llm, fast_tools, args.iterations)
+    plan = build_plan(plan_llm, fast_tools)
+    react.invoke(question)
+    plan.invoke(question)
+    # A ReAct run makes iterations + 1 LLM calls; a plan run plans once and
+    # makes two LLM calls per step
+    metrics["react_overhead_ms_per_iteration"] = _best(lambda: react.invoke(question), args.repeat) * 1000 / (args.iterations + 1)
+    metrics["plan_overhead_ms_per_step"] = _best(lambda: plan.invoke(question), args.repeat) * 1000 / args.iterations
+
+    # Memory retained across requests
+    metrics["react_memory_bytes_per_request"] = _memory_growth(lambda: react.invoke(question), args.requests)
+    metrics["plan_memory_bytes_per_request"] = _memory_growth(lambda: plan.invoke(question), args.requests)
+
+    # Throughput with realistic latencies
+    slow_tools = make_tools(args.tool_latency)
+    react = build_react(ScriptedChatModel(script=react_script(args.iterations), latency=args.llm_latency), slow_tools, args.iterations)
+    plan = build_plan(ScriptedChatModel(script=plan_script(args.iterations), latency=args.llm_latency), slow_tools)
+    metrics["react_throughput_rps"] = _throughput(lambda: react.invoke(question), args.requests, args.concurrency)
+    metrics["plan_throughput_rps"] = _throughput(lambda: plan.invoke(question), args.requests, args.concurrency)
+    return metrics
+
+
+def compare(metrics: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed beyond tolerance."""
+    regressions = []
+    for name, value in metrics.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if name.endswith("_bytes_per_request") and value < MEMORY_NOISE_FLOOR:
+            continue
+        ratio = reference / value if name in HIGHER_IS_BETTER else value / reference
+        if ratio > tolerance:
+            regressions.append(f"{name}: {value:.3f} vs baseline {reference:.3f} ({ratio:.2f}x worse)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the agent loops with scripted LLMs and tools.")
+    parser.add_argument("--iterations", type=int, default=5, help="Tool calls per ReAct run and steps per plan")
+    parser.add_argument("--requests", type=int, default=20, help="Requests for the memory and throughput runs")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests in the throughput run")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Seconds per LLM call in the throughput run")
+    parser.add_argument("--tool-latency", type=float, default=0.02, help="Seconds per tool call in the throughput run")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions for timing; the best is reported")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=float(os.environ.get("AGENT_BENCH_TOLERANCE", "1.5")),
+                        help="Allowed slowdown factor before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    metrics = run(args)
+    for name, value in metrics.items():
+        print(f"{name}: {value:.3f}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({k: round(v, 3) for k, v in metrics.items()}, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        if not args.baseline.exists():
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        regressions = compare(metrics, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
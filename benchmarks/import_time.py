@@ -0,0 +1,90 @@
+"""Cold-import benchmark for the `agent` package.
+
+Each measurement imports the target module in a fresh interpreter, so nothing
+is cached in `sys.modules`. The script exits non-zero if the best time exceeds
+the budget or if a heavy module leaked into the import.
+
+Run this as follows:
+> PYTHONPATH=. python benchmarks/import_time.py --budget 0.3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules that must only be imported once an agent is actually built
+HEAVY_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "modelscope",
+    "transformers",
+    "langchain_experimental",
+    "langchain_community",
+    "langchain_openai",
+    "langchain.agents",
+    "langchain.memory",
+    "openai",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = {heavy!r}
+print(json.dumps({{"seconds": elapsed, "leaked": [m for m in heavy if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int) -> tuple[float, list[str]]:
+    """Import a module in fresh interpreters and return the best time and leaked modules.
+
+    Args:
+        module: Dotted module name to import
+        repeat: Number of fresh interpreters to run
+
+    Returns:
+        tuple[float, list[str]]: Best import time in seconds and heavy modules found loaded
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    best, leaked = float("inf"), []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = min(best, result["seconds"])
+        leaked = result["leaked"]
+    return best, leaked
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fail if cold import of the agent package regresses.")
+    parser.add_argument("--module", action="append", help="Module to import (repeatable)")
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("AGENT_IMPORT_BUDGET", "0.3")),
+                        help="Maximum allowed import time in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.module or ["agent.agent", "agent.factory"]:
+        seconds, leaked = measure(module, args.repeat)
+        status = "ok"
+        if seconds > args.budget:
+            status = f"over budget ({args.budget:.3f}s)"
+            failed = True
+        if leaked:
+            status = f"leaked {', '.join(leaked)}"
+            failed = True
+        print(f"{module}: {seconds * 1000:.1f} ms - {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Scripted chat model and ReAct agents for tests that run without a network."""
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers with `script(prompt_text)`, streamed in small chunks."""
+
+    script: Callable[[str], str]
+    latency: float = 0.0
+    chunk_size: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.script("\n".join(str(m.content) for m in messages))
+        for i in range(0, len(text), self.chunk_size):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + self.chunk_size]))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = "".join(chunk.text for chunk in self._stream(messages, stop, run_manager))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def react_script(tool: str, answer: str, calls: int = 1) -> Callable[[str], str]:
+    """Call `tool` `calls` times, then give `answer`."""
+
+    def script(text: str) -> str:
+        if text.split("Question:")[-1].count("Observation:") < calls:
+            return f"Thought: I should look this up\nAction: {tool}\nAction Input: query"
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+    return script
+
+
+def build_react(script: Callable[[str], str], tools: list[BaseTool], memory: Optional[Any] = None, **kwargs: Any):
+    """Return a `StreamingAgentExecutor` over the ReAct prompt driven by script."""
+    from langchain.agents import create_react_agent
+
+    from agent.prompts import get_prompt
+    from agent.streaming import StreamingAgentExecutor
+
+    return StreamingAgentExecutor(
+        agent=create_react_agent(ScriptedChatModel(script=script), tools, get_prompt("hwchase17/react")),
+        tools=tools,
+        memory=memory,
+        handle_parsing_errors=True,
+        **kwargs,
+    )
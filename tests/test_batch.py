@@ -0,0 +1,38 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent.batch import read_checkpoint, read_questions
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = Path(self.tmp.name)
+
+    def test_failed_and_torn_lines_are_removed(self):
+        output = self.directory / "answers.jsonl"
+        output.write_text(
+            json.dumps({"id": "1", "output": "Paris"}) + "\n"
+            + json.dumps({"id": "2", "output": None, "error": "TimeoutError: "}) + "\n"
+            + json.dumps({"id": "1", "output": "Paris again"}) + "\n"
+            + '{"id": "3", "outp',
+            encoding="utf-8",
+        )
+        self.assertEqual(read_checkpoint(output), {"1"})
+        lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(lines, [{"id": "1", "output": "Paris"}])
+
+    def test_missing_output_file(self):
+        self.assertEqual(read_checkpoint(self.directory / "answers.jsonl"), set())
+
+    def test_questions_get_line_numbers_as_ids(self):
+        questions = self.directory / "questions.jsonl"
+        questions.write_text('{"input": "a"}\n\n{"id": 7, "question": "b"}\n', encoding="utf-8")
+        self.assertEqual(read_questions(questions), [{"id": "1", "input": "a"}, {"id": "7", "input": "b"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
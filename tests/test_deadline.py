@@ -0,0 +1,63 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from langchain_core.tools import Tool
+
+from agent.deadline import DeadlineExceeded, deadline_scope, expired, remaining, should_wrap_up, time_budget
+from tests.fakes import build_react
+
+
+class DeadlineScopeTest(unittest.TestCase):
+    def test_no_deadline(self):
+        self.assertIsNone(remaining())
+        self.assertEqual(time_budget(8), 8)
+
+    def test_nested_scope_cannot_extend_the_deadline(self):
+        with deadline_scope(1):
+            with deadline_scope(60):
+                self.assertLessEqual(remaining(), 1)
+                self.assertLessEqual(time_budget(8), 1)
+
+    def test_cancel_ends_the_scope(self):
+        with deadline_scope(60) as deadline:
+            deadline.cancel()
+            self.assertTrue(expired())
+            with self.assertRaises(DeadlineExceeded):
+                time_budget(8)
+
+    @mock.patch.dict(os.environ, {"AGENT_DEADLINE_RESERVE": "10"})
+    def test_wrap_up_within_the_reserve(self):
+        with deadline_scope(60):
+            self.assertFalse(should_wrap_up())
+        with deadline_scope(5):
+            self.assertTrue(should_wrap_up())
+
+
+class WrapUpTest(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"AGENT_DEADLINE_RESERVE": "0.3"})
+    def test_agent_answers_with_what_it_has_before_the_deadline(self):
+        prompts = []
+
+        def script(text: str) -> str:
+            prompts.append(text)
+            if "running out of time" in text:
+                return "Thought: I must answer now\nFinal Answer: best effort"
+            return "Thought: more research\nAction: slow\nAction Input: q"
+
+        slow = Tool(name="slow", func=lambda q: time.sleep(0.1) or "partial", description="Slow lookup.")
+        agent = build_react(script, [slow], max_iterations=100)
+        started = time.monotonic()
+        with deadline_scope(0.6):
+            result = agent.invoke({"input": "q"})
+        self.assertEqual(result["output"], "best effort")
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(sum("running out of time" in prompt for prompt in prompts), 1)
+        # Without a deadline the agent keeps using tools until max_iterations
+        agent.max_iterations = 2
+        self.assertIn("stopped", agent.invoke({"input": "q"})["output"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage, message_to_dict
+
+from agent.history_store import PersistentChatMessageHistory, SessionLog
+
+
+def _turn(i: int) -> list:
+    return [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+
+
+class SessionLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = Path(self.tmp.name)
+        self.log = SessionLog(self.directory)
+
+    def _contents(self, messages) -> list[str]:
+        return [message.content for message in messages]
+
+    def test_round_trip(self):
+        for i in range(3):
+            self.log.append("s1", _turn(i))
+        messages = SessionLog(self.directory).read("s1")
+        self.assertEqual([m.type for m in messages[:2]], ["human", "ai"])
+        self.assertEqual(self._contents(messages)[-1], "answer 2")
+        self.assertEqual(self.log.count("s1"), 6)
+        self.assertEqual(self.log.read("other"), [])
+
+    def test_paging(self):
+        for i in range(10):
+            self.log.append("s1", _turn(i))
+        self.assertEqual(self._contents(self.log.read("s1", 2, 4)), ["question 1", "answer 1"])
+        self.assertEqual(self._contents(self.log.tail("s1", 2)), ["question 9", "answer 9"])
+        self.assertEqual(self._contents(self.log.read("s1", -3, -1)), ["answer 8", "question 9"])
+
+    def test_torn_tail_is_dropped_on_append(self):
+        self.log.append("s1", _turn(0))
+        # A crash mid-append: half a record in the log, half an offset in the index
+        with open(self.directory / "s1.log", "ab") as log:
+            log.write(b"\x00\x00\x01\x00partial")
+        with open(self.directory / "s1.idx", "ab") as index:
+            index.write(b"\x00\x00\x00")
+        self.assertEqual(self.log.count("s1"), 2)
+        self.log.append("s1", _turn(1))
+        self.assertEqual(
+            self._contents(self.log.read("s1")), ["question 0", "answer 0", "question 1", "answer 1"]
+        )
+        self.assertEqual((self.directory / "s1.idx").stat().st_size, 4 * 8)
+
+    def test_records_are_read_at_their_offsets(self):
+        self.log.append("s1", _turn(0))
+        # Unindexed bytes between two records, e.g. written by an older version
+        with open(self.directory / "s1.log", "ab") as log:
+            log.write(b"\x00\x00\x01\x00partial")
+        log_size = (self.directory / "s1.log").stat().st_size
+        with open(self.directory / "s1.idx", "ab") as index:
+            index.write(log_size.to_bytes(8, "big"))
+        with open(self.directory / "s1.log", "ab") as log:
+            log.write(self._record("late"))
+        self.assertEqual(self._contents(self.log.read("s1")), ["question 0", "answer 0", "late"])
+
+    @staticmethod
+    def _record(content: str) -> bytes:
+        record = zlib.compress(json.dumps(message_to_dict(HumanMessage(content=content))).encode("utf-8"))
+        return len(record).to_bytes(4, "big") + record
+
+    def test_history_starts_after_summarized_messages(self):
+        for i in range(3):
+            self.log.append("s1", _turn(i))
+        history = PersistentChatMessageHistory(self.log, "s1")
+        history.start_at(4)
+        self.assertEqual(self._contents(history.messages), ["question 2", "answer 2"])
+        history.add_messages(_turn(3))
+        self.assertEqual(history.count(), 8)
+        self.assertEqual(len(history.messages), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
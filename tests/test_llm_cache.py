@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.caches import InMemoryCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+import agent.llm_cache as llm_cache
+import agent.tool_cache as tool_cache
+from agent.llm_cache import BoundedSQLiteCache
+
+
+class BoundedSQLiteCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "llm_cache.sqlite"
+
+    def test_round_trip(self):
+        cache = BoundedSQLiteCache(self.path)
+        cache.update("prompt", "gpt-4 t=0", [ChatGeneration(message=AIMessage(content="Paris"))])
+        cached = BoundedSQLiteCache(self.path).lookup("prompt", "gpt-4 t=0")
+        self.assertEqual(cached[0].message.content, "Paris")
+        self.assertIsNone(cache.lookup("prompt", "gpt-3.5-turbo t=0"))
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_expired_responses_miss(self):
+        cache = BoundedSQLiteCache(self.path, ttl=0)
+        cache.update("prompt", "llm", [Generation(text="Paris")])
+        self.assertIsNone(cache.lookup("prompt", "llm"))
+
+    def test_least_recently_used_responses_are_evicted(self):
+        cache = BoundedSQLiteCache(self.path, max_bytes=200)
+        for prompt in ("a", "b", "c"):
+            cache.update(prompt, "llm", [Generation(text=prompt * 50)])
+        self.assertIsNone(cache.lookup("a", "llm"))
+        self.assertIsNotNone(cache.lookup("c", "llm"))
+        self.assertLessEqual(cache.stats()["bytes"], 200)
+
+
+class DefaultCachesTest(unittest.TestCase):
+    def setUp(self):
+        # Each test builds the process-wide caches from its own environment
+        for patcher in (mock.patch.object(llm_cache, "_llm_cache", None), mock.patch.object(tool_cache, "_default_cache", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @mock.patch.dict(os.environ, {}, clear=True)
+    def test_caches_stay_in_memory_by_default(self):
+        self.assertIsInstance(llm_cache.get_llm_cache(), InMemoryCache)
+        self.assertIsNone(tool_cache.get_tool_cache().path)
+
+    def test_persistence_is_opt_in(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                "AGENT_LLM_CACHE": "sqlite",
+                "AGENT_LLM_CACHE_PATH": os.path.join(directory, "llm.sqlite"),
+                "AGENT_TOOL_CACHE_PATH": os.path.join(directory, "tools.sqlite"),
+            }
+            with mock.patch.dict(os.environ, env):
+                self.assertIsInstance(llm_cache.get_llm_cache(), BoundedSQLiteCache)
+                self.assertIsNotNone(tool_cache.get_tool_cache().path)
+            self.assertEqual(sorted(p for p in os.listdir(directory) if p.endswith(".sqlite")), ["llm.sqlite", "tools.sqlite"])
+
+    @mock.patch.dict(os.environ, {"AGENT_LLM_CACHE": "off", "AGENT_TOOL_CACHE": "0"})
+    def test_caches_can_be_disabled(self):
+        self.assertIsNone(llm_cache.get_llm_cache())
+        self.assertIsNone(tool_cache.get_tool_cache())
+
+
+if __name__ == "__main__":
+    unittest.main()
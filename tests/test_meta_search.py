@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+
+from langchain_core.tools import ToolException
+
+from agent.meta_search import MetaSearch, merge_results
+
+
+def _hit(engine: str, title: str, url: str, snippet: str = "s") -> dict:
+    return {"title": title, "url": url, "snippet": snippet, "engine": engine}
+
+
+def _engine(name: str, count: int, delay: float = 0.0):
+    def search(query, max_results):
+        time.sleep(delay)
+        return [_hit(name, f"{name} page {i}", f"https://{name}.example/{i}") for i in range(min(count, max_results))]
+
+    return search
+
+
+class MergeResultsTest(unittest.TestCase):
+    def test_pages_ranked_by_several_engines_come_first(self):
+        merged = merge_results({
+            "ddg": [_hit("ddg", "Only DDG", "https://a.example"), _hit("ddg", "Paris", "https://www.paris.fr/")],
+            "google": [_hit("google", "Paris", "https://paris.fr", "a longer snippet")],
+        })
+        self.assertEqual([m["title"] for m in merged], ["Paris", "Only DDG"])
+        self.assertEqual(merged[0]["engines"], ["ddg", "google"])
+        self.assertEqual(merged[0]["snippet"], "a longer snippet")
+        self.assertAlmostEqual(merged[0]["score"], 1 / 62 + 1 / 61)
+
+    def test_near_identical_titles_are_merged(self):
+        merged = merge_results({
+            "wikipedia": [_hit("wikipedia", "Eiffel Tower", "https://en.wikipedia.org/wiki/Eiffel_Tower")],
+            "ddg": [_hit("ddg", "Eiffel Tower - Wikipedia", "https://en.m.wikipedia.org/wiki/Eiffel_Tower?x=1")],
+        })
+        self.assertEqual(len(merged), 1)
+
+
+class MetaSearchTest(unittest.TestCase):
+    def test_returns_once_enough_distinct_hits_arrived(self):
+        search = MetaSearch({"a": _engine("a", 8), "b": _engine("b", 8, 0.05), "c": _engine("c", 8, 2)}, deadline=5)
+        started = time.monotonic()
+        hits = search.search("q")
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(hits), 8)
+        self.assertEqual({engine for hit in hits for engine in hit["engines"]}, {"a", "b"})
+
+    def test_returns_what_arrived_at_the_deadline(self):
+        release = threading.Event()
+        slow = lambda q, n: release.wait(2) and []
+        search = MetaSearch({"a": _engine("a", 3), "slow": slow}, deadline=0.2)
+        self.assertEqual(len(search.search("q")), 3)
+        release.set()
+
+    def test_fails_when_no_engine_answers(self):
+        def broken(query, max_results):
+            raise ConnectionError("offline")
+
+        with self.assertRaisesRegex(ToolException, "Search failed: a: ConnectionError: offline"):
+            MetaSearch({"a": broken}).search("q")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import uuid
+
+from langchain_core.tools import Tool, ToolException
+
+from agent.metrics import MetricsCallbackHandler, MetricsRegistry
+
+
+def _counter(registry: MetricsRegistry, name: str, **labels: str) -> float:
+    for series in registry.snapshot()["counters"].get(name, []):
+        if series["labels"] == labels:
+            return series["value"]
+    return 0
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_prometheus_export_keeps_full_precision(self):
+        registry = MetricsRegistry()
+        registry.describe("agent_llm_tokens_total", "Tokens.")
+        registry.inc("agent_llm_tokens_total", 1234567, model="gpt-4")
+        registry.observe("agent_request_latency_seconds", 0.3)
+        text = registry.to_prometheus()
+        self.assertIn("# HELP agent_llm_tokens_total Tokens.", text)
+        self.assertIn('agent_llm_tokens_total{model="gpt-4"} 1234567', text)
+        self.assertIn('agent_request_latency_seconds_bucket{le="0.5"} 1', text)
+        self.assertIn("agent_request_latency_seconds_count 1", text)
+
+
+class MetricsCallbackHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.handler = MetricsCallbackHandler(self.registry)
+
+    def test_handled_tool_errors_are_counted(self):
+        def search(query):
+            raise ToolException("Search failed: ddg: rate limited")
+
+        tool = Tool(name="meta-search", func=search, description="Search", handle_tool_error=True)
+        self.assertEqual(tool.run("q", callbacks=[self.handler]), "Search failed: ddg: rate limited")
+        ok = Tool(name="echo", func=lambda q: q, description="Echo")
+        ok.run("q", callbacks=[self.handler])
+        self.assertEqual(_counter(self.registry, "agent_tool_errors_total", tool="meta-search", scope="agent"), 1)
+        self.assertEqual(_counter(self.registry, "agent_tool_errors_total", tool="echo", scope="agent"), 0)
+
+    def test_abandoned_runs_are_dropped(self):
+        handler = MetricsCallbackHandler(self.registry, stale_after=0)
+        abandoned = uuid.uuid4()
+        handler.on_chain_start({}, {}, run_id=abandoned)
+        handler.on_tool_start({"name": "search"}, "q", run_id=uuid.uuid4(), parent_run_id=abandoned)
+        # The next request sweeps the runs that never ended
+        handler.on_chain_start({}, {}, run_id=uuid.uuid4())
+        self.assertEqual(len(handler._runs), 1)
+        self.assertEqual(len(handler._requests), 1)
+        self.assertEqual(_counter(self.registry, "agent_request_abandoned_total"), 1)
+
+    def test_finished_requests_are_recorded(self):
+        root = uuid.uuid4()
+        self.handler.on_chain_start({}, {}, run_id=root)
+        self.handler.on_chain_end({}, run_id=root)
+        histograms = self.registry.snapshot()["histograms"]
+        self.assertEqual(histograms["agent_request_latency_seconds"][0]["count"], 1)
+        self.assertEqual(self.handler._runs, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from langchain_experimental.plan_and_execute.schema import Step
+
+from agent.plan_and_execute import infer_step_dependencies
+
+
+def _dependencies(*steps: str) -> list[set[int]]:
+    return infer_step_dependencies([Step(value=step) for step in steps])
+
+
+class InferStepDependenciesTest(unittest.TestCase):
+    def test_independent_lookups_run_in_parallel(self):
+        deps = _dependencies(
+            "Search for the current population of Tokyo.",
+            "Search for the current population of Paris.",
+            "Find out what the capital of Japan is and when it became the capital.",
+            "Given the above steps taken, respond to the user's original question.",
+        )
+        self.assertEqual(deps, [set(), set(), set(), {0, 1, 2}])
+
+    def test_common_words_are_not_back_references(self):
+        deps = _dependencies(
+            "Look up the answer to when the Eiffel Tower was built.",
+            "Find the result of the 2018 World Cup final and who won it.",
+            "Search for this year's Nobel Prize in Physics winners and their work.",
+            "Respond with the answer.",
+        )
+        self.assertEqual(deps[:3], [set(), set(), set()])
+
+    def test_numbered_references(self):
+        deps = _dependencies(
+            "Find the height of Mount Everest.",
+            "Find the height of K2.",
+            "Find the height of Mont Blanc.",
+            "Compute the difference between the heights from step 1 and step 3.",
+            "Add the results of steps 1-2.",
+        )
+        self.assertEqual(deps[3], {0, 2})
+        self.assertEqual(deps[4], {0, 1})
+
+    def test_unnumbered_back_references(self):
+        for text in (
+            "Using the result of the previous step, find the mayor of that city.",
+            "Based on the above, determine which is larger.",
+            "Convert these figures to US dollars.",
+            "Summarize the information gathered so far.",
+        ):
+            with self.subTest(text=text):
+                deps = _dependencies("Find the largest city in Canada.", "Find the largest city in Mexico.", text, "Respond.")
+                self.assertEqual(deps[2], {0, 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
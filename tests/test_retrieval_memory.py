@@ -0,0 +1,51 @@
+import unittest
+
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agent.embeddings import HashingEmbeddings
+from agent.retrieval_memory import RetrievalMemory
+
+
+def _memory(messages) -> RetrievalMemory:
+    return RetrievalMemory(
+        embeddings=HashingEmbeddings(),
+        k=1,
+        recent_messages=2,
+        return_messages=True,
+        output_key="output",
+        chat_memory=InMemoryChatMessageHistory(messages=messages),
+    )
+
+
+class RetrievalMemoryTest(unittest.TestCase):
+    def test_restored_turns_pair_questions_with_their_answers(self):
+        memory = _memory([
+            SystemMessage(content="You are a research assistant."),
+            HumanMessage(content="How tall is the Eiffel Tower?"),
+            AIMessage(content="It is 330 metres tall."),
+            HumanMessage(content="An unanswered question about volcanoes"),
+            HumanMessage(content="What is the capital of Japan?"),
+            AIMessage(content="Tokyo."),
+            HumanMessage(content="Thanks"),
+            AIMessage(content="You're welcome."),
+        ])
+        selected = memory.load_memory_variables({"input": "How tall is the Eiffel Tower now?"})["chat_history"]
+        self.assertEqual(
+            [m.content for m in selected],
+            ["How tall is the Eiffel Tower?", "It is 330 metres tall.", "Thanks", "You're welcome."],
+        )
+
+    def test_saved_turns_are_retrieved(self):
+        memory = _memory([])
+        memory.save_context({"input": "What is the capital of Japan?"}, {"output": "Tokyo."})
+        memory.save_context({"input": "How tall is the Eiffel Tower?"}, {"output": "330 metres."})
+        memory.save_context({"input": "Thanks"}, {"output": "You're welcome."})
+        selected = memory.load_memory_variables({"input": "capital of Japan"})["chat_history"]
+        self.assertEqual([m.content for m in selected][:2], ["What is the capital of Japan?", "Tokyo."])
+        memory.clear()
+        self.assertEqual(memory.load_memory_variables({"input": "capital of Japan"})["chat_history"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import contextvars
+import threading
+import time
+import unittest
+
+from agent.deadline import DeadlineExceeded, deadline_scope
+from agent.scheduler import RequestScheduler, SchedulerSaturated
+
+_user = contextvars.ContextVar("user", default="none")
+
+
+class RequestSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = RequestScheduler(max_workers=1, max_queue=3, max_queue_per_user=2)
+        self.addCleanup(self.scheduler.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        # Occupy the only worker so later requests stay queued
+        self.blocker = self.scheduler.submit("blocker", self.release.wait, 5)
+        while self.scheduler.stats()["running"] == 0:
+            time.sleep(0.001)
+
+    def test_full_user_queue_rejects_that_user_only(self):
+        self.scheduler.submit("a", time.sleep, 0)
+        self.scheduler.submit("a", time.sleep, 0)
+        with self.assertRaises(SchedulerSaturated):
+            self.scheduler.submit("a", time.sleep, 0)
+        self.scheduler.submit("b", time.sleep, 0)
+        self.assertEqual(self.scheduler.stats()["rejected"], 1)
+
+    def test_full_queue_rejects_everyone(self):
+        for user in ("a", "b", "c"):
+            self.scheduler.submit(user, time.sleep, 0)
+        with self.assertRaises(SchedulerSaturated):
+            self.scheduler.submit("d", time.sleep, 0)
+
+    def test_users_are_served_round_robin(self):
+        order = []
+        futures = [self.scheduler.submit(user, order.append, name) for user, name in (("a", "a0"), ("a", "a1"), ("b", "b0"))]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(order, ["a0", "b0", "a1"])
+
+    def test_requests_expired_while_queued_do_not_run(self):
+        ran = []
+        with deadline_scope(0.01):
+            expired = self.scheduler.submit("a", ran.append, 1)
+        token = _user.set("b")
+        with deadline_scope(5):
+            live = self.scheduler.submit("b", _user.get)
+        _user.reset(token)
+        time.sleep(0.02)
+        self.release.set()
+        with self.assertRaises(DeadlineExceeded):
+            expired.result(5)
+        # Requests run in the submitter's context
+        self.assertEqual(live.result(5), "b")
+        self.assertEqual(ran, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent.embeddings import HashingEmbeddings
+from agent.semantic_cache import SemanticCache, is_time_sensitive
+
+QUESTION = "What was the GDP of France in 2019?"
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticCache(HashingEmbeddings())
+
+    def test_repeat_hits_within_namespace(self):
+        self.cache.store(QUESTION, "2.7 trillion USD", "react")
+        hit = self.cache.lookup("what was the GDP of France in 2019", "react")
+        self.assertEqual(hit["answer"], "2.7 trillion USD")
+        self.assertIsNone(self.cache.lookup(QUESTION, "tool-calling"))
+
+    def test_other_numbers_miss(self):
+        self.cache.store(QUESTION, "2.7 trillion USD", "react")
+        self.assertIsNone(self.cache.lookup("What was the GDP of France in 2020?", "react"))
+
+    def test_other_namespaces_do_not_push_out_a_hit(self):
+        for i in range(20):
+            self.cache.store(QUESTION, f"answer {i}", f"conversation {i}")
+        self.cache.store(QUESTION, "mine", "react")
+        self.assertEqual(self.cache.lookup(QUESTION, "react")["answer"], "mine")
+        self.assertIsNone(self.cache.lookup(QUESTION, "unknown"))
+
+    def test_expired_entries_miss(self):
+        cache = SemanticCache(HashingEmbeddings(), ttl=0)
+        cache.store(QUESTION, "2.7 trillion USD")
+        self.assertIsNone(cache.lookup(QUESTION))
+
+    def test_time_sensitive_questions(self):
+        self.assertTrue(is_time_sensitive("What's the weather in Paris today?"))
+        self.assertFalse(is_time_sensitive(QUESTION))
+
+
+class SemanticCachePersistenceTest(unittest.TestCase):
+    def test_flush_persists_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SemanticCache(HashingEmbeddings(), path=Path(directory))
+            cache.store(QUESTION, "2.7 trillion USD")
+            # Stores only write to disk in the background
+            self.assertFalse((Path(directory) / "entries.json").exists())
+            cache.flush()
+            reloaded = SemanticCache(HashingEmbeddings(), path=Path(directory))
+            self.assertEqual(reloaded.lookup(QUESTION)["answer"], "2.7 trillion USD")
+
+
+if __name__ == "__main__":
+    unittest.main()
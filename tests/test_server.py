@@ -0,0 +1,95 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_core.tools import Tool
+
+from agent.factory import AGENT_FACTORY
+from agent.scheduler import RequestScheduler
+from agent.server import create_app
+from tests.fakes import build_react, react_script
+
+_URL = "/agents/zero-shot-react"
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        env = mock.patch.dict(os.environ, {"AGENT_TRACE_SAMPLE_RATE": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+        lookup = Tool(name="lookup", func=lambda q: "Tokyo", description="Look up a fact.")
+
+        def builder(tool_names, strategy, model_name):
+            return build_react(react_script("lookup", "The capital is Tokyo."), [lookup])
+
+        builder_patch = mock.patch.object(AGENT_FACTORY, "_builder", builder)
+        builder_patch.start()
+        self.addCleanup(builder_patch.stop)
+        AGENT_FACTORY.invalidate()
+        self.addCleanup(AGENT_FACTORY.invalidate)
+
+        self.client = TestClient(TestServer(create_app()))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_invalid_requests_are_rejected(self):
+        bodies = [
+            {"tools": ["wikipedia"]},
+            {"input": "q", "tools": "wikipedia"},
+            {"input": "q", "tools": [1]},
+            {"input": "q", "tools": ["no-such-tool"]},
+            {"input": "q", "model": "gpt-evil"},
+            {"input": "q", "session_id": "../etc/passwd"},
+            {"input": "q", "timeout": -1},
+        ]
+        for body in bodies:
+            response = await self.client.post(f"{_URL}/invoke", json=body)
+            self.assertEqual(response.status, 400, body)
+        response = await self.client.post("/agents/no-such-strategy/invoke", json={"input": "q"})
+        self.assertEqual(response.status, 404)
+
+    async def test_invoke(self):
+        response = await self.client.post(
+            f"{_URL}/invoke", json={"input": "What is the capital of Japan?", "tools": ["wikipedia"], "session_id": "s1"}
+        )
+        self.assertEqual(response.status, 200)
+        result = await response.json()
+        self.assertEqual(result["output"], "The capital is Tokyo.")
+        self.assertEqual(result["session_id"], "s1")
+
+    async def test_stream(self):
+        response = await self.client.post(f"{_URL}/stream", json={"input": "What is the capital of Japan?", "tools": ["wikipedia"]})
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+        events = _events(await response.text())
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], "start")
+        self.assertEqual(names[-1], "end")
+        self.assertIn({"type": "observation", "tool": "lookup", "output": "Tokyo"}, [data for name, data in events if name == "step"])
+        self.assertEqual("".join(data["text"] for name, data in events if name == "token"), "The capital is Tokyo.")
+
+    async def test_saturated_server_answers_429(self):
+        with mock.patch("agent.server.SCHEDULER", RequestScheduler(max_workers=1, max_queue=0)):
+            response = await self.client.post(f"{_URL}/invoke", json={"input": "q", "tools": ["wikipedia"]})
+        self.assertEqual(response.status, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+    async def test_metrics(self):
+        await self.client.post(f"{_URL}/invoke", json={"input": "q", "tools": ["wikipedia"]})
+        response = await self.client.get("/metrics")
+        self.assertEqual(response.status, 200)
+        self.assertIn("agent_tool_latency_seconds_count", await response.text())
+
+
+if __name__ == "__main__":
+    unittest.main()
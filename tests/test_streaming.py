@@ -0,0 +1,66 @@
+import unittest
+
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.tools import BaseTool, Tool
+
+from agent.streaming import FinalTurnAnswerParser, JsonFinalAnswerParser, ReActFinalAnswerParser
+from tests.fakes import build_react, react_script
+
+
+def _feed(parser, text: str, size: int) -> str:
+    return "".join(parser.feed(text[i:i + size]) for i in range(0, len(text), size))
+
+
+class ParserTest(unittest.TestCase):
+    def test_react_answer_follows_marker_split_across_tokens(self):
+        text = "Thought: I know it\nFinal Answer: Paris is the capital."
+        for size in (1, 3, 7):
+            self.assertEqual(_feed(ReActFinalAnswerParser(), text, size), "Paris is the capital.")
+
+    def test_react_text_before_the_answer_is_dropped(self):
+        self.assertEqual(_feed(ReActFinalAnswerParser(), "Thought: search\nAction: wikipedia", 2), "")
+
+    def test_json_action_input_is_decoded(self):
+        blob = '```json\n{"action": "Final Answer", "action_input": "Line \\"one\\"\\nCaf\\u00e9"}\n```'
+        for size in (1, 2, 5):
+            self.assertEqual(_feed(JsonFinalAnswerParser(), blob, size), 'Line "one"\nCafé')
+
+    def test_json_tool_actions_are_not_answers(self):
+        blob = '{"action": "wikipedia", "action_input": "Paris"}'
+        self.assertEqual(_feed(JsonFinalAnswerParser(), blob, 3), "")
+
+    def test_final_turn_only_when_no_tool_calls(self):
+        parser = FinalTurnAnswerParser()
+        self.assertEqual(parser.feed("The answer"), "")
+        answer = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="The answer is 4."))]])
+        self.assertEqual(parser.finish(answer), "The answer is 4.")
+        tool_turn = AIMessage(content="Let me check.", tool_calls=[{"name": "calc", "args": {}, "id": "1"}])
+        self.assertEqual(parser.finish(LLMResult(generations=[[ChatGeneration(message=tool_turn)]])), "")
+
+
+class StreamAnswerTest(unittest.TestCase):
+    def test_streams_only_the_agent_answer(self):
+        lookup = Tool(name="lookup", func=lambda q: "Tokyo", description="Look up a fact.")
+        agent = build_react(react_script("lookup", "The capital is Tokyo."), [lookup])
+        tokens = list(agent.stream_answer({"input": "What is the capital of Japan?"}))
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens), "The capital is Tokyo.")
+
+    def test_nested_agent_answers_are_not_streamed(self):
+        inner = build_react(react_script("none", "INNER", calls=0), [])
+
+        class SubAgent(BaseTool):
+            name: str = "sub"
+            description: str = "Ask a sub-agent."
+
+            def _run(self, query: str, run_manager: CallbackManagerForToolRun = None) -> str:
+                return inner.invoke({"input": query}, {"callbacks": run_manager.get_child()})["output"]
+
+        agent = build_react(react_script("sub", "OUTER"), [SubAgent()])
+        self.assertEqual("".join(agent.stream_answer({"input": "q"})), "OUTER")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from langchain_core.tools import Tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from agent.tool_cache import CachedTool, ToolResultCache
+
+
+def _parameters(tool):
+    parameters = convert_to_openai_tool(tool)["function"]["parameters"]
+    return {name: spec["type"] for name, spec in parameters["properties"].items()}, parameters.get("required")
+
+
+class CachedToolSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.tool = Tool(name="search", func=lambda q: self.calls.append(q) or f"results for {q}", description="Search")
+        self.cached = CachedTool.wrap(self.tool, ToolResultCache(), "ddg-search", 60)
+
+    def test_schema_matches_wrapped_tool(self):
+        self.assertEqual(self.cached.args, self.tool.args)
+        self.assertEqual(_parameters(self.cached), _parameters(self.tool))
+
+    def test_tool_call_arguments_reach_tool(self):
+        self.assertEqual(self.cached.invoke({"__arg1": "paris"}), "results for paris")
+        self.assertEqual(self.cached.invoke("paris"), "results for paris")
+        self.assertEqual(self.calls, ["paris"])
+
+    def test_failures_are_not_cached(self):
+        tool = Tool(name="arxiv", func=lambda q: self.calls.append(q) or "Arxiv exception: 503", description="Arxiv")
+        cached = CachedTool.wrap(tool, ToolResultCache(), "arxiv", 60)
+        cached.invoke("q")
+        cached.invoke("q")
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()